@@ -0,0 +1,517 @@
+import sqlite3
+import sys
+import os
+import shutil
+import tempfile
+import io
+import json
+import time
+import random
+import argparse
+import platform
+import statistics
+import contextlib
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from main import Database, SEARCH_LIMIT
+from pool import ConnectionPool
+from load_data import SCHEMA_VERSION
+from generate_data import generate_database
+
+# A benchmark counts as a regression when its median is this much slower
+# than in the file passed to --compare.
+REGRESSION_THRESHOLD = 0.20
+
+def summarize(timings_ms):
+    ordered = sorted(timings_ms)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return {
+        "runs": len(ordered),
+        "median_ms": round(statistics.median(ordered), 4),
+        "mean_ms": round(statistics.fmean(ordered), 4),
+        "p95_ms": round(p95, 4),
+        "max_ms": round(ordered[-1], 4),
+    }
+
+def time_calls(fn, params, repeat):
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        fn(params[i % len(params)])
+        timings.append((time.perf_counter() - start) * 1000)
+    return summarize(timings)
+
+def sample_column(cursor, sql, rng, k):
+    cursor.execute(sql)
+    values = [row[0] for row in cursor.fetchall()]
+    if not values:
+        return [None]
+    return rng.sample(values, min(k, len(values)))
+
+def bench_reports(db, rng, args):
+    repeat = args.repeat
+    cursor = db.connection.cursor()
+    projects = sample_column(cursor, "SELECT projID FROM PROJECT", rng, repeat)
+    grants = sample_column(cursor, "SELECT grantID FROM GRANT", rng, repeat)
+    equipment = sample_column(cursor, "SELECT equipID FROM EQUIPMENT", rng, repeat)
+    windows = []
+    for _ in range(repeat):
+        start = date(2010, 1, 1) + timedelta(days=rng.randrange(5000))
+        windows.append((start.isoformat(), (start + timedelta(days=rng.randint(30, 730))).isoformat()))
+
+    cases = [
+        ("projMem.project_status", db.report_project_status, projects),
+        ("projMem.grant_members", db.report_grant_members, grants),
+        ("projMem.project_mentorships", db.report_project_mentorships, projects),
+        ("equipment.current_usage", lambda e: db.report_current_usage("equipID", e), equipment),
+        ("equipment.status", db.report_equipment_status, equipment),
+        ("equipment.members", db.report_equipment_members, equipment),
+        ("grant.top_publishers", lambda n: db.report_top_publishers(n), [10]),
+        ("grant.avg_student_publications", lambda _: db.report_avg_student_publications(), [None]),
+        ("grant.active_funded_projects", lambda w: db.report_active_funded_projects(*w), windows),
+        ("grant.prolific_members", db.report_prolific_members, grants),
+        # Ten years of months split by source, in place of 120 active_funded_projects calls.
+        ("grant.funding_series", lambda w: db.report_funding_series(w[0], w[1]),
+         [(start, f"{int(start[:4]) + 10}{start[4:]}") for start, _ in windows]),
+    ]
+
+    # The plain names time the queries themselves, so the result cache is
+    # off for them; the cache.* names time cache hits on the same grant
+    # reports, after one warming call per parameter that fits in the cache.
+    results = {}
+    db.REPORT_CACHE_SIZE = 0
+    for name, fn, params in cases:
+        results[name] = time_calls(fn, params, repeat)
+        print(f"   {name:.<40} median {results[name]['median_ms']:>9.3f} ms")
+    del db.REPORT_CACHE_SIZE
+    for name, fn, params in cases:
+        if not name.startswith("grant."):
+            continue
+        params = list(dict.fromkeys(params))[:db.REPORT_CACHE_SIZE]
+        for param in params:
+            fn(param)
+        db.cache_hits = db.cache_misses = 0
+        stats = results[f"cache.{name}"] = time_calls(fn, params, repeat)
+        stats["hits"], stats["misses"] = db.cache_hits, db.cache_misses
+        stats["hit_rate"] = round(db.cache_hits / max(1, db.cache_hits + db.cache_misses), 4)
+        print(f"   {'cache.' + name:.<40} median {stats['median_ms']:>9.3f} ms, "
+              f"{stats['hits']} hits / {stats['misses']} misses")
+    return results
+
+def bench_writes(db, rng, args):
+    repeat = args.repeat
+    # Mirrors the menus: one statement and one commit per operation.
+    conn = db.connection
+    cursor = conn.cursor()
+    cursor.execute("SELECT memID FROM MEMBER")
+    members = [row[0] for row in cursor.fetchall()]
+    equip_id = "qbnch"
+    cursor.execute("DELETE FROM USES WHERE equipID = ?", (equip_id,))
+    cursor.execute("DELETE FROM EQUIPMENT WHERE equipID = ?", (equip_id,))
+    cursor.execute("INSERT INTO EQUIPMENT (equipID, name, type, purchaseDate) "
+                   "VALUES (?, 'Bench Rig', 'Benchmark', '2020-01-01')", (equip_id,))
+    conn.commit()
+
+    keys = []
+    day = date(1990, 1, 1)
+    for _ in range(repeat):
+        keys.append((rng.choice(members), equip_id, day.isoformat(), (day + timedelta(days=1)).isoformat()))
+        day += timedelta(days=3)
+
+    def run(label, sql, make_params):
+        timings = []
+        for key in keys:
+            start = time.perf_counter()
+            cursor.execute(sql, make_params(key))
+            conn.commit()
+            timings.append((time.perf_counter() - start) * 1000)
+        stats = summarize(timings)
+        stats["ops_per_sec"] = round(len(timings) / (sum(timings) / 1000), 1)
+        print(f"   {label:.<40} {stats['ops_per_sec']:>9,.1f} ops/sec")
+        return stats
+
+    try:
+        return {
+            "write.insert_usage": run(
+                "write.insert_usage",
+                "INSERT INTO USES (memID, equipID, purpose, startDate, endDate) VALUES (?, ?, 'bench', ?, ?)",
+                lambda k: k),
+            "write.update_usage": run(
+                "write.update_usage",
+                "UPDATE USES SET purpose = 'bench update' WHERE memID = ? AND equipID = ? AND startDate = ?",
+                lambda k: k[:3]),
+            "write.delete_usage": run(
+                "write.delete_usage",
+                "DELETE FROM USES WHERE memID = ? AND equipID = ? AND startDate = ?",
+                lambda k: k[:3]),
+        }
+    finally:
+        conn.rollback()
+        cursor.execute("DELETE FROM USES WHERE equipID = ?", (equip_id,))
+        cursor.execute("DELETE FROM EQUIPMENT WHERE equipID = ?", (equip_id,))
+        conn.commit()
+
+SCAN_OVERLAP_CHECK = """
+    SELECT COUNT(DISTINCT u.memID)
+    FROM USES u
+    WHERE u.equipID = ?
+      AND NOT (u.endDate < ? OR u.startDate > ?)
+"""
+
+RTREE_OVERLAP_CHECK = """
+    SELECT COUNT(DISTINCT i.memID)
+    FROM USES_INTERVAL i
+    WHERE i.equipMin <= (SELECT rowid FROM EQUIPMENT WHERE equipID = ?1)
+      AND i.equipMax >= (SELECT rowid FROM EQUIPMENT WHERE equipID = ?1)
+      AND i.startDay <= CAST(julianday(?3) AS INTEGER)
+      AND i.endDay >= CAST(julianday(?2) AS INTEGER)
+"""
+
+def lane_intervals(first_day, count):
+    # Three back-to-back lanes of 2-day bookings, so at most three overlap.
+    for n in range(count):
+        start = first_day + timedelta(days=(n // 3) * 3)
+        yield n % 3, start.isoformat(), (start + timedelta(days=1)).isoformat()
+
+def bench_booking(db, rng, args):
+    # Runs on a scratch copy so the history rows never touch the real database.
+    workdir = tempfile.mkdtemp()
+    scratch = sqlite3.connect(os.path.join(workdir, "booking.db"))
+    results = {}
+    try:
+        db.connection.backup(scratch)
+        scratch.execute("PRAGMA foreign_keys = ON")
+        cursor = scratch.cursor()
+        cursor.execute("SELECT memID FROM MEMBER LIMIT 3")
+        lane_members = [row[0] for row in cursor.fetchall()]
+
+        for n, size in enumerate(args.history):
+            equip_id = f"qb{n:03d}"
+            cursor.execute("INSERT INTO EQUIPMENT (equipID, name, type, purchaseDate) "
+                           "VALUES (?, 'Booking Rig', 'Benchmark', '1700-01-01')", (equip_id,))
+            history_start = date(1700, 1, 1)
+            cursor.executemany(
+                "INSERT INTO USES (memID, equipID, purpose, startDate, endDate) VALUES (?, ?, 'history', ?, ?)",
+                ((lane_members[lane], equip_id, start, end)
+                 for lane, start, end in lane_intervals(history_start, size)))
+            scratch.commit()
+            history_days = (size // 3) * 3
+
+            bookings = list(lane_intervals(history_start + timedelta(days=history_days + 3), args.repeat))
+            timings = []
+            for lane, start, end in bookings:
+                began = time.perf_counter()
+                cursor.execute("INSERT INTO USES (memID, equipID, purpose, startDate, endDate) "
+                               "VALUES (?, ?, 'booking', ?, ?)", (lane_members[lane], equip_id, start, end))
+                scratch.commit()
+                timings.append((time.perf_counter() - began) * 1000)
+            stats = summarize(timings)
+            stats["ops_per_sec"] = round(len(timings) / (sum(timings) / 1000), 1)
+            results[f"booking.insert_h{size}"] = stats
+
+            windows = []
+            for _ in range(args.repeat):
+                start = history_start + timedelta(days=rng.randrange(max(1, history_days)))
+                windows.append((equip_id, start.isoformat(), (start + timedelta(days=7)).isoformat()))
+            results[f"booking.scan_check_h{size}"] = time_calls(
+                lambda w: cursor.execute(SCAN_OVERLAP_CHECK, w).fetchone(), windows, args.repeat)
+            results[f"booking.rtree_check_h{size}"] = time_calls(
+                lambda w: cursor.execute(RTREE_OVERLAP_CHECK, w).fetchone(), windows, args.repeat)
+
+            print(f"   history {size:>8,}: {stats['ops_per_sec']:>9,.1f} bookings/sec, overlap check "
+                  f"{results[f'booking.scan_check_h{size}']['median_ms']:.3f} ms scan vs "
+                  f"{results[f'booking.rtree_check_h{size}']['median_ms']:.3f} ms R*Tree")
+    finally:
+        scratch.close()
+        shutil.rmtree(workdir)
+    return results
+
+def bench_stress(db, rng, args):
+    # Reader threads run the reports while writer threads book equipment, all
+    # through one ConnectionPool on a scratch copy of the database.
+    workdir = tempfile.mkdtemp()
+    path = os.path.join(workdir, "stress.db")
+    scratch = sqlite3.connect(path)
+    db.connection.backup(scratch)
+    scratch.close()
+    pool = ConnectionPool(path)
+
+    def sample(sql):
+        return pool.read(lambda conn: [row[0] for row in conn.execute(sql).fetchall()]) or [None]
+
+    lane_members = sample("SELECT memID FROM MEMBER LIMIT 3")
+    projects = sample("SELECT projID FROM PROJECT")
+    grants = sample("SELECT grantID FROM GRANT")
+    equipment = sample("SELECT equipID FROM EQUIPMENT")
+    writer_equipment = [f"qs{n:03d}" for n in range(args.writers)]
+    pool.write(lambda conn: conn.executemany(
+        "INSERT INTO EQUIPMENT (equipID, name, type, purchaseDate) "
+        "VALUES (?, 'Stress Rig', 'Benchmark', '1700-01-01')", [(e,) for e in writer_equipment]))
+
+    timings = {"read": [], "write": []}
+    errors = []
+    record_lock = threading.Lock()
+
+    def record(kind, began, error=None):
+        elapsed = (time.perf_counter() - began) * 1000
+        with record_lock:
+            timings[kind].append(elapsed)
+            if error is not None:
+                errors.append(f"{kind}: {error}")
+
+    def reader(n):
+        local_rng = random.Random(args.seed + n)
+        reports = Database(connection=pool.reader())
+        cases = [
+            (reports.report_grant_members, grants),
+            (reports.report_project_mentorships, projects),
+            (lambda e: reports.report_current_usage("equipID", e), equipment),
+            (reports.report_equipment_members, equipment),
+            (reports.report_top_publishers, [10]),
+            (reports.report_prolific_members, grants),
+        ]
+        for _ in range(args.repeat):
+            fn, params = local_rng.choice(cases)
+            value = local_rng.choice(params)
+            began = time.perf_counter()
+            try:
+                pool.read(lambda conn: fn(value))
+                record("read", began)
+            except sqlite3.Error as e:
+                record("read", began, e)
+
+    def writer(n):
+        equip_id = writer_equipment[n]
+        for lane, start, end in lane_intervals(date(1700, 1, 1), args.repeat):
+            began = time.perf_counter()
+            try:
+                pool.write(lambda conn: conn.execute(
+                    "INSERT INTO USES (memID, equipID, purpose, startDate, endDate) "
+                    "VALUES (?, ?, 'stress', ?, ?)", (lane_members[lane], equip_id, start, end)))
+                record("write", began)
+            except sqlite3.Error as e:
+                record("write", began, e)
+
+    threads = ([threading.Thread(target=reader, args=(n,)) for n in range(args.readers)] +
+               [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)])
+    began = time.perf_counter()
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        wall = time.perf_counter() - began
+        pool.close()
+        shutil.rmtree(workdir)
+
+    results = {}
+    for kind, label in (("read", "reports"), ("write", "bookings")):
+        if not timings[kind]:
+            continue
+        stats = summarize(timings[kind])
+        stats["ops_per_sec"] = round(len(timings[kind]) / wall, 1)
+        results[f"stress.{kind}"] = stats
+        print(f"   {label:.<40} {stats['ops_per_sec']:>9,.1f} ops/sec, "
+              f"p95 {stats['p95_ms']:.3f} ms")
+    results["stress.errors"] = {"count": len(errors), "first": errors[:5]}
+    print(f"   {args.readers} reader / {args.writers} writer threads, {len(errors)} errors")
+    return results
+
+def bench_memory(db, rng, args):
+    # The same reports and bookings against a scratch copy opened from disk,
+    # then in memory with each durability setting. The flush interval is
+    # longer than the run, so flush mode times one flush at close.
+    workdir = tempfile.mkdtemp()
+    results = {}
+    try:
+        cursor = db.connection.cursor()
+        grants = sample_column(cursor, "SELECT grantID FROM GRANT", rng, args.repeat)
+        projects = sample_column(cursor, "SELECT projID FROM PROJECT", rng, args.repeat)
+        for mode in ("disk", "write-through", "flush"):
+            path = os.path.join(workdir, f"{mode}.db")
+            scratch = sqlite3.connect(path)
+            db.connection.backup(scratch)
+            scratch.close()
+            with contextlib.redirect_stdout(io.StringIO()):
+                subject = Database(path, memory=None if mode == "disk" else mode, flush_interval=3600)
+            subject.REPORT_CACHE_SIZE = 0
+            cases = [
+                ("grant_members", subject.report_grant_members, grants),
+                ("project_mentorships", subject.report_project_mentorships, projects),
+                ("top_publishers", lambda n: subject.report_top_publishers(n), [10]),
+                ("prolific_members", subject.report_prolific_members, grants),
+            ]
+            for name, fn, params in cases:
+                results[f"memory.{mode}.{name}"] = time_calls(fn, params, args.repeat)
+
+            subject.insert_row("EQUIPMENT", {"equipID": "qmem0", "name": "Memory Rig", "type": "Benchmark",
+                                             "purchaseDate": "1700-01-01"})
+            subject.connection.commit()
+            lane_members = sample_column(cursor, "SELECT memID FROM MEMBER LIMIT 3", rng, 3)
+            timings = []
+            for lane, start, end in lane_intervals(date(1700, 1, 1), args.repeat):
+                began = time.perf_counter()
+                subject.insert_row("USES", {"memID": lane_members[lane], "equipID": "qmem0",
+                                            "purpose": "memory", "startDate": start, "endDate": end})
+                subject.connection.commit()
+                timings.append((time.perf_counter() - began) * 1000)
+            stats = summarize(timings)
+            stats["ops_per_sec"] = round(len(timings) / (sum(timings) / 1000), 1)
+            results[f"memory.{mode}.booking"] = stats
+
+            began = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                subject.close()
+            results[f"memory.{mode}.close"] = {"seconds": round(time.perf_counter() - began, 4)}
+            report_ms = statistics.fmean(results[f"memory.{mode}.{name}"]["median_ms"] for name, _, _ in cases)
+            print(f"   {mode:.<16} reports {report_ms:>8.3f} ms median avg, "
+                  f"bookings {stats['ops_per_sec']:>9,.1f} ops/sec, "
+                  f"close {results[f'memory.{mode}.close']['seconds']:.3f}s")
+    finally:
+        shutil.rmtree(workdir)
+    return results
+
+# What a keyword search costs without the FTS5 index: every title and venue
+# is scanned, and the matches come back in table order.
+LIKE_SEARCH = """
+    SELECT p.pubID, p.title, p.venue, p.year,
+        (SELECT group_concat(TRIM(m.fName || ' ' || COALESCE(m.lName, '')), ', ')
+         FROM AUTHORED_BY a
+         JOIN MEMBER m ON m.memID = a.memID
+         WHERE a.pubID = p.pubID) AS authors
+    FROM PUBLICATION p
+    WHERE p.title LIKE ?1 OR p.venue LIKE ?1
+    LIMIT ?2
+"""
+
+def bench_search(db, rng, args):
+    # Ranked FTS5 search against a LIKE '%term%' scan for words found in many
+    # publications, words found in one, and a word found in none. The words
+    # come from the index's own vocabulary; they are porter stems, which LIKE
+    # still finds inside the full words.
+    cursor = db.connection.cursor()
+    cursor.execute("CREATE VIRTUAL TABLE IF NOT EXISTS temp.publication_vocab "
+                   "USING fts5vocab(main, 'PUBLICATION_FTS', 'row')")
+    try:
+        cursor.execute("SELECT term FROM temp.publication_vocab WHERE term GLOB '[a-z]*' "
+                       "ORDER BY doc DESC LIMIT 10")
+        common = [row[0] for row in cursor.fetchall()]
+        rare = sample_column(cursor, "SELECT term FROM temp.publication_vocab WHERE doc = 1", rng, args.repeat)
+    finally:
+        cursor.execute("DROP TABLE temp.publication_vocab")
+    cursor.execute("SELECT COUNT(*) FROM PUBLICATION")
+    publications = cursor.fetchone()[0]
+
+    results = {}
+    db.REPORT_CACHE_SIZE = 0
+    try:
+        for kind, terms in (("common", common), ("rare", rare), ("missing", ["zzqxj"])):
+            if not terms or terms == [None]:
+                continue
+            results[f"search.fts.{kind}"] = time_calls(
+                lambda term: db.report_search_publications(term, limit=SEARCH_LIMIT), terms, args.repeat)
+            results[f"search.like.{kind}"] = time_calls(
+                lambda term: cursor.execute(LIKE_SEARCH, (f"%{term}%", SEARCH_LIMIT)).fetchall(),
+                terms, args.repeat)
+            fts_ms = results[f"search.fts.{kind}"]["median_ms"]
+            like_ms = results[f"search.like.{kind}"]["median_ms"]
+            print(f"   {kind + ' words':.<16} {fts_ms:>9.3f} ms FTS5 vs {like_ms:>9.3f} ms LIKE "
+                  f"(LIKE/FTS5 {like_ms / fts_ms if fts_ms else float('inf'):,.2f}x) over {publications:,} publications")
+    finally:
+        del db.REPORT_CACHE_SIZE
+    return results
+
+SUITES = {
+    "reports": bench_reports,
+    "writes": bench_writes,
+    "booking": bench_booking,
+    "stress": bench_stress,
+    "memory": bench_memory,
+    "search": bench_search,
+}
+
+def table_counts(cursor):
+    counts = {}
+    for table_name in ("MEMBER", "PROJECT", "WORK_ON", "USES", "PUBLICATION", "AUTHORED_BY", "FUNDED_BY"):
+        cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+        counts[table_name] = cursor.fetchone()[0]
+    return counts
+
+def compare_results(current, previous_file):
+    previous = json.loads(Path(previous_file).read_text())["results"]
+    print("\n" + "-" * 60)
+    print(f"COMPARISON WITH {previous_file}")
+    print("-" * 60)
+    regressions = 0
+    for name, stats in current.items():
+        if name not in previous or "median_ms" not in stats:
+            continue
+        old, new = previous[name]["median_ms"], stats["median_ms"]
+        change = (new - old) / old if old else 0.0
+        flag = "REGRESSION" if change > REGRESSION_THRESHOLD else ""
+        regressions += bool(flag)
+        print(f"   {name:.<40} {old:>9.3f} -> {new:>9.3f} ms ({change:+.0%}) {flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark main.py's reports and write paths")
+    parser.add_argument("--db", default="bench.db", help="database to benchmark (default: bench.db)")
+    parser.add_argument("--generate", type=int, metavar="MEMBERS",
+                        help="generate a synthetic database of this many members first")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--repeat", type=int, default=50, help="calls per benchmark (default: 50)")
+    parser.add_argument("--suite", action="append", choices=sorted(SUITES),
+                        help="suite to run; may be repeated (default: all)")
+    parser.add_argument("--history", type=lambda text: [int(n) for n in text.split(",")],
+                        default=[1000, 10000],
+                        help="comma-separated USES history sizes for the booking suite (default: 1000,10000)")
+    parser.add_argument("--readers", type=int, default=4,
+                        help="report threads for the stress suite (default: 4)")
+    parser.add_argument("--writers", type=int, default=2,
+                        help="booking threads for the stress suite (default: 2)")
+    parser.add_argument("--out", default="bench_results.json", help="results file to write")
+    parser.add_argument("--compare", metavar="FILE", help="previous results file to compare against")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_database(args.db, args.generate, args.seed)
+    elif not Path(args.db).exists():
+        print(f"Database file '{args.db}' not found! Use --generate MEMBERS to create one.")
+        sys.exit(1)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        db = Database(args.db)
+    rng = random.Random(args.seed)
+
+    results = {}
+    try:
+        for suite in args.suite or list(SUITES):
+            print("\n" + "-" * 60)
+            print(f"SUITE: {suite}")
+            print("-" * 60)
+            results.update(SUITES[suite](db, rng, args))
+        counts = table_counts(db.connection.cursor())
+    finally:
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.close()
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "schema_version": SCHEMA_VERSION,
+        "sqlite_version": sqlite3.sqlite_version,
+        "python_version": platform.python_version(),
+        "repeat": args.repeat,
+        "table_counts": counts,
+        "results": results,
+    }
+    Path(args.out).write_text(json.dumps(report, indent=2) + "\n")
+    print(f"\nResults written to {args.out}")
+
+    if args.compare and compare_results(results, args.compare):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+import sqlite3
+import os
+import random
+import time
+import argparse
+from datetime import date, timedelta
+
+from load_data import (SCHEMA_VERSION, read_schema, create_tables, create_indexes, create_triggers,
+                       extract_index_statements, extract_triggers, print_summary, rebuild_derived_tables,
+                       remove_database)
+
+ALPHABET = "0123456789abcdefghijklmnopqrstuvwxyz"
+MAX_STUDENTS = 90000  # studentNo is CHECKed to BETWEEN 10000 AND 99999
+START = date(2010, 1, 1)
+TODAY = date(2026, 1, 1)
+
+FIRST_NAMES = ["Alice", "Robert", "Maria", "David", "Emily", "Michael", "Sarah", "James", "Lisa",
+               "John", "Emma", "Alan", "Priya", "Wei", "Omar", "Grace", "Nina", "Carlos"]
+LAST_NAMES = ["Johnson", "Chen", "Rodriguez", "Kim", "Watson", "Brown", "Davis", "Wilson",
+              "Martinez", "Smith", "Thompson", "Zhang", "Patel", "Nguyen", "Haddad", "Varga"]
+DEPARTMENTS = ["Computer Science", "Engineering", "Data Science", "Physics", "Biology"]
+MAJORS = ["Computer Science", "Data Science", "Engineering", "Physics", "Biology", "Mathematics"]
+LEVELS = ["Freshman", "Sophomore", "Junior", "Senior", "Masters", "PhD"]
+AFFILIATIONS = ["Stanford University", "MIT", "Google Research", "NIH", "CERN", "Bell Labs"]
+TOPICS = ["Machine Learning", "Quantum Computing", "Robotics", "Neural Networks", "Genomics",
+          "Distributed Systems", "Computer Vision", "NLP", "Optimization", "Materials"]
+VENUES = ["Nature", "Science", "ICML", "NeurIPS", "IEEE Robotics", "ACL Conference", "Cell"]
+SOURCES = ["National Science Foundation", "Department of Defense", "NIH",
+           "Google Research Grant", "Department of Energy", "DARPA"]
+EQUIPMENT_TYPES = [("GPU Server", "Computing"), ("Robot Arm", "Robotics"),
+                   ("Microscope", "Lab Equipment"), ("3D Printer", "Fabrication"),
+                   ("Oscilloscope", "Electronics"), ("Sequencer", "Lab Equipment")]
+
+def make_id(prefix, n):
+    digits = ""
+    for _ in range(4):
+        n, r = divmod(n, 36)
+        digits = ALPHABET[r] + digits
+    return prefix + digits
+
+def random_date(rng, start=START, end=TODAY):
+    return start + timedelta(days=rng.randrange((end - start).days))
+
+class LabGenerator:
+    def __init__(self, members, seed=42, uses_per_member=2.0, pubs_per_member=0.5):
+        self.rng = random.Random(seed)
+        self.uses_per_member = uses_per_member
+        self.pubs_per_member = pubs_per_member
+
+        n_faculty = max(1, members // 10)
+        n_students = min(members * 3 // 4, MAX_STUDENTS)
+        n_ext = max(0, members - n_faculty - n_students)
+        self.faculty = [make_id("f", i) for i in range(n_faculty)]
+        self.students = [make_id("s", i) for i in range(n_students)]
+        self.ext = [make_id("e", i) for i in range(n_ext)]
+        self.members = self.faculty + self.students + self.ext
+
+        self.projects = [make_id("p", i) for i in range(max(1, members // 10))]
+        self.grants = [f"{i:05d}" for i in range(min(100000, max(1, len(self.projects) // 3)))]
+        self.equipment = [make_id("q", i) for i in range(max(5, members // 50))]
+        self.n_publications = int(members * pubs_per_member)
+
+        # A few members write most papers, like in a real lab.
+        weights = [self.rng.paretovariate(1.5) for _ in self.members]
+        total = 0.0
+        self.author_weights = []
+        for weight in weights:
+            total += weight
+            self.author_weights.append(total)
+
+        self.leaders = {proj: self.rng.choice(self.faculty) for proj in self.projects}
+
+    def member_rows(self):
+        rng = self.rng
+        for mem_id in self.members:
+            mentor = mentor_start = None
+            if mem_id[0] == "s" and rng.random() < 0.7:
+                mentor = rng.choice(self.faculty)
+                mentor_start = random_date(rng, date(2015, 1, 1)).isoformat()
+            yield (rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES),
+                   random_date(rng).isoformat(), mem_id, mentor, mentor_start, None)
+
+    def project_rows(self):
+        rng = self.rng
+        for proj in self.projects:
+            start = random_date(rng)
+            months = rng.randint(6, 48)
+            end = start + timedelta(days=months * 30) if rng.random() < 0.7 else None
+            if end and end < TODAY:
+                status = "completed"
+            else:
+                status = "paused" if rng.random() < 0.15 else "active"
+            yield (self.leaders[proj], proj, f"{rng.choice(TOPICS)} Project {proj}", months,
+                   start.isoformat(), end.isoformat() if end else None, status)
+
+    def work_on_rows(self):
+        rng = self.rng
+        for proj, leader in self.leaders.items():
+            yield (leader, proj, "Lead", rng.randint(5, 25))
+        led = set(self.leaders.values())
+        for mem_id in self.members:
+            if mem_id in led:
+                continue
+            for proj in set(rng.sample(self.projects, min(len(self.projects), rng.randint(1, 3)))):
+                yield (mem_id, proj, rng.choice(["Research Asst", "Collaborator", "Advisor"]),
+                       rng.randint(2, 30))
+
+    def faculty_rows(self):
+        for mem_id in self.faculty:
+            yield (mem_id, self.rng.choice(DEPARTMENTS))
+
+    def student_rows(self):
+        for i, mem_id in enumerate(self.students):
+            yield (10000 + i, self.rng.choice(LEVELS), self.rng.choice(MAJORS), mem_id)
+
+    def extcollab_rows(self):
+        for mem_id in self.ext:
+            yield (mem_id, self.rng.choice(AFFILIATIONS),
+                   f"Researcher in {self.rng.choice(TOPICS).lower()}")
+
+    def grant_rows(self):
+        rng = self.rng
+        for grant in self.grants:
+            yield (grant, rng.choice(SOURCES), rng.randrange(50000, 2000000, 1000),
+                   random_date(rng).isoformat(), rng.choice([12, 24, 36, 48, 60]))
+
+    def funded_by_rows(self):
+        rng = self.rng
+        pairs = set()
+        for grant in self.grants:
+            pairs.add((rng.choice(self.projects), grant))
+        for proj in self.projects:
+            for _ in range(rng.choice([0, 1, 1, 2])):
+                pairs.add((proj, rng.choice(self.grants)))
+        return sorted(pairs)
+
+    def equipment_rows(self):
+        rng = self.rng
+        for equip in self.equipment:
+            name, kind = rng.choice(EQUIPMENT_TYPES)
+            status = "Retired" if rng.random() < 0.05 else "Available"
+            yield (equip, f"{name} {equip[1:]}", kind, random_date(rng).isoformat(), status)
+
+    def uses_rows(self):
+        # Up to three non-overlapping "lanes" per instrument keep every
+        # interval within the 3-concurrent-user cap enforced by the triggers.
+        rng = self.rng
+        per_equipment = max(1, int(len(self.members) * self.uses_per_member / len(self.equipment)))
+        for equip in self.equipment:
+            seen = set()
+            lanes = [START + timedelta(days=rng.randrange(60)) for _ in range(3)]
+            for n in range(per_equipment):
+                lane = n % 3
+                start = lanes[lane]
+                if start >= TODAY:
+                    continue
+                length = rng.randint(1, 60)
+                open_ended = start + timedelta(days=length) >= TODAY
+                end = None if open_ended else start + timedelta(days=length)
+                lanes[lane] = TODAY if open_ended else end + timedelta(days=rng.randint(1, 20))
+                mem_id = rng.choice(self.members)
+                if (mem_id, start) in seen:
+                    continue
+                seen.add((mem_id, start))
+                yield (mem_id, equip, f"{rng.choice(TOPICS)} experiments", start.isoformat(),
+                       end.isoformat() if end else None)
+
+    def publication_rows(self):
+        rng = self.rng
+        for i in range(self.n_publications):
+            published = random_date(rng)
+            yield (make_id("b", i), published.isoformat(),
+                   f"{rng.choice(TOPICS)} methods {i}", rng.choice(VENUES),
+                   published.month, published.year, f"10.5555/lab.{i}")
+
+    def authored_by_rows(self):
+        rng = self.rng
+        for i in range(self.n_publications):
+            authors = set(rng.choices(self.members, cum_weights=self.author_weights,
+                                      k=rng.randint(1, 5)))
+            for mem_id in authors:
+                yield (make_id("b", i), mem_id)
+
+    def tables(self):
+        return [
+            ("MEMBER", "fName, lName, joinDate, memID, mentorID, mentorStartDate, mentorEndDate", self.member_rows()),
+            ("PROJECT", "memID, projID, title, expDuration, startDate, endDate, statusProj", self.project_rows()),
+            ("WORK_ON", "memID, projID, roleWO, weeklyHours", self.work_on_rows()),
+            ("FACULTY", "memID, department", self.faculty_rows()),
+            ("STUDENT", "studentNo, academicLevel, major, memID", self.student_rows()),
+            ("EXTCOLLAB", "memID, affiliation, bio", self.extcollab_rows()),
+            ("GRANT", "grantID, source, budget, startDate, duration", self.grant_rows()),
+            ("FUNDED_BY", "projID, grantID", self.funded_by_rows()),
+            ("EQUIPMENT", "equipID, name, type, purchaseDate, status", self.equipment_rows()),
+            ("USES", "memID, equipID, purpose, startDate, endDate", self.uses_rows()),
+            ("PUBLICATION", "pubID, publicationDate, title, venue, month, year, DOI", self.publication_rows()),
+            ("AUTHORED_BY", "pubID, memID", self.authored_by_rows()),
+        ]
+
+def generate_database(db_file, members, seed=42, uses_per_member=2.0, pubs_per_member=0.5):
+    print("-" * 60)
+    print(f"GENERATING {members:,} MEMBERS INTO {db_file} (seed {seed})")
+    print("-" * 60)
+
+    schema = read_schema()
+    if schema is None:
+        return
+
+    if os.path.exists(db_file):
+        print(f"\nRemoving existing {db_file}...")
+        remove_database(db_file)
+
+    generator = LabGenerator(members, seed, uses_per_member, pubs_per_member)
+
+    conn = sqlite3.connect(db_file, isolation_level=None)
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA foreign_keys = OFF")
+    cursor.execute("PRAGMA journal_mode = MEMORY")
+    cursor.execute("PRAGMA synchronous = OFF")
+    cursor.execute("PRAGMA cache_size = -200000")
+
+    start = time.perf_counter()
+    cursor.execute("BEGIN")
+    print("\nCreating tables...")
+    created_tables = create_tables(cursor, schema)
+
+    print("\nGenerating rows...")
+    total_rows = 0
+    for table_name, columns, rows in generator.tables():
+        table_start = time.perf_counter()
+        qmarks = ", ".join(["?"] * len(columns.split(",")))
+        cursor.executemany(f"INSERT INTO {table_name} ({columns}) VALUES ({qmarks})", rows)
+        count = cursor.rowcount
+        total_rows += count
+        print(f"   {table_name:.<20} {count:>10,} rows in {time.perf_counter() - table_start:.2f}s")
+
+    create_indexes(cursor, extract_index_statements(schema))
+    rebuild_derived_tables(cursor)
+    create_triggers(cursor, extract_triggers(schema))
+    cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    cursor.execute("COMMIT")
+    cursor.execute("PRAGMA journal_mode = DELETE")
+
+    print_summary(cursor, created_tables)
+    conn.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"\nGenerated {total_rows:,} rows in {elapsed:.1f}s ({total_rows / elapsed:,.0f} rows/sec)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a synthetic lab database for benchmarking")
+    parser.add_argument("--members", type=int, default=10000,
+                        help="number of members, e.g. 10000, 100000 or 1000000 (default: 10000)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="lab.db", help="database file to write (default: lab.db)")
+    parser.add_argument("--uses-per-member", type=float, default=2.0,
+                        help="average USES rows per member (default: 2.0)")
+    parser.add_argument("--pubs-per-member", type=float, default=0.5,
+                        help="publications per member (default: 0.5)")
+    args = parser.parse_args()
+
+    generate_database(args.out, args.members, args.seed, args.uses_per_member, args.pubs_per_member)
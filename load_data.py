@@ -1,6 +1,130 @@
 import sqlite3
 import re
 import os
+import time
+import argparse
+
+# Bump whenever sql/sqlTables.sql changes so existing databases pick up the
+# new objects through `python3 load_data.py --migrate`.
+SCHEMA_VERSION = 9
+
+# Every (ancestor, descendant, depth) of the mentorship tree, including each
+# member as its own ancestor at depth 0. The depth limit only stops a cycle
+# that predates the prevent_mentorship_cycle trigger from recursing forever.
+MENTOR_PATHS = """
+    WITH RECURSIVE paths(ancestorID, descendantID, depth) AS (
+        SELECT memID, memID, 0 FROM MEMBER
+        UNION ALL
+        SELECT m.mentorID, p.descendantID, p.depth + 1
+        FROM paths p
+        JOIN MEMBER m ON m.memID = p.ancestorID
+        WHERE m.mentorID IS NOT NULL AND p.depth < 1000
+    )"""
+
+# External-content FTS5 indexes and the table each one indexes. The index is
+# keyed by the source table's rowid, so like USES_INTERVAL it has to be
+# rebuilt if a VACUUM renumbers those rowids.
+FTS_INDEXES = {
+    "PUBLICATION_FTS": "PUBLICATION",
+    "EXTCOLLAB_FTS": "EXTCOLLAB",
+}
+
+# Tables maintained by triggers from other tables. Triggers are created after
+# the bulk data load, so these are rebuilt from their sources once the data is
+# in, and again whenever a migration creates them or --rebuild-derived is run.
+DERIVED_TABLE_REBUILDS = {
+    "USES_INTERVAL": [
+        "DELETE FROM USES_INTERVAL",
+        """INSERT INTO USES_INTERVAL (id, equipMin, equipMax, startDay, endDay, memID)
+           SELECT u.rowid, e.rowid, e.rowid,
+                  CAST(julianday(u.startDate) AS INTEGER),
+                  COALESCE(CAST(julianday(u.endDate) AS INTEGER), 2147483647),
+                  u.memID
+           FROM USES u
+           JOIN EQUIPMENT e ON e.equipID = u.equipID""",
+    ],
+    "ACTIVE_USES": [
+        "DELETE FROM ACTIVE_USES",
+        """INSERT INTO ACTIVE_USES (memID, equipID, startDate, endDate)
+           SELECT memID, equipID, startDate, endDate
+           FROM USES
+           WHERE endDate IS NULL OR endDate >= date('now')""",
+    ],
+    "EQUIPMENT_OCCUPANCY": [
+        "DELETE FROM EQUIPMENT_OCCUPANCY",
+        """INSERT INTO EQUIPMENT_OCCUPANCY (equipID, activeUsers)
+           SELECT equipID, COUNT(DISTINCT memID) FROM ACTIVE_USES GROUP BY equipID""",
+        """UPDATE EQUIPMENT
+           SET status = CASE
+               WHEN (SELECT COUNT(DISTINCT memID) FROM ACTIVE_USES a
+                     WHERE a.equipID = EQUIPMENT.equipID AND a.startDate <= date('now')
+                     AND (a.endDate IS NULL OR a.endDate >= date('now'))) >= 3 THEN 'In Use'
+               ELSE 'Available'
+           END
+           WHERE status <> 'Retired'""",
+    ],
+    "MEMBER_PUB_COUNT": [
+        "DELETE FROM MEMBER_PUB_COUNT",
+        """INSERT INTO MEMBER_PUB_COUNT (memID, pubCount)
+           SELECT memID, COUNT(*) FROM AUTHORED_BY GROUP BY memID""",
+    ],
+    "MENTOR_CLOSURE": [
+        "DELETE FROM MENTOR_CLOSURE",
+        f"""INSERT INTO MENTOR_CLOSURE (ancestorID, descendantID, depth)
+            {MENTOR_PATHS}
+            SELECT ancestorID, descendantID, depth FROM paths""",
+    ],
+}
+for fts_table in FTS_INDEXES:
+    DERIVED_TABLE_REBUILDS[fts_table] = [f"INSERT INTO {fts_table} ({fts_table}) VALUES ('rebuild')"]
+
+# Queries returning the rows where a derived table disagrees with its source,
+# as (key, stored value, expected value).
+DERIVED_TABLE_CHECKS = {
+    "USES_INTERVAL": """
+        SELECT u.rowid, i.id, u.rowid
+        FROM USES u
+        LEFT JOIN USES_INTERVAL i ON i.id = u.rowid
+        WHERE i.id IS NULL
+           OR i.startDay <> CAST(julianday(u.startDate) AS INTEGER)
+           OR i.endDay <> COALESCE(CAST(julianday(u.endDate) AS INTEGER), 2147483647)
+        UNION ALL
+        SELECT i.id, i.id, NULL
+        FROM USES_INTERVAL i
+        WHERE NOT EXISTS (SELECT 1 FROM USES u WHERE u.rowid = i.id)""",
+    "EQUIPMENT_OCCUPANCY": """
+        SELECT e.equipID, COALESCE(o.activeUsers, 0), COUNT(DISTINCT a.memID)
+        FROM EQUIPMENT e
+        LEFT JOIN EQUIPMENT_OCCUPANCY o ON o.equipID = e.equipID
+        LEFT JOIN ACTIVE_USES a ON a.equipID = e.equipID
+        GROUP BY e.equipID
+        HAVING COALESCE(o.activeUsers, 0) <> COUNT(DISTINCT a.memID)""",
+    "MEMBER_PUB_COUNT": """
+        SELECT a.memID, p.pubCount, a.expected
+        FROM (SELECT memID, COUNT(*) AS expected FROM AUTHORED_BY GROUP BY memID) a
+        LEFT JOIN MEMBER_PUB_COUNT p ON p.memID = a.memID
+        WHERE p.pubCount IS NULL OR p.pubCount <> a.expected
+        UNION ALL
+        SELECT p.memID, p.pubCount, 0
+        FROM MEMBER_PUB_COUNT p
+        WHERE NOT EXISTS (SELECT 1 FROM AUTHORED_BY a WHERE a.memID = p.memID)""",
+    "MENTOR_CLOSURE": f"""
+        {MENTOR_PATHS}
+        SELECT p.ancestorID || '>' || p.descendantID, c.depth, p.depth
+        FROM paths p
+        LEFT JOIN MENTOR_CLOSURE c
+            ON c.ancestorID = p.ancestorID AND c.descendantID = p.descendantID
+        WHERE c.depth IS NULL OR c.depth <> p.depth
+        UNION ALL
+        SELECT c.ancestorID || '>' || c.descendantID, c.depth, NULL
+        FROM MENTOR_CLOSURE c
+        WHERE NOT EXISTS (SELECT 1 FROM paths p
+                          WHERE p.ancestorID = c.ancestorID AND p.descendantID = c.descendantID)""",
+}
+# FTS5's integrity-check with rank 1 also compares the index with the content
+# table. It returns no rows and raises an error on a mismatch instead.
+for fts_table in FTS_INDEXES:
+    DERIVED_TABLE_CHECKS[fts_table] = f"INSERT INTO {fts_table} ({fts_table}, rank) VALUES ('integrity-check', 1)"
 
 def extract_triggers(sql_content):
     triggers = []
@@ -48,6 +172,147 @@ def extract_create_table_statements(sql_content):
     
     return statements
 
+def extract_virtual_table_statements(sql_content):
+    pattern = r'CREATE\s+VIRTUAL\s+TABLE\s+(\w+)\s+USING\s+.*?\);'
+    matches = re.finditer(pattern, sql_content, re.DOTALL | re.IGNORECASE)
+
+    statements = []
+    for match in matches:
+        statements.append((match.group(1), match.group(0)))
+
+    return statements
+
+def extract_index_statements(sql_content):
+    pattern = r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+(\w+)\s+ON\s+.*?;'
+    matches = re.finditer(pattern, sql_content, re.DOTALL | re.IGNORECASE)
+
+    statements = []
+    for match in matches:
+        index_name = match.group(1)
+        statements.append((index_name, match.group(0)))
+
+    return statements
+
+def strip_leading_comments(statement):
+    # Drops the -- lines and /* */ blocks in front of a statement, so it can
+    # be classified by its first keyword.
+    while True:
+        statement = statement.lstrip()
+        if statement.startswith('--'):
+            newline = statement.find('\n')
+            statement = '' if newline < 0 else statement[newline + 1:]
+        elif statement.startswith('/*'):
+            end = statement.find('*/')
+            statement = '' if end < 0 else statement[end + 2:]
+        else:
+            return statement
+
+def iter_sql_statements(path):
+    buffer = ""
+    with open(path, 'r') as f:
+        for line in f:
+            buffer += line
+            if ';' in line and sqlite3.complete_statement(buffer):
+                statement = buffer.strip()
+                buffer = ""
+                if statement:
+                    yield statement
+    if buffer.strip():
+        yield buffer.strip()
+
+def remove_database(db_file):
+    # A WAL database also has -wal and -shm files next to it; a stale -wal
+    # must not be replayed into the new database.
+    for path in (db_file, db_file + "-wal", db_file + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+
+def read_schema(schema_file='sql/sqlTables.sql'):
+    try:
+        with open(schema_file, 'r') as f:
+            return f.read()
+    except FileNotFoundError:
+        print(f"ERROR: {schema_file} not found!")
+        return None
+
+# With strict=True the create_* helpers below raise on the first failure
+# instead of printing FAIL and carrying on, so a load running in one
+# transaction can roll back.
+def create_tables(cursor, schema, strict=False):
+    schema_clean = clean_sql_for_sqlite(schema)
+    table_statements = extract_create_table_statements(schema_clean)
+
+    table_statements += extract_virtual_table_statements(schema)
+
+    created_tables = []
+    for table_name, statement in table_statements:
+        try:
+            cursor.execute(statement)
+            created_tables.append(table_name)
+            print(f"SUCCESS: {table_name}")
+        except sqlite3.Error as e:
+            print(f"FAIL: {table_name}: {e}")
+            if strict:
+                raise
+
+    return created_tables
+
+def print_summary(cursor, table_names):
+    print("\n" + "-" * 60)
+    print("DATABASE SUMMARY")
+    print("-" * 60)
+    for table_name in table_names:
+        cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+        count = cursor.fetchone()[0]
+        print(f"   {table_name:.<20} {count:>3} rows")
+
+def rebuild_derived_tables(cursor, table_names=None):
+    for table_name, statements in DERIVED_TABLE_REBUILDS.items():
+        if table_names is not None and table_name not in table_names:
+            continue
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+        print(f"REBUILT: {table_name} ({cursor.fetchone()[0]} rows)")
+
+def create_indexes(cursor, indexes, strict=False):
+    print("\n" + "-" * 60)
+    print("LOADING INDEXES")
+    print("-" * 60)
+
+    index_count = 0
+    for index_name, index_sql in indexes:
+        try:
+            cursor.execute(index_sql)
+            index_count += 1
+            print(f"SUCCESS: {index_name}")
+        except sqlite3.Error as e:
+            print(f"FAIL: {index_name}: {e}")
+            if strict:
+                raise
+
+    print(f"\nLoaded {index_count} indexes")
+    return index_count
+
+def create_triggers(cursor, triggers, strict=False):
+    print("\n" + "-" * 60)
+    print("LOADING TRIGGERS")
+    print("-" * 60)
+
+    trigger_count = 0
+    for trigger_name, trigger_sql in triggers:
+        try:
+            cursor.execute(trigger_sql)
+            trigger_count += 1
+            print(f"SUCCESS: {trigger_name}")
+        except sqlite3.Error as e:
+            print(f"FAIL: {trigger_name}: {e}")
+            if strict:
+                raise
+
+    print(f"\nLoaded {trigger_count} triggers")
+    return trigger_count
+
 def load_database():
     print("-" * 60)
     print("LOADING DATABASE")
@@ -55,37 +320,25 @@ def load_database():
 
     if os.path.exists('lab.db'):
         print("\nRemoving existing lab.db...")
-        os.remove('lab.db')
+        remove_database('lab.db')
 
     conn = sqlite3.connect('lab.db')
     cursor = conn.cursor()
     cursor.execute("PRAGMA foreign_keys = OFF")
 
     print("\n[1/4] Reading schema file...")
-    try:
-        with open('sql/sqlTables.sql', 'r') as f:
-            schema = f.read()
-    except FileNotFoundError:
-        print("ERROR: sql/sqlTables.sql not found!")
+    schema = read_schema()
+    if schema is None:
         return
 
-    print("[2/4] Extracting triggers...")
+    print("[2/4] Extracting triggers and indexes...")
     triggers = extract_triggers(schema)
     print(f"   Found {len(triggers)} triggers")
+    indexes = extract_index_statements(schema)
+    print(f"   Found {len(indexes)} indexes")
     
     print("\n[3/4] Creating tables...")
-    schema_clean = clean_sql_for_sqlite(schema)
-    table_statements = extract_create_table_statements(schema_clean)
-    
-    created_tables = []
-    for table_name, statement in table_statements:
-        try:
-            cursor.execute(statement)
-            created_tables.append(table_name)
-            print(f"SUCCESS: {table_name}")
-        except sqlite3.Error as e:
-            print(f"FAIL: {table_name}: {e}")
-    
+    created_tables = create_tables(cursor, schema)
     conn.commit()
     print(f"   Created {len(created_tables)} tables")
     
@@ -114,34 +367,291 @@ def load_database():
     cursor.execute("PRAGMA foreign_keys = ON")
     print(f"Executed {success} statements")
     
-    print("\n" + "-" * 60)
-    print("DATABASE SUMMARY")
-    print("-" * 60)
-    for table_name in created_tables:
-        cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
-        count = cursor.fetchone()[0]
-        print(f"   {table_name:.<20} {count:>3} rows")
+    print_summary(cursor, created_tables)
+
+    create_indexes(cursor, indexes)
+    rebuild_derived_tables(cursor)
+    conn.commit()
+
+    create_triggers(cursor, triggers)
+    cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    conn.commit()
+    conn.close()
     
     print("\n" + "-" * 60)
-    print("LOADING TRIGGERS")
+    print("Done. Run: python3 main.py")
+    print("-" * 60 + "\n")
+
+def stream_load_database(data_file='sql/sampleData.sql', cache_size_kb=200000):
     print("-" * 60)
-    
-    trigger_count = 0
-    for trigger_name, trigger_sql in triggers:
-        try:
-            cursor.execute(trigger_sql)
-            trigger_count += 1
-            print(f"SUCCESS: {trigger_name}")
-        except sqlite3.Error as e:
-            print(f"FAIL: {trigger_name}: {e}")
-    
-    conn.commit()
+    print("STREAMING BULK LOAD")
+    print("-" * 60)
+
+    if not os.path.exists(data_file):
+        print(f"ERROR: {data_file} not found!")
+        return
+
+    schema = read_schema()
+    if schema is None:
+        return
+
+    # The load builds a separate file that only replaces lab.db once it has
+    # committed, so a failed load leaves the existing database as it was.
+    db_file = 'lab.db'
+    loading_file = db_file + '.loading'
+    remove_database(loading_file)
+
+    conn = sqlite3.connect(loading_file, isolation_level=None)
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA foreign_keys = OFF")
+    cursor.execute("PRAGMA journal_mode = MEMORY")
+    cursor.execute("PRAGMA synchronous = OFF")
+    cursor.execute(f"PRAGMA cache_size = -{cache_size_kb}")
+
+    start = time.perf_counter()
+    cursor.execute("BEGIN")
+    try:
+        print("\n[1/4] Creating tables...")
+        created_tables = create_tables(cursor, schema, strict=True)
+
+        print(f"\n[2/4] Streaming {data_file}...")
+        statements = 0
+        rows = 0
+        for raw_statement in iter_sql_statements(data_file):
+            statement = strip_leading_comments(clean_sql_for_sqlite(raw_statement))
+            if not statement:
+                continue
+            if not statement.upper().startswith(('INSERT', 'UPDATE')):
+                raise ValueError(f"statement {statements + 1} is not an INSERT or UPDATE:\n{statement[:200]}")
+            try:
+                cursor.execute(statement)
+            except sqlite3.Error as e:
+                raise sqlite3.Error(f"statement {statements + 1}: {e}\n{statement[:200]}")
+            statements += 1
+            if statement.upper().startswith('INSERT'):
+                rows += cursor.rowcount
+        load_seconds = time.perf_counter() - start
+
+        print("\n[3/4] Building deferred indexes...")
+        create_indexes(cursor, extract_index_statements(schema), strict=True)
+        rebuild_derived_tables(cursor)
+
+        print("\n[4/4] Building deferred triggers...")
+        create_triggers(cursor, extract_triggers(schema), strict=True)
+
+        # Foreign keys are off for the load, so check them once at the end.
+        cursor.execute("PRAGMA foreign_key_check")
+        violations = cursor.fetchall()
+        if violations:
+            table_name, rowid, parent, _ = violations[0]
+            raise sqlite3.IntegrityError(f"{len(violations)} foreign key violation(s), first: "
+                                         f"{table_name} rowid {rowid} has no matching {parent} row")
+
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        cursor.execute("COMMIT")
+    except (sqlite3.Error, ValueError) as e:
+        cursor.execute("ROLLBACK")
+        conn.close()
+        remove_database(loading_file)
+        print(f"\nLoad aborted, {db_file} was left unchanged: {e}")
+        return
+
+    total_seconds = time.perf_counter() - start
+    cursor.execute("PRAGMA journal_mode = DELETE")
+    cursor.execute("PRAGMA synchronous = FULL")
+    cursor.execute("PRAGMA foreign_keys = ON")
+
+    print_summary(cursor, created_tables)
     conn.close()
-    
-    print(f"\nLoaded {trigger_count} triggers")
+
+    # The old database's -wal and -shm files must not be read with the new one.
+    for path in (db_file + "-wal", db_file + "-shm"):
+        if os.path.exists(path):
+            os.remove(path)
+    os.replace(loading_file, db_file)
+
+    rate = rows / load_seconds if load_seconds > 0 else float('inf')
     print("\n" + "-" * 60)
+    print(f"Executed {statements} statements, inserted {rows} rows")
+    print(f"Data load: {load_seconds:.3f}s ({rate:,.0f} rows/sec)")
+    print(f"Total with indexes and triggers: {total_seconds:.3f}s")
     print("Done. Run: python3 main.py")
     print("-" * 60 + "\n")
 
+def normalize_sql(sql):
+    return re.sub(r'\s+', ' ', sql or '').strip().rstrip(';').strip().lower()
+
+def diff_schema(cursor, schema):
+    cursor.execute("SELECT type, name, sql FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'")
+    live = {(obj_type, name.lower()): sql for obj_type, name, sql in cursor.fetchall()}
+
+    desired = {}
+    for name, sql in extract_create_table_statements(clean_sql_for_sqlite(schema)):
+        desired[('table', name.lower())] = (name, sql)
+    for name, sql in extract_virtual_table_statements(schema):
+        desired[('table', name.lower())] = (name, sql)
+    for name, sql in extract_index_statements(schema):
+        desired[('index', name.lower())] = (name, sql)
+    for name, sql in extract_triggers(schema):
+        desired[('trigger', name.lower())] = (name, sql)
+
+    to_create = []
+    to_replace = []
+    for key, (name, sql) in desired.items():
+        if key not in live:
+            to_create.append((key[0], name, sql))
+        elif normalize_sql(live[key]) == normalize_sql(sql):
+            continue
+        elif key[0] == 'table':
+            print(f"WARNING: table {name} differs from the schema file; it needs a full rebuild to change")
+        else:
+            to_replace.append((key[0], name, sql))
+
+    to_drop = [(obj_type, name) for obj_type, name in live
+               if obj_type in ('index', 'trigger') and (obj_type, name) not in desired]
+
+    return to_create, to_replace, to_drop
+
+def migrate_database(db_file='lab.db', schema_file='sql/sqlTables.sql'):
+    print("-" * 60)
+    print("MIGRATING DATABASE")
+    print("-" * 60)
+
+    if not os.path.exists(db_file):
+        print(f"\n{db_file} not found, building it from scratch instead.")
+        load_database()
+        return
+
+    schema = read_schema(schema_file)
+    if schema is None:
+        return
+
+    conn = sqlite3.connect(db_file, isolation_level=None)
+    cursor = conn.cursor()
+    cursor.execute("PRAGMA user_version")
+    current_version = cursor.fetchone()[0]
+    print(f"\nDatabase schema version: {current_version}, latest: {SCHEMA_VERSION}")
+
+    if current_version > SCHEMA_VERSION:
+        print("ERROR: database is newer than this code; refusing to migrate.")
+        conn.close()
+        return
+
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        to_create, to_replace, to_drop = diff_schema(cursor, schema)
+        order = {'table': 0, 'index': 1, 'trigger': 2}
+
+        for obj_type, name in to_drop:
+            cursor.execute(f"DROP {obj_type.upper()} IF EXISTS {name}")
+            print(f"DROPPED: {obj_type} {name}")
+
+        # A derived table written by a changed trigger may have been kept
+        # differently before, so it is rebuilt once the triggers are in.
+        stale = {target.upper() for obj_type, _, sql in to_replace if obj_type == 'trigger'
+                 for target in re.findall(r'\b(?:INSERT\s+INTO|UPDATE|DELETE\s+FROM)\s+(\w+)', sql, re.I)}
+        stale &= set(DERIVED_TABLE_REBUILDS)
+
+        pending = [(obj_type, name, sql, True) for obj_type, name, sql in to_replace]
+        pending += [(obj_type, name, sql, False) for obj_type, name, sql in to_create]
+        for obj_type, name, sql, replace in sorted(pending, key=lambda item: order[item[0]]):
+            if replace:
+                cursor.execute(f"DROP {obj_type.upper()} {name}")
+            cursor.execute(sql)
+            print(f"{'REPLACED' if replace else 'CREATED'}: {obj_type} {name}")
+            if obj_type == 'table' and name in DERIVED_TABLE_REBUILDS:
+                rebuild_derived_tables(cursor, [name])
+        if stale:
+            rebuild_derived_tables(cursor, stale)
+
+        cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        cursor.execute("COMMIT")
+    except sqlite3.Error as e:
+        cursor.execute("ROLLBACK")
+        print(f"\nMigration failed, database left unchanged: {e}")
+        conn.close()
+        return
+
+    conn.close()
+    changes = len(to_create) + len(to_replace) + len(to_drop)
+    print("\n" + "-" * 60)
+    if changes:
+        print(f"Applied {changes} schema change(s); now at version {SCHEMA_VERSION}")
+    else:
+        print(f"Schema already up to date at version {SCHEMA_VERSION}")
+    print("-" * 60 + "\n")
+
+def verify_derived_tables(cursor, table_names=None):
+    mismatched = 0
+    for table_name, sql in DERIVED_TABLE_CHECKS.items():
+        if table_names and table_name not in table_names:
+            continue
+        try:
+            cursor.execute(sql)
+            rows = cursor.fetchall()
+        except sqlite3.DatabaseError as e:
+            if table_name not in FTS_INDEXES:
+                raise
+            rows = [(FTS_INDEXES[table_name], f"index out of date ({e})", "matching rows")]
+        if not rows:
+            print(f"OK: {table_name}")
+            continue
+        mismatched += len(rows)
+        print(f"MISMATCH: {table_name} ({len(rows)} rows)")
+        for key, stored, expected in rows[:10]:
+            print(f"   {key}: stored {stored}, expected {expected}")
+    return mismatched
+
+def verify_derived_database(db_file='lab.db', table_names=None):
+    if not os.path.exists(db_file):
+        print(f"ERROR: {db_file} not found!")
+        return None
+
+    conn = sqlite3.connect(db_file)
+    mismatched = verify_derived_tables(conn.cursor(), table_names)
+    conn.close()
+    if mismatched:
+        print(f"\n{mismatched} mismatched row(s). Run: python3 load_data.py --rebuild-derived")
+    return mismatched
+
+def rebuild_derived_database(db_file='lab.db', table_names=None):
+    if not os.path.exists(db_file):
+        print(f"ERROR: {db_file} not found!")
+        return
+
+    conn = sqlite3.connect(db_file, isolation_level=None)
+    cursor = conn.cursor()
+    cursor.execute("BEGIN IMMEDIATE")
+    try:
+        rebuild_derived_tables(cursor, table_names)
+        cursor.execute("COMMIT")
+    except sqlite3.Error as e:
+        cursor.execute("ROLLBACK")
+        print(f"Rebuild failed: {e}")
+    conn.close()
+
 if __name__ == "__main__":
-    load_database()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Build lab.db from the SQL files in sql/")
+    parser.add_argument("--stream", action="store_true",
+                        help="stream the data file in a single transaction with bulk-load PRAGMAs")
+    parser.add_argument("--migrate", action="store_true",
+                        help="upgrade an existing lab.db in place instead of rebuilding it")
+    parser.add_argument("--rebuild-derived", nargs="*", metavar="TABLE",
+                        help="recompute trigger-maintained tables (default: all) from their sources")
+    parser.add_argument("--verify-derived", nargs="*", metavar="TABLE",
+                        help="check trigger-maintained tables (default: all) against their sources")
+    parser.add_argument("--data", default="sql/sampleData.sql",
+                        help="SQL data file to load in --stream mode")
+    args = parser.parse_args()
+
+    if args.migrate:
+        migrate_database()
+    elif args.rebuild_derived is not None:
+        rebuild_derived_database(table_names=args.rebuild_derived or None)
+    elif args.verify_derived is not None:
+        if verify_derived_database(table_names=args.verify_derived or None) != 0:
+            raise SystemExit(1)
+    elif args.stream:
+        stream_load_database(args.data)
+    else:
+        load_database()
@@ -0,0 +1,127 @@
+import asyncio
+import sqlite3
+import sys
+import json
+import time
+import random
+import argparse
+from datetime import date
+from pathlib import Path
+
+from bench import summarize, lane_intervals
+
+async def request(reader, writer, method, path, body=None):
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write((f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+                  f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n").encode() + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        header = await reader.readline()
+        if header in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = header.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value)
+    return status, json.loads(await reader.readexactly(length))
+
+def sample_ids(db_file, rng, k=200):
+    conn = sqlite3.connect(db_file)
+    ids = {}
+    for name, sql in (("member", "SELECT memID FROM MEMBER"), ("project", "SELECT projID FROM PROJECT"),
+                      ("grant", "SELECT grantID FROM GRANT"), ("equipment", "SELECT equipID FROM EQUIPMENT")):
+        values = [row[0] for row in conn.execute(sql)]
+        ids[name] = rng.sample(values, min(k, len(values))) or ["none"]
+    ids["lane_members"] = [row[0] for row in conn.execute("SELECT memID FROM MEMBER LIMIT 3")]
+    conn.close()
+    return ids
+
+def read_paths(ids, rng):
+    return rng.choice([
+        lambda: f"/members/{rng.choice(ids['member'])}",
+        lambda: f"/reports/projMem.project_status?projID={rng.choice(ids['project'])}",
+        lambda: f"/reports/projMem.grant_members?grantID={rng.choice(ids['grant'])}",
+        lambda: f"/reports/equipment.members?equipID={rng.choice(ids['equipment'])}",
+        lambda: f"/reports/grant.top_publishers?limit=10",
+        lambda: f"/reports/grant.prolific_members?grantID={rng.choice(ids['grant'])}",
+    ])()
+
+async def worker(n, args, ids, counter, timings, failures):
+    rng = random.Random(args.seed + n)
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    equip_id = f"ql{n:03d}"
+    bookings = lane_intervals(date(1700, 1, 1), args.requests)
+    try:
+        if args.write_ratio:
+            await request(reader, writer, "POST", "/equipment",
+                          {"equipID": equip_id, "name": "Load Rig", "type": "Benchmark",
+                           "purchaseDate": "1700-01-01"})
+        while counter[0] < args.requests:
+            counter[0] += 1
+            if rng.random() < args.write_ratio:
+                kind = "write"
+                lane, start, end = next(bookings)
+                method, path = "POST", "/uses"
+                body = {"memID": ids["lane_members"][lane], "equipID": equip_id,
+                        "purpose": "load test", "startDate": start, "endDate": end}
+            else:
+                kind, method, path, body = "read", "GET", read_paths(ids, rng), None
+            began = time.perf_counter()
+            status, _ = await request(reader, writer, method, path, body)
+            timings[kind].append((time.perf_counter() - began) * 1000)
+            if status >= 400 and status != 404:
+                failures.append(f"{status} {method} {path}")
+    finally:
+        if args.write_ratio:
+            await request(reader, writer, "DELETE", f"/uses?column=equipID&value={equip_id}")
+            await request(reader, writer, "DELETE", f"/equipment/{equip_id}")
+        writer.close()
+
+async def run(args):
+    ids = sample_ids(args.db, random.Random(args.seed))
+    counter = [0]
+    timings = {"read": [], "write": []}
+    failures = []
+    began = time.perf_counter()
+    await asyncio.gather(*(worker(n, args, ids, counter, timings, failures)
+                           for n in range(args.concurrency)))
+    return time.perf_counter() - began, timings, failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test server.py on localhost")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--db", default="lab.db", help="the server's database, used to pick IDs")
+    parser.add_argument("--requests", type=int, default=2000, help="total requests (default: 2000)")
+    parser.add_argument("--concurrency", type=int, default=16, help="open connections (default: 16)")
+    parser.add_argument("--write-ratio", type=float, default=0.1,
+                        help="share of requests that book equipment (default: 0.1)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", help="write the results as JSON to this file")
+    args = parser.parse_args()
+
+    if not Path(args.db).exists():
+        print(f"Database file '{args.db}' not found!")
+        sys.exit(1)
+
+    elapsed, timings, failures = asyncio.run(run(args))
+    total = sum(len(t) for t in timings.values())
+    print(f"{total} requests in {elapsed:.2f}s ({total / elapsed:,.0f} req/sec), "
+          f"{args.concurrency} connections")
+    results = {"requests": total, "seconds": round(elapsed, 3), "req_per_sec": round(total / elapsed, 1),
+               "failures": len(failures)}
+    for kind, values in timings.items():
+        if values:
+            results[kind] = summarize(values)
+            print(f"   {kind:<6} {len(values):>7} median {results[kind]['median_ms']:.3f} ms, "
+                  f"p95 {results[kind]['p95_ms']:.3f} ms")
+    if failures:
+        print(f"{len(failures)} failed requests, e.g. {failures[0]}")
+    if args.out:
+        Path(args.out).write_text(json.dumps(results, indent=2) + "\n")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -1,37 +1,428 @@
 import sqlite3
 import sys
+import csv
+import json
+import time
+import argparse
+import contextlib
+from datetime import date
+from bisect import insort
+from itertools import chain, islice
+from collections import OrderedDict
 from pathlib import Path
+from load_data import SCHEMA_VERSION
+from pool import BUSY_TIMEOUT_MS, configure_connection
+from tracing import QueryTracer, TracedCursor, SLOW_QUERY_MS, SLOW_QUERY_LOG
+from memory import DURABILITY, FLUSH_INTERVAL, MemoryConnection, TracedMirroredCursor, open_memory
+
+# Parents before children, and WORK_ON before the member subtypes so the
+# check_member_has_project_* triggers see each member's assignments.
+IMPORT_ORDER = ["MEMBER", "PROJECT", "WORK_ON", "FACULTY", "STUDENT", "EXTCOLLAB",
+                "GRANT", "FUNDED_BY", "EQUIPMENT", "USES", "PUBLICATION", "AUTHORED_BY"]
+
+# PROJECT.memID names a FACULTY row, which is only imported after WORK_ON, so
+# an import holding both cannot commit from the start of PROJECT until FACULTY
+# is in. MEMBER.mentorID can name a member further down the same file, so
+# MEMBER is only committed once all of it is in.
+IMPORT_CYCLE = ("PROJECT", "WORK_ON", "FACULTY")
+
+def read_import_rows(path, fmt=None):
+    fmt = (fmt or Path(path).suffix.lstrip(".")).lower()
+    with open(path, "r", newline="") as f:
+        if fmt == "csv":
+            for row in csv.DictReader(f):
+                yield {k.strip(): (v if v != "" else None) for k, v in row.items()}
+        elif fmt in ("jsonl", "json", "ndjson"):
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Unsupported import format '{fmt}' (use csv or jsonl)")
+
+def matching_keys(rows, columns, path):
+    # Every row goes in through the first row's INSERT, so a JSONL row with
+    # other keys would silently lose some or NULL out the rest.
+    for row_no, row in enumerate(rows, 1):
+        if row.keys() != set(columns):
+            missing = [col for col in columns if col not in row]
+            extra = [str(col) for col in row if col not in columns]
+            raise ValueError(f"{path} row {row_no} has different columns from row 1"
+                             + (f"; missing {', '.join(missing)}" if missing else "")
+                             + (f"; extra {', '.join(extra)}" if extra else ""))
+        yield row
+
+# Report names accepted by the batch mode, mapped to their Database methods.
+REPORTS = {
+    "projMem.project_status": "report_project_status",
+    "projMem.grant_members": "report_grant_members",
+    "projMem.project_mentorships": "report_project_mentorships",
+    "projMem.mentees": "report_mentees",
+    "projMem.mentor_lineage": "report_mentor_lineage",
+    "equipment.current_usage": "report_current_usage",
+    "equipment.status": "report_equipment_status",
+    "equipment.members": "report_equipment_members",
+    "equipment.free_slots": "report_free_slots",
+    "grant.top_publishers": "report_top_publishers",
+    "grant.avg_student_publications": "report_avg_student_publications",
+    "grant.active_funded_projects": "report_active_funded_projects",
+    "grant.prolific_members": "report_prolific_members",
+    "grant.funding_series": "report_funding_series",
+    "grant.search_publications": "report_search_publications",
+    "grant.search_collaborators": "report_search_collaborators",
+}
+
+WRITE_OPS = ("insert", "update", "delete")
+
+# Length in months of each period report_funding_series can step by.
+SERIES_PERIODS = {"month": 1, "quarter": 3, "year": 12}
+
+# Keyword search: hits returned by default, the bm25 weights of a match in a
+# publication's title and venue, and the marks put around matched words in
+# snippets.
+SEARCH_LIMIT = 50
+PUBLICATION_WEIGHTS = (4.0, 1.0)
+HIGHLIGHT = ("[", "]")
+
+def fts_query(text):
+    # Plain words to an FTS5 query in which every word must match. Each word
+    # is quoted so characters like '-', ':' or '+' are not read as query
+    # syntax; a trailing * still asks for a prefix match.
+    terms = []
+    for word in str(text).split():
+        prefix = len(word) > 1 and word.endswith("*")
+        word = word.rstrip("*") if prefix else word
+        terms.append('"' + word.replace('"', '""') + '"' + ("*" if prefix else ""))
+    if not terms:
+        raise ValueError("give at least one word to search for")
+    return " ".join(terms)
+
+# uses_before_insert refuses a USES row once this many members have a usage
+# overlapping its dates; the scheduler applies the same rule.
+EQUIPMENT_USER_CAP = 3
+# USES_INTERVAL stores dates as CAST(julianday(date) AS INTEGER), which is
+# the Python ordinal plus this offset; open-ended usages end on OPEN_END_DAY.
+JULIAN_DAY_OFFSET = 1721424
+OPEN_END_DAY = 2147483647
+FREE_SLOT_LIMIT = 5
+
+def day_number(value):
+    return date.fromisoformat(str(value)).toordinal() + JULIAN_DAY_OFFSET
+
+def day_date(number):
+    return date.fromordinal(number - JULIAN_DAY_OFFSET).isoformat()
+
+def free_windows(intervals, days, first_day, limit=FREE_SLOT_LIMIT, mem_id=None):
+    # intervals are (startDay, endDay, memID) of one piece of equipment,
+    # sorted by startDay. A booking of `days` days starting on day s overlaps
+    # [a, b] when a - days + 1 <= s <= b, so each usage blocks that range of
+    # starts for its member. The trigger counts distinct members, so one
+    # member's ranges are merged first; a sweep over the range ends then
+    # finds the starts covered by fewer than EQUIPMENT_USER_CAP members.
+    # Returns up to `limit` runs of allowed starts as (first, last, users),
+    # last being None when the run has no end and users the most members
+    # already using the equipment at some start in the run.
+    blocked = {}
+    own_starts = set()
+    for start_day, end_day, member in intervals:
+        if member == mem_id:
+            own_starts.add(start_day)
+        low = max(start_day - days + 1, first_day)
+        if end_day < low:
+            continue
+        ranges = blocked.setdefault(member, [])
+        if ranges and low <= ranges[-1][1] + 1:
+            ranges[-1][1] = max(ranges[-1][1], end_day)
+        else:
+            ranges.append([low, end_day])
+
+    events = {}
+    for ranges in blocked.values():
+        for low, high in ranges:
+            events[low] = events.get(low, 0) + 1
+            events[high + 1] = events.get(high + 1, 0) - 1
+
+    runs = []
+    users = 0
+    day = first_day
+    for point in sorted(events) + [None]:
+        if point is None or point > day:
+            last = None if point is None or point > OPEN_END_DAY else point - 1
+            if users < EQUIPMENT_USER_CAP and day <= OPEN_END_DAY:
+                if runs and runs[-1][1] == day - 1:
+                    runs[-1] = [runs[-1][0], last, max(runs[-1][2], users)]
+                else:
+                    runs.append([day, last, users])
+            if point is None:
+                break
+            day = point
+        users += events[point]
+
+    windows = []
+    for first, last, users in runs:
+        # USES is keyed on (memID, equipID, startDate), so a member cannot
+        # start a second usage on the day one of theirs starts.
+        while first in own_starts and (last is None or first < last):
+            first += 1
+        if first not in own_starts:
+            windows.append((first, last, users))
+        if len(windows) >= limit:
+            break
+    return windows
+
+# Subtype table of a member, by the first letter of its memID.
+MEMBER_SUBTYPES = {"f": "FACULTY", "s": "STUDENT", "e": "EXTCOLLAB"}
+
+# Operation names the menus record query statistics under, per menu option.
+MENU_OPERATIONS = {
+    "projMem": {"1": "query_member", "2": "insert_member", "3": "delete_member", "4": "update_member",
+                "5": "query_project", "6": "insert_project", "7": "delete_project", "8": "update_project",
+                "9": "project_status", "10": "grant_members", "11": "project_mentorships",
+                "12": "mentees", "13": "mentor_lineage"},
+    "equipment": {"1": "query_equipment", "2": "insert_equipment", "3": "delete_equipment",
+                  "4": "update_equipment", "5": "query_usage", "6": "insert_usage", "7": "delete_usage",
+                  "8": "update_usage", "9": "status", "10": "members", "11": "free_slots"},
+    "grant": {"1": "top_publishers", "2": "avg_student_publications", "3": "active_funded_projects",
+              "4": "prolific_members", "5": "funding_series", "6": "search_publications",
+              "7": "search_collaborators"},
+}
+
+def read_batch_ops(path):
+    # JSONL with one operation per line, or a .json file holding a list.
+    # Blank lines and lines starting with '#' are skipped.
+    f = sys.stdin if path == "-" else open(path, "r")
+    try:
+        if path.endswith(".json"):
+            for line_no, op in enumerate(json.load(f), 1):
+                yield line_no, op
+            return
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line_no, line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+# Rows per page for the menus and for the streaming generators.
+PAGE_SIZE = 20
+
+def write_csv(path, columns, rows):
+    # rows may be a list or a generator of pages from a stream=True report.
+    f = sys.stdout if path == "-" else open(path, "w", newline="")
+    try:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for item in rows:
+            writer.writerows(item if isinstance(item, list) else [item])
+    finally:
+        if f is not sys.stdout:
+            f.close()
+
+def iter_pages(cursor, page_size=PAGE_SIZE):
+    while True:
+        page = cursor.fetchmany(page_size)
+        if not page:
+            return
+        yield page
+
+def format_row(row):
+    return " | ".join(str(v) if v is not None else "NULL" for v in row)
+
+def browse_pages(pages, show_row, header=None):
+    # Prints the first page straight away and prompts for the rest. Pages
+    # already shown are kept, so going back never re-runs the query; the next
+    # page is read one step ahead so the prompt knows whether there is one.
+    pages = iter(pages)
+    seen = []
+    more = True
+    index = 0
+    while True:
+        while more and len(seen) <= index + 1:
+            page = next(pages, None)
+            if page is None:
+                more = False
+            else:
+                seen.append(page)
+        if not seen:
+            return []
+
+        if header:
+            header()
+        for row in seen[index]:
+            show_row(row)
+
+        has_next = index + 1 < len(seen)
+        if not has_next and index == 0:
+            break
+        options = []
+        if has_next:
+            options.append("n: next")
+        if index > 0:
+            options.append("p: previous")
+        options.append("q: done")
+        command = input(f"Page {index + 1} ({', '.join(options)}): ").strip().lower()
+        if command == "n" and has_next:
+            index += 1
+        elif command == "p" and index > 0:
+            index -= 1
+        elif command in ("n", "p"):
+            print("No more pages that way.")
+        else:
+            break
+    return [row for page in seen for row in page]
 
 class Database:
-    def __init__(self, db_file='lab.db'):
+    # Room for the generated statements below plus the fixed report queries,
+    # so sqlite3 keeps all of them prepared on the connection.
+    STATEMENT_CACHE_SIZE = 256
+    # Most report results kept by report_rows(), least recently used first out.
+    REPORT_CACHE_SIZE = 128
+
+    def __init__(self, db_file='lab.db', connection=None, tracer=None, memory=None,
+                 flush_interval=FLUSH_INTERVAL):
+        self._catalog = {}
+        self._catalog_version = None
+        self._statements = {}
+        self._report_cache = OrderedDict()
+        self._cache_generation = None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.last_report_columns = None
+        self.tracer = tracer or QueryTracer()
+        self.operation = "startup"
+        if connection is not None:
+            # A connection handed out by a ConnectionPool, already configured;
+            # the pool's owner is responsible for the startup checks below.
+            self.connection = connection
+            self.tracer.attach(self)
+            self.cursor = self.new_cursor()
+            self._meta_cursor = connection.cursor()
+            return
         try:
-            self.connection = sqlite3.connect(db_file)
-            self.cursor = self.connection.cursor()
-            self.cursor.execute("PRAGMA foreign_keys = ON")
-            print(f"Successfully connected to {db_file}")
+            if memory:
+                # memory is one of memory.DURABILITY; reads are served from a
+                # :memory: copy and writes reach db_file as that setting says.
+                self.connection = open_memory(db_file, memory, flush_interval, self.STATEMENT_CACHE_SIZE)
+            else:
+                self.connection = sqlite3.connect(db_file, cached_statements=self.STATEMENT_CACHE_SIZE,
+                                                  timeout=BUSY_TIMEOUT_MS / 1000)
+                configure_connection(self.connection)
+            self.tracer.attach(self)
+            self.cursor = self.new_cursor()
+            self._meta_cursor = self.connection.cursor()
+            print(f"Successfully connected to {db_file}" + (f" (in memory, {memory})" if memory else ""))
+            self.cursor.execute("PRAGMA user_version")
+            if self.cursor.fetchone()[0] < SCHEMA_VERSION:
+                print("Schema is out of date. Run: python3 load_data.py --migrate")
         except sqlite3.Error as e:
             print(f"Error connecting to database: {e}")
             sys.exit(1)
 
-    def execute_query(self, table_name, pk_name, pk_value):
-        try:
-            sql = f"SELECT * FROM {table_name} WHERE {pk_name} = ?"
-            self.cursor.execute(sql, (pk_value,))
-            row = self.cursor.fetchall()
-        
-            if row is None:
-                print("No matching record found.")
+    def new_cursor(self):
+        cursor_class = TracedMirroredCursor if isinstance(self.connection, MemoryConnection) else TracedCursor
+        return self.connection.cursor(lambda conn: cursor_class(conn, self))
+
+    def schema_catalog(self):
+        # PRAGMA schema_version is bumped by every CREATE/DROP/ALTER, including
+        # ones made by other connections, so it is all we need to recheck.
+        self._meta_cursor.execute("PRAGMA schema_version")
+        version = self._meta_cursor.fetchone()[0]
+        if version != self._catalog_version:
+            self._meta_cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'")
+            catalog = {}
+            for (table_name,) in self._meta_cursor.fetchall():
+                self._meta_cursor.execute(f'PRAGMA table_info("{table_name}")')
+                catalog[table_name.upper()] = (table_name, self._meta_cursor.fetchall())
+            self._catalog = catalog
+            self._catalog_version = version
+            self._statements.clear()
+        return self._catalog
+
+    def table_info(self, table_name):
+        entry = self.schema_catalog().get(table_name.upper())
+        if entry is None:
+            raise sqlite3.OperationalError(f"no such table: {table_name}")
+        return entry[1]
+
+    def resolve_columns(self, table_name, columns):
+        entry = self.schema_catalog().get(table_name.upper())
+        if entry is None:
+            raise sqlite3.OperationalError(f"no such table: {table_name}")
+        names = {info[1].lower(): info[1] for info in entry[1]}
+        resolved = []
+        for col in columns:
+            name = names.get(str(col).strip().lower())
+            if name is None:
+                raise sqlite3.OperationalError(f"no such column: {table_name}.{col}")
+            resolved.append(name)
+        return entry[0], resolved
+
+    def statement(self, kind, table_name, columns=(), where=()):
+        # Keyed on what the caller passed, so a hit skips validation entirely;
+        # schema_catalog() clears this dict whenever the schema changes.
+        self.schema_catalog()
+        key = (kind, table_name.upper(), tuple(columns), tuple(where))
+        sql = self._statements.get(key)
+        if sql is not None:
+            return sql
+
+        table, cols = self.resolve_columns(table_name, columns)
+        _, keys = self.resolve_columns(table_name, where)
+        where_clause = " AND ".join(f"{col} = ?" for col in keys)
+        if kind == "select":
+            sql = f"SELECT {', '.join(cols) or '*'} FROM {table} WHERE {where_clause}"
+        elif kind == "insert":
+            sql = f"INSERT INTO {table} ({', '.join(cols)}) VALUES ({', '.join(['?'] * len(cols))})"
+        elif kind == "update":
+            sql = f"UPDATE {table} SET {', '.join(f'{col} = ?' for col in cols)} WHERE {where_clause}"
+        elif kind == "delete":
+            sql = f"DELETE FROM {table} WHERE {where_clause}"
+        elif kind == "page":
+            sql = (f"SELECT rowid, * FROM {table} WHERE {where_clause} AND rowid > ? "
+                   f"ORDER BY rowid LIMIT ?")
+        else:
+            raise ValueError(f"Unknown statement kind '{kind}'")
+        self._statements[key] = sql
+        return sql
+
+    def query_pages(self, table_name, pk_name, pk_value, page_size=PAGE_SIZE):
+        # Keyset pagination on rowid: each page starts after the last rowid of
+        # the previous one, so later pages cost the same as the first.
+        sql = self.statement("page", table_name, where=(pk_name,))
+        cursor = self.new_cursor()
+        last_rowid = -(2 ** 63)
+        while True:
+            cursor.execute(sql, (pk_value, last_rowid, page_size))
+            rows = cursor.fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            yield [row[1:] for row in rows]
+            if len(rows) < page_size:
                 return
 
-            columns = [desc[0] for desc in self.cursor.description]
-            print("" + " | ".join(columns))
-            print("-" * 50)
-            for r in row:
-                print(" | ".join(str(v) if v is not None else "NULL" for v in r))
+    def iter_query(self, table_name, pk_name, pk_value, page_size=PAGE_SIZE):
+        for page in self.query_pages(table_name, pk_name, pk_value, page_size):
+            yield from page
 
+    def execute_query(self, table_name, pk_name, pk_value, page_size=PAGE_SIZE):
+        try:
+            columns = [info[1] for info in self.table_info(table_name)]
+
+            def header():
+                print("" + " | ".join(columns))
+                print("-" * 50)
 
-            if table_name.upper() == "MEMBER":
-                mem_id = row[columns.index("memID")]
+            rows = browse_pages(self.query_pages(table_name, pk_name, pk_value, page_size),
+                                lambda r: print(format_row(r)), header)
+            if not rows:
+                print("No matching record found.")
+                return rows
+
+            if table_name.upper() == "MEMBER" and len(rows) == 1:
+                mem_id = rows[0][columns.index("memID")]
                 prefix = mem_id[0].lower()
             
                 if prefix == "f":
@@ -42,18 +433,18 @@ class Database:
                     child_table = "EXTCOLLAB"
                 else:
                     print("Unknown member type; cannot fetch child table info.")
-                    return
+                    return rows
 
-                self.cursor.execute(f"SELECT * FROM {child_table} WHERE memID = ?", (mem_id,))
+                self.cursor.execute(self.statement("select", child_table, where=("memID",)), (mem_id,))
                 child_row = self.cursor.fetchone()
                 if child_row:
                     child_columns = [desc[0] for desc in self.cursor.description]
                     print(f"--- {child_table} Info ---")
                     print(" | ".join(child_columns))
                     print("-" * 50)
-                    print(" | ".join(str(v) if v is not None else "NULL" for v in child_row))
+                    print(format_row(child_row))
 
-            return row
+            return rows
         except sqlite3.Error as e:
             print(f"Query error: {e}")
             return
@@ -62,8 +453,7 @@ class Database:
     def execute_insert(self, table_name):
         try:
             print("For NULL statements, just press enter/leave blank.")
-            self.cursor.execute(f"PRAGMA table_info({table_name})")
-            cols_info = self.cursor.fetchall()
+            cols_info = self.schema_catalog().get(table_name.upper(), (None, []))[1]
             if not cols_info:
                 print(f"Table '{table_name}' does not exist.")
                 return
@@ -94,59 +484,51 @@ class Database:
                     values.append(user_input)
                 col_names.append(name)
 
-            cols_str = ", ".join(col_names)
-            qmarks = ", ".join(["?"] * len(col_names))
-            sql = f"INSERT INTO {table_name} ({cols_str}) VALUES ({qmarks})"
-            self.cursor.execute(sql, values)
-            self.connection.commit()
-            print(f"Inserted into {table_name}.")
+            if table_name.upper() != "MEMBER":
+                sql = self.statement("insert", table_name, col_names)
+                self.cursor.execute(sql, values)
+                self.connection.commit()
+                print(f"Inserted into {table_name}.")
+                return
 
-            if table_name.upper() == "MEMBER":
-                mem_id_index = next((i for i, c in enumerate(col_names) if c == "memID"), None)
-                if mem_id_index is None:
-                    print("Error: memID not captured.")
+            # A member, its project assignments and its subtype row are
+            # collected first and inserted together, so nothing is left
+            # half-onboarded if a later step fails.
+            record = dict(zip(col_names, values))
+            mem_id = record.get("memID")
+            if not mem_id:
+                print("Error: memID not captured.")
+                return
+            child_table = MEMBER_SUBTYPES.get(mem_id[0].lower())
+            if child_table:
+                assigned_projects = []
+                while True:
+                    projID = input("Enter a project ID to assign this member (leave blank to finish): ").strip()
+                    if not projID:
+                        break
+                    assigned_projects.append(projID)
+                if not assigned_projects:
+                    print("Insert error: Member must be assigned to at least one project")
                     return
-                mem_id = values[mem_id_index]
-
-                prefix_map = {"f": "FACULTY", "s": "STUDENT", "e": "EXTCOLLAB"}
-                child_table = prefix_map.get(mem_id[0].lower())
-                if child_table:
-                    assigned_projects = []
-                    while True:
-                        projID = input("Enter a project ID to assign this member (leave blank to finish): ").strip()
-                        if not projID:
-                            break
-                        assigned_projects.append(projID)
-                    if not assigned_projects:
-                        print("Insert error: Member must be assigned to at least one project")
-                        self.connection.rollback()
+                record["projects"] = assigned_projects
+
+                details = {}
+                print(f"Completing {child_table} record:")
+                for cid, name, ctype, notnull, default, pk in self.table_info(child_table):
+                    if name == "memID":
+                        continue
+                    user_input = input(f"{name}: ").strip()
+                    if not user_input and notnull:
+                        print(f"ERROR: '{name}' is required.")
                         return
-                    for projID in assigned_projects:
-                        self.cursor.execute("INSERT INTO WORK_ON (memID, projID) VALUES (?, ?)", (mem_id, projID))
-                    self.connection.commit()
-                    print(f"Member {mem_id} assigned to projects: {', '.join(assigned_projects)}")
-
-                    self.cursor.execute(f"PRAGMA table_info({child_table})")
-                    child_cols_info = self.cursor.fetchall()
-                    child_col_names = []
-                    child_values = []
-                    print(f"Completing {child_table} record:")
-                    for cid, name, ctype, notnull, default, pk in child_cols_info:
-                        if name == "memID":
-                            child_col_names.append(name)
-                            child_values.append(mem_id)
-                            continue
-                        user_input = input(f"{name}: ").strip()
-                        if not user_input and notnull:
-                            print(f"ERROR: '{name}' is required.")
-                            return
-                        child_col_names.append(name)
-                        child_values.append(user_input if user_input else None)
-                    cols = ", ".join(child_col_names)
-                    qs = ", ".join(["?"] * len(child_col_names))
-                    self.cursor.execute(f"INSERT INTO {child_table} ({cols}) VALUES ({qs})", child_values)
-                    self.connection.commit()
-                    print(f"Successfully inserted into {child_table}.")
+                    details[name] = user_input if user_input else None
+                record["details"] = details
+
+            self.onboard_members([record])
+            print(f"Inserted into {table_name}.")
+            if child_table:
+                print(f"Member {mem_id} assigned to projects: {', '.join(record['projects'])}")
+                print(f"Successfully inserted into {child_table}.")
 
         except Exception as e:
             print(f"Insert error: {e}")
@@ -154,7 +536,7 @@ class Database:
 
     def execute_delete(self, table_name, pk_name, pk_value):
         try:
-            sql = f"DELETE FROM {table_name} WHERE {pk_name} = ?"
+            sql = self.statement("delete", table_name, where=(pk_name,))
             self.cursor.execute(sql, (pk_value,))
             self.connection.commit()
 
@@ -171,13 +553,7 @@ class Database:
                 print("No fields to update.")
                 return
 
-            set_clause = ", ".join(f"{col} = ?" for col in updates.keys())
-            sql = f"""
-                UPDATE {table_name}
-                SET {set_clause}
-                WHERE {pk_name} = ?
-            """
-
+            sql = self.statement("update", table_name, updates.keys(), (pk_name,))
             values = list(updates.values()) + [pk_value]
             self.cursor.execute(sql, values)
             self.connection.commit()
@@ -189,6 +565,877 @@ class Database:
         except sqlite3.Error as e:
             print(f"Update error: {e}")
 
+    def import_files(self, files, batch_size=1000, commit_size=0, fmt=None):
+        tables = {name.upper(): path for name, path in files.items()}
+        unknown = [name for name in tables if name not in IMPORT_ORDER]
+        if unknown:
+            print(f"Import error: unknown table(s) {', '.join(unknown)}")
+            return None
+
+        held = {"MEMBER"}
+        in_cycle = "PROJECT" in tables and "FACULTY" in tables
+        if in_cycle:
+            held.update(IMPORT_CYCLE)
+
+        imported = {}
+        uncommitted = 0
+        committed = 0
+        total_start = time.perf_counter()
+        try:
+            # Foreign keys are checked at commit so PROJECT/FACULTY/WORK_ON rows
+            # that reference each other can arrive in any order.
+            if not self.connection.in_transaction:
+                self.cursor.execute("BEGIN")
+            self.cursor.execute("PRAGMA defer_foreign_keys = ON")
+            for table_name in IMPORT_ORDER:
+                if table_name not in tables:
+                    continue
+                self.operation = f"import.{table_name}"
+                rows = read_import_rows(tables[table_name], fmt)
+                first = next(rows, None)
+                if first is None:
+                    print(f"{table_name}: no rows in {tables[table_name]}")
+                    continue
+                columns = list(first.keys())
+                _, resolved = self.resolve_columns(table_name, columns)
+                sql = self.statement("insert", table_name, resolved)
+                print(f"Importing {table_name} from {tables[table_name]}")
+
+                rows = matching_keys(chain([first], rows), columns, tables[table_name])
+                chunk_no = 0
+                imported[table_name] = 0
+                while True:
+                    chunk = [tuple(row.get(col) for col in columns) for row in islice(rows, batch_size)]
+                    if not chunk:
+                        break
+                    chunk_no += 1
+                    start = time.perf_counter()
+                    self.cursor.executemany(sql, chunk)
+                    uncommitted += len(chunk)
+                    if commit_size and uncommitted >= commit_size and table_name not in held:
+                        committed += self.commit_import(uncommitted)
+                        uncommitted = 0
+                    elapsed = time.perf_counter() - start
+                    imported[table_name] += len(chunk)
+                    rate = len(chunk) / elapsed if elapsed > 0 else float("inf")
+                    print(f"  chunk {chunk_no}: {len(chunk)} rows in {elapsed:.3f}s ({rate:,.0f} rows/sec)")
+
+                if commit_size and uncommitted >= commit_size and not (in_cycle and table_name in IMPORT_CYCLE[:2]):
+                    committed += self.commit_import(uncommitted)
+                    uncommitted = 0
+
+            self.connection.commit()
+        except (sqlite3.Error, ValueError, OSError) as e:
+            self.connection.rollback()
+            print(f"Import error: {e}")
+            print("Rows since the last commit were rolled back.")
+            if committed:
+                print(f"{committed} rows committed earlier by --commit-size stay in the database.")
+            return None
+
+        elapsed = time.perf_counter() - total_start
+        total = sum(imported.values())
+        rate = total / elapsed if elapsed > 0 else float("inf")
+        for table_name, count in imported.items():
+            print(f"   {table_name:.<20} {count:>8} rows")
+        print(f"Imported {total} rows in {elapsed:.3f}s ({rate:,.0f} rows/sec)")
+        return imported
+
+    def commit_import(self, rows):
+        self.connection.commit()
+        self.cursor.execute("BEGIN")
+        self.cursor.execute("PRAGMA defer_foreign_keys = ON")
+        return rows
+
+    def insert_row(self, table_name, values):
+        self.cursor.execute(self.statement("insert", table_name, values.keys()), list(values.values()))
+        return self.cursor.rowcount
+
+    def update_rows(self, table_name, pk_name, pk_value, updates):
+        if not updates:
+            raise ValueError("no fields to update")
+        sql = self.statement("update", table_name, updates.keys(), (pk_name,))
+        self.cursor.execute(sql, list(updates.values()) + [pk_value])
+        return self.cursor.rowcount
+
+    def check_foreign_keys(self, table_names):
+        # Deferred foreign keys are only checked by COMMIT, so a dry run that
+        # rolls back would never see them; this raises on them beforehand.
+        for table_name in table_names:
+            self.cursor.execute(f"PRAGMA foreign_key_check({table_name})")
+            violations = self.cursor.fetchall()
+            if violations:
+                _, rowid, parent, _ = violations[0]
+                raise sqlite3.IntegrityError(f"FOREIGN KEY constraint failed: {len(violations)} {table_name} "
+                                             f"row(s) with no matching {parent} row, first at rowid {rowid}")
+
+    def onboard_members(self, members, dry_run=False):
+        # Each member is a dict of MEMBER columns plus "projects" (projIDs, or
+        # dicts of WORK_ON columns) and "details" (columns of the FACULTY,
+        # STUDENT or EXTCOLLAB row picked by the memID prefix). All of them go
+        # in with one executemany per table and column set, in one
+        # transaction. Returns the rows inserted per table.
+        rows = {table_name: {} for table_name in ("MEMBER", "WORK_ON", *MEMBER_SUBTYPES.values())}
+        for number, member in enumerate(members, 1):
+            member = dict(member)
+            projects = member.pop("projects", None) or []
+            details = member.pop("details", None) or {}
+            mem_id = member.get("memID")
+            if not mem_id:
+                raise ValueError(f"member {number} has no memID")
+            subtype = MEMBER_SUBTYPES.get(str(mem_id)[:1].lower())
+            if subtype is None:
+                raise ValueError(f"{mem_id}: memID must start with f, s or e")
+            if not projects:
+                raise ValueError(f"{mem_id}: a member must be assigned to at least one project")
+            rows["MEMBER"].setdefault(tuple(member), []).append(tuple(member.values()))
+            for project in projects:
+                work_on = {"projID": project} if isinstance(project, str) else dict(project)
+                work_on["memID"] = mem_id
+                rows["WORK_ON"].setdefault(tuple(work_on), []).append(tuple(work_on.values()))
+            details = dict(details, memID=mem_id)
+            rows[subtype].setdefault(tuple(details), []).append(tuple(details.values()))
+
+        counts = {}
+        if not self.connection.in_transaction:
+            self.cursor.execute("BEGIN")
+        try:
+            # Members may name mentors onboarded in the same batch, so foreign
+            # keys are checked at commit. WORK_ON goes in before the subtype
+            # rows, whose check_member_has_project_* triggers look for it.
+            self.cursor.execute("PRAGMA defer_foreign_keys = ON")
+            for table_name, groups in rows.items():
+                counts[table_name] = 0
+                for columns, values in groups.items():
+                    self.cursor.executemany(self.statement("insert", table_name, columns), values)
+                    counts[table_name] += len(values)
+            self.check_foreign_keys(table_name for table_name in rows if counts[table_name])
+            if dry_run:
+                self.connection.rollback()
+            else:
+                self.connection.commit()
+        except BaseException:
+            self.connection.rollback()
+            raise
+        return counts
+
+    def usage_intervals(self, equipID=None, equip_type=None, first_day=0):
+        # {equipID: [(startDay, endDay, memID), ...]} for the given piece of
+        # equipment, or every one of equip_type, leaving out retired ones.
+        # Only usages still running on first_day are read, through the
+        # USES_INTERVAL R*Tree, sorted by startDay as free_windows needs.
+        column, value = ("equipID", equipID) if equipID else ("type", equip_type)
+        if not value:
+            raise ValueError("give an equipment ID or type")
+        where = f"e.{column} = ? AND e.status IS NOT 'Retired'"
+        self.cursor.execute(f"SELECT e.equipID FROM EQUIPMENT e WHERE {where} ORDER BY e.equipID", (value,))
+        intervals = {row[0]: [] for row in self.cursor.fetchall()}
+        if not intervals:
+            raise ValueError(f"no bookable equipment with {column} '{value}'")
+        # CROSS JOIN keeps EQUIPMENT as the outer loop, so the R*Tree is
+        # searched per piece of equipment instead of scanned on endDay alone.
+        self.cursor.execute(f"""SELECT e.equipID, i.startDay, i.endDay, i.memID
+            FROM EQUIPMENT e
+            CROSS JOIN USES_INTERVAL i ON i.equipMin <= e.rowid AND i.equipMax >= e.rowid
+            WHERE {where} AND i.endDay >= ?
+            ORDER BY i.startDay
+            """, (value, first_day))
+        for equip_id, start_day, end_day, mem_id in self.cursor.fetchall():
+            intervals[equip_id].append((start_day, end_day, mem_id))
+        return intervals
+
+    def book_usages(self, requests, dry_run=False):
+        # Books every request in the earliest window that fits, in one
+        # transaction. A request is a dict with memID, equipID or type, days,
+        # and optionally purpose and startDate (the earliest day wanted,
+        # default today). Requests are placed greedily: earliest startDate
+        # first, and the longest first among equal ones, so short bookings
+        # fill the gaps left by long ones. Each placement is added to the
+        # intervals later requests are placed against, so no insert trips
+        # uses_before_insert. Returns one dict per request, in request order,
+        # with the booked USES columns or an "error".
+        wanted = []
+        for number, request in enumerate(requests, 1):
+            request = dict(request)
+            if not request.get("memID"):
+                raise ValueError(f"request {number} has no memID")
+            if not (request.get("equipID") or request.get("type")):
+                raise ValueError(f"request {number} needs an equipID or a type")
+            days = int(request.get("days", 1))
+            if days < 1:
+                raise ValueError(f"request {number}: days must be at least 1")
+            first_day = day_number(request.get("startDate") or date.today())
+            wanted.append((first_day, days, number, request))
+        wanted.sort(key=lambda item: (item[0], -item[1], item[2]))
+
+        results = {}
+        rows = []
+        # Intervals per piece of equipment, and the equipment each equipID or
+        # type in the requests can use. Every key shares the same lists, so a
+        # placement is seen by every later request that could use it.
+        intervals = {}
+        candidates = {}
+        if not self.connection.in_transaction:
+            # Windows are worked out from what is booked now, so the write
+            # lock is taken before reading.
+            self.cursor.execute("BEGIN IMMEDIATE")
+        try:
+            for first_day, days, number, request in wanted:
+                equip_id, equip_type = request.get("equipID"), request.get("type")
+                key = ("equipID", equip_id) if equip_id else ("type", equip_type)
+                if key not in candidates:
+                    try:
+                        found = self.usage_intervals(equip_id, equip_type, wanted[0][0])
+                    except ValueError as e:
+                        results[number] = {"request": number, "error": str(e)}
+                        continue
+                    for found_id, found_intervals in found.items():
+                        intervals.setdefault(found_id, found_intervals)
+                    candidates[key] = list(found)
+                best = None
+                for candidate in candidates[key]:
+                    windows = free_windows(intervals[candidate], days, first_day, 1, request["memID"])
+                    if windows and (best is None or windows[0][0] < best[0]):
+                        best = (windows[0][0], candidate)
+                if best is None:
+                    results[number] = {"request": number, "error": "no free window"}
+                    continue
+                start_day, candidate = best
+                insort(intervals[candidate], (start_day, start_day + days - 1, request["memID"]))
+                row = {"memID": request["memID"], "equipID": candidate,
+                       "purpose": request.get("purpose") or "Scheduled booking",
+                       "startDate": day_date(start_day), "endDate": day_date(start_day + days - 1)}
+                rows.append(tuple(row.values()))
+                results[number] = dict(row, request=number)
+            if rows:
+                self.cursor.executemany(self.statement("insert", "USES", ("memID", "equipID", "purpose",
+                                                                          "startDate", "endDate")), rows)
+        except BaseException:
+            self.connection.rollback()
+            raise
+        if dry_run:
+            self.connection.rollback()
+        else:
+            self.connection.commit()
+        return [results[number] for number in sorted(results)]
+
+    def primary_key(self, table_name):
+        keys = [info[1] for info in sorted(self.table_info(table_name), key=lambda info: info[5]) if info[5]]
+        if len(keys) != 1:
+            raise ValueError(f"{table_name} has no single-column key; give one explicitly")
+        return keys[0]
+
+    def update_many(self, table_name, rows, key=None, batch_size=1000, dry_run=False):
+        # rows yields (key value, {column: new value}) pairs. Consecutive rows
+        # that change the same columns share one executemany, up to batch_size
+        # rows; a different column set starts a new batch, so updates still
+        # apply in the order given. One transaction covers every batch.
+        # Returns one entry per batch with the rows sent, rows changed and ms.
+        key = key or self.primary_key(table_name)
+        batches = []
+        columns, chunk = None, []
+
+        def flush():
+            sql = self.statement("update", table_name, columns, (key,))
+            start = time.perf_counter()
+            self.cursor.executemany(sql, chunk)
+            batches.append({"batch": len(batches) + 1, "columns": list(columns), "rows": len(chunk),
+                            "updated": self.cursor.rowcount,
+                            "ms": round((time.perf_counter() - start) * 1000, 3)})
+
+        if not self.connection.in_transaction:
+            self.cursor.execute("BEGIN")
+        try:
+            for key_value, changes in rows:
+                if not changes:
+                    raise ValueError(f"no fields to update for {key} = {key_value}")
+                row_columns = tuple(changes.keys())
+                if chunk and (row_columns != columns or len(chunk) >= batch_size):
+                    flush()
+                    chunk = []
+                columns = row_columns
+                chunk.append(list(changes.values()) + [key_value])
+            if chunk:
+                flush()
+        except BaseException:
+            self.connection.rollback()
+            raise
+        if dry_run:
+            self.connection.rollback()
+        else:
+            self.connection.commit()
+        return batches
+
+    def update_where(self, table_name, updates, where, params=(), dry_run=False):
+        # One change set applied to every row matching a WHERE clause (run as
+        # given, so it must come from a trusted caller), in one statement.
+        if not updates:
+            raise ValueError("no fields to update")
+        table, columns = self.resolve_columns(table_name, updates.keys())
+        sql = f"UPDATE {table} SET {', '.join(f'{col} = ?' for col in columns)} WHERE {where}"
+        if not self.connection.in_transaction:
+            self.cursor.execute("BEGIN")
+        try:
+            start = time.perf_counter()
+            self.cursor.execute(sql, list(updates.values()) + list(params))
+            batch = {"batch": 1, "columns": columns, "rows": None, "updated": self.cursor.rowcount,
+                     "ms": round((time.perf_counter() - start) * 1000, 3)}
+        except BaseException:
+            self.connection.rollback()
+            raise
+        if dry_run:
+            self.connection.rollback()
+        else:
+            self.connection.commit()
+        return [batch]
+
+    def delete_rows(self, table_name, pk_name, pk_value):
+        self.cursor.execute(self.statement("delete", table_name, where=(pk_name,)), (pk_value,))
+        return self.cursor.rowcount
+
+    def delete_members(self, member_ids=None, where=None, params=(), dry_run=False):
+        # Deletes a set of members and everything that hangs off them in one
+        # transaction, one statement per table. The set comes from member_ids
+        # or from a WHERE clause over MEMBER (run as given, so it must come
+        # from a trusted caller). Returns the rows removed per table.
+        if (member_ids is None) == (where is None):
+            raise ValueError("give either member IDs or a predicate")
+        cursor = self.cursor
+        if not self.connection.in_transaction:
+            cursor.execute("BEGIN")
+        try:
+            # load_data drops the ON DELETE actions, so every dependent table
+            # is cleaned up explicitly below. Orphaned papers are deleted
+            # before their AUTHORED_BY rows (publication_must_have_author
+            # only lets the last author go once the paper is gone), so the
+            # foreign keys are checked at commit rather than per statement.
+            cursor.execute("PRAGMA defer_foreign_keys = ON")
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS doomed_members (memID TEXT PRIMARY KEY)")
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS doomed_pubs (pubID TEXT PRIMARY KEY)")
+            cursor.execute("DELETE FROM temp.doomed_members")
+            cursor.execute("DELETE FROM temp.doomed_pubs")
+            if member_ids is not None:
+                cursor.executemany("INSERT OR IGNORE INTO temp.doomed_members "
+                                   "SELECT memID FROM MEMBER WHERE memID = ?", ((m,) for m in member_ids))
+            else:
+                cursor.execute(f"INSERT INTO temp.doomed_members SELECT memID FROM MEMBER WHERE {where}", params)
+
+            cursor.execute("SELECT DISTINCT memID FROM PROJECT "
+                           "WHERE memID IN (SELECT memID FROM temp.doomed_members)")
+            leaders = [row[0] for row in cursor.fetchall()]
+            if leaders:
+                raise ValueError(f"faculty {', '.join(leaders)} lead projects; "
+                                 "update project leadership before deletion")
+
+            # Only papers written by the doomed members can become orphans,
+            # and only if none of their other authors survive.
+            cursor.execute("""
+                INSERT INTO temp.doomed_pubs
+                SELECT DISTINCT a.pubID
+                FROM AUTHORED_BY a
+                WHERE a.memID IN (SELECT memID FROM temp.doomed_members)
+                AND NOT EXISTS (SELECT 1 FROM AUTHORED_BY o
+                                WHERE o.pubID = a.pubID
+                                AND o.memID NOT IN (SELECT memID FROM temp.doomed_members))
+            """)
+
+            in_set = "IN (SELECT memID FROM temp.doomed_members)"
+            counts = {}
+            for table_name in ("WORK_ON", "FACULTY", "STUDENT", "EXTCOLLAB", "USES"):
+                cursor.execute(f"DELETE FROM {table_name} WHERE memID {in_set}")
+                counts[table_name] = cursor.rowcount
+            cursor.execute(f"""
+                UPDATE MEMBER
+                SET mentorID = NULL,
+                    mentorStartDate = NULL,
+                    mentorEndDate = NULL
+                WHERE mentorID {in_set} AND memID NOT {in_set}
+            """)
+            counts["mentees_reset"] = cursor.rowcount
+            cursor.execute("DELETE FROM PUBLICATION WHERE pubID IN (SELECT pubID FROM temp.doomed_pubs)")
+            counts["PUBLICATION"] = cursor.rowcount
+            cursor.execute(f"DELETE FROM AUTHORED_BY WHERE memID {in_set}")
+            counts["AUTHORED_BY"] = cursor.rowcount
+            cursor.execute(f"DELETE FROM MEMBER WHERE memID {in_set}")
+            counts["MEMBER"] = cursor.rowcount
+            self.check_foreign_keys(("MEMBER", "PROJECT", "WORK_ON", "FACULTY", "STUDENT", "EXTCOLLAB",
+                                     "USES", "AUTHORED_BY"))
+            if dry_run:
+                self.connection.rollback()
+            else:
+                self.connection.commit()
+        except BaseException:
+            self.connection.rollback()
+            raise
+        return counts
+
+    def delete_projects(self, project_ids=None, where=None, params=(), dry_run=False):
+        # Deletes a set of projects with their assignments and funding links,
+        # plus every grant that funded nothing else, in one transaction. Works
+        # like delete_members: the set comes from project_ids or a trusted
+        # WHERE clause over PROJECT, and the rows removed per table come back.
+        if (project_ids is None) == (where is None):
+            raise ValueError("give either project IDs or a predicate")
+        cursor = self.cursor
+        if not self.connection.in_transaction:
+            cursor.execute("BEGIN")
+        try:
+            # Orphaned grants are deleted before their FUNDED_BY rows
+            # (grant_must_fund_project only lets the last link go once the
+            # grant is gone), so the foreign keys are checked at commit.
+            cursor.execute("PRAGMA defer_foreign_keys = ON")
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS doomed_projects (projID TEXT PRIMARY KEY)")
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS doomed_grants (grantID TEXT PRIMARY KEY)")
+            cursor.execute("DELETE FROM temp.doomed_projects")
+            cursor.execute("DELETE FROM temp.doomed_grants")
+            if project_ids is not None:
+                cursor.executemany("INSERT OR IGNORE INTO temp.doomed_projects "
+                                   "SELECT projID FROM PROJECT WHERE projID = ?", ((p,) for p in project_ids))
+            else:
+                cursor.execute(f"INSERT INTO temp.doomed_projects SELECT projID FROM PROJECT WHERE {where}",
+                               params)
+
+            # A grant is orphaned when every project it funds is in the set.
+            cursor.execute("""
+                INSERT INTO temp.doomed_grants
+                SELECT DISTINCT f.grantID
+                FROM FUNDED_BY f
+                WHERE f.projID IN (SELECT projID FROM temp.doomed_projects)
+                AND NOT EXISTS (SELECT 1 FROM FUNDED_BY o
+                                WHERE o.grantID = f.grantID
+                                AND o.projID NOT IN (SELECT projID FROM temp.doomed_projects))
+            """)
+
+            in_set = "IN (SELECT projID FROM temp.doomed_projects)"
+            counts = {}
+            cursor.execute(f"DELETE FROM WORK_ON WHERE projID {in_set}")
+            counts["WORK_ON"] = cursor.rowcount
+            cursor.execute("DELETE FROM GRANT WHERE grantID IN (SELECT grantID FROM temp.doomed_grants)")
+            counts["GRANT"] = cursor.rowcount
+            cursor.execute(f"DELETE FROM FUNDED_BY WHERE projID {in_set}")
+            counts["FUNDED_BY"] = cursor.rowcount
+            cursor.execute(f"DELETE FROM PROJECT WHERE projID {in_set}")
+            counts["PROJECT"] = cursor.rowcount
+            self.check_foreign_keys(("WORK_ON", "FUNDED_BY"))
+            if dry_run:
+                self.connection.rollback()
+            else:
+                self.connection.commit()
+        except BaseException:
+            self.connection.rollback()
+            raise
+        return counts
+
+    def run_operation(self, op):
+        kind = op.get("op")
+        self.operation = op.get("name") if kind == "report" else f"{kind}.{op.get('table')}"
+        if kind == "query":
+            columns = [info[1] for info in self.table_info(op["table"])]
+            rows = list(self.iter_query(op["table"], op["column"], op["value"]))
+            return {"columns": columns, "rows": rows}
+        if kind == "insert":
+            return {"rowcount": self.insert_row(op["table"], op["values"])}
+        if kind == "update":
+            return {"rowcount": self.update_rows(op["table"], op["column"], op["value"], op["set"])}
+        if kind == "delete":
+            return {"rowcount": self.delete_rows(op["table"], op["column"], op["value"])}
+        if kind == "report":
+            name = op.get("name")
+            if name not in REPORTS:
+                raise ValueError(f"unknown report '{name}' (choose from {', '.join(REPORTS)})")
+            params = op.get("params", [])
+            method = getattr(self, REPORTS[name])
+            self.last_report_columns = None
+            result = method(**params) if isinstance(params, dict) else method(*params)
+            if name == "equipment.current_usage":
+                columns, rows = result
+            else:
+                columns = self.last_report_columns or [desc[0] for desc in self.cursor.description]
+                rows = result if isinstance(result, list) else [] if result is None else [result]
+            return {"columns": columns, "rows": rows}
+        raise ValueError(f"unknown op '{kind}' (use query, {', '.join(WRITE_OPS)} or report)")
+
+    def run_batch(self, ops, out, batch_size=500, stop_on_error=False):
+        # Writes share one transaction that is committed every batch_size
+        # writes. Each operation runs under its own savepoint, so a failing
+        # one is undone on its own and the rest of the batch still commits.
+        summary = {"ops": 0, "ok": 0, "failed": 0, "commits": 0}
+        pending = 0
+        start = time.perf_counter()
+        if not self.connection.in_transaction:
+            self.cursor.execute("BEGIN")
+        try:
+            for line_no, op in ops:
+                summary["ops"] += 1
+                record = {"line": line_no}
+                try:
+                    if isinstance(op, str):
+                        op = json.loads(op)
+                    record["op"] = op.get("op")
+                    self.cursor.execute("SAVEPOINT batch_op")
+                    try:
+                        record.update(self.run_operation(op))
+                    except Exception:
+                        self.cursor.execute("ROLLBACK TO batch_op")
+                        raise
+                    finally:
+                        self.cursor.execute("RELEASE batch_op")
+                    record["ok"] = True
+                    summary["ok"] += 1
+                except (sqlite3.Error, ValueError, KeyError, TypeError, AttributeError) as e:
+                    record["ok"] = False
+                    record["error"] = f"missing field {e}" if isinstance(e, KeyError) else str(e)
+                    summary["failed"] += 1
+                out.write(json.dumps(record, default=str) + "\n")
+
+                if not record["ok"] and stop_on_error:
+                    self.connection.rollback()
+                    summary["rolled_back"] = pending
+                    return summary
+                if record["ok"] and record.get("op") in WRITE_OPS:
+                    pending += 1
+                    if pending >= batch_size:
+                        self.connection.commit()
+                        self.cursor.execute("BEGIN")
+                        summary["commits"] += 1
+                        pending = 0
+            self.connection.commit()
+            summary["commits"] += bool(pending)
+        except BaseException:
+            self.connection.rollback()
+            raise
+        summary["seconds"] = round(time.perf_counter() - start, 3)
+        return summary
+
+    def write_generation(self):
+        # data_version moves when another connection commits; total_changes
+        # moves on every row this connection writes.
+        self._meta_cursor.execute("PRAGMA data_version")
+        return self._meta_cursor.fetchone()[0], self.connection.total_changes
+
+    def cached_result(self, name, params):
+        # Returns (result, columns) or None. Nothing is cached while this
+        # connection has a transaction open: a rollback would not move the
+        # write generation back, so the entry could outlive its data.
+        if self.connection.in_transaction:
+            return None
+        generation = self.write_generation()
+        if generation != self._cache_generation:
+            self._report_cache.clear()
+            self._cache_generation = generation
+        entry = self._report_cache.get((name, params))
+        if entry is None:
+            self.cache_misses += 1
+            return None
+        self._report_cache.move_to_end((name, params))
+        self.cache_hits += 1
+        self.last_report_columns = entry[1]
+        return entry
+
+    def store_result(self, name, params, result, columns=None):
+        columns = columns or [desc[0] for desc in self.cursor.description]
+        self.last_report_columns = columns
+        if self.connection.in_transaction or self._cache_generation != self.write_generation():
+            return
+        self._report_cache[(name, params)] = (result, columns)
+        if len(self._report_cache) > self.REPORT_CACHE_SIZE:
+            self._report_cache.popitem(last=False)
+
+    def report_rows(self, sql, params=(), stream=False, page_size=PAGE_SIZE, cache_name=None):
+        # With stream=True the caller gets a generator of fetchmany pages read
+        # from its own cursor instead of one fetchall() list. Reports with a
+        # cache_name are answered from the result cache when nothing has been
+        # written since they last ran.
+        if cache_name is not None:
+            entry = self.cached_result(cache_name, params)
+            if entry is not None:
+                rows = entry[0]
+                if stream:
+                    return (rows[i:i + page_size] for i in range(0, len(rows), page_size))
+                return rows
+        if not stream:
+            self.cursor.execute(sql, params)
+            rows = self.cursor.fetchall()
+            if cache_name is not None:
+                self.store_result(cache_name, params, rows)
+            return rows
+        cursor = self.new_cursor()
+        cursor.execute(sql, params)
+        if cache_name is None:
+            return iter_pages(cursor, page_size)
+        return self.caching_pages(cursor, page_size, cache_name, params)
+
+    def caching_pages(self, cursor, page_size, name, params):
+        # Streams like iter_pages and caches the rows once every page was read.
+        columns = [desc[0] for desc in cursor.description]
+        rows = []
+        for page in iter_pages(cursor, page_size):
+            rows.extend(page)
+            yield page
+        self.store_result(name, params, rows, columns)
+
+    def report_project_status(self, projID):
+        self.cursor.execute("SELECT statusProj FROM PROJECT WHERE projID = ?", (projID,))
+        return self.cursor.fetchone()
+
+    def report_grant_members(self, grantID, stream=False, page_size=PAGE_SIZE):
+        sql = """SELECT DISTINCT m.memID, m.fName, m.lName, w.projID
+            FROM MEMBER m
+            JOIN WORK_ON w ON m.memID = w.memID
+            JOIN FUNDED_BY f ON w.projID = f.projID
+            WHERE f.grantID = ?
+            ORDER BY w.projID, m.lName, m.fName
+        """
+        return self.report_rows(sql, (grantID,), stream, page_size)
+
+    def report_project_mentorships(self, projID, stream=False, page_size=PAGE_SIZE):
+        sql = """SELECT m1.fName, m1.lName, m2.fName, m2.lName
+            FROM WORK_ON w1
+            JOIN MEMBER m1 ON w1.memID = m1.memID
+            JOIN MEMBER m2 ON m1.mentorID = m2.memID
+            JOIN WORK_ON w2 ON w2.memID = m2.memID AND w2.projID = w1.projID
+            WHERE w1.projID = w2.projID 
+            AND w1.projID = ?
+            """
+        return self.report_rows(sql, (projID,), stream, page_size)
+
+    # Both read MENTOR_CLOSURE, so any depth costs one index range. projID, if
+    # given, keeps only the members who work on that project.
+    def report_mentees(self, memID, projID=None, stream=False, page_size=PAGE_SIZE):
+        sql = """SELECT m.memID, m.fName, m.lName, c.depth, m.mentorID
+            FROM MENTOR_CLOSURE c
+            JOIN MEMBER m ON m.memID = c.descendantID
+            WHERE c.ancestorID = ?1 AND c.depth > 0
+            AND (?2 IS NULL OR EXISTS (SELECT 1 FROM WORK_ON w WHERE w.memID = m.memID AND w.projID = ?2))
+            ORDER BY c.depth, m.memID
+            """
+        return self.report_rows(sql, (memID, projID or None), stream, page_size)
+
+    def report_mentor_lineage(self, memID, projID=None, stream=False, page_size=PAGE_SIZE):
+        sql = """SELECT m.memID, m.fName, m.lName, c.depth
+            FROM MENTOR_CLOSURE c
+            JOIN MEMBER m ON m.memID = c.ancestorID
+            WHERE c.descendantID = ?1 AND c.depth > 0
+            AND (?2 IS NULL OR EXISTS (SELECT 1 FROM WORK_ON w WHERE w.memID = m.memID AND w.projID = ?2))
+            ORDER BY c.depth
+            """
+        return self.report_rows(sql, (memID, projID or None), stream, page_size)
+
+    def report_current_usage(self, column, value, stream=False, page_size=PAGE_SIZE):
+        _, (column,) = self.resolve_columns("USES", (column,))
+        source = "A" if column in ("memID", "equipID", "startDate", "endDate") else "U"
+        sql = f""" SELECT U.*
+                FROM ACTIVE_USES A
+                CROSS JOIN USES U
+                    ON U.memID = A.memID AND U.equipID = A.equipID AND U.startDate = A.startDate
+                WHERE {source}.{column} = ?
+                AND A.startDate <= CURRENT_DATE
+                AND (A.endDate IS NULL OR A.endDate >= CURRENT_DATE)
+            """
+        columns = [info[1] for info in self.table_info("USES")]
+        return columns, self.report_rows(sql, (value,), stream, page_size)
+
+    def report_equipment_status(self, equipID):
+        # EQUIPMENT.status is only as fresh as the last write to the
+        # equipment's usages, so the members using it today are counted here;
+        # activeUsers below 3 already rules out 'In Use'.
+        sql = """
+            SELECT CASE
+                WHEN E.status = 'Retired' THEN 'Retired'
+                WHEN COALESCE(O.activeUsers, 0) >= 3 AND (SELECT COUNT(DISTINCT A.memID) FROM ACTIVE_USES A
+                      WHERE A.equipID = E.equipID
+                      AND A.startDate <= CURRENT_DATE
+                      AND (A.endDate IS NULL OR A.endDate >= CURRENT_DATE)) >= 3 THEN 'In Use'
+                ELSE 'Available'
+            END AS status
+            FROM EQUIPMENT E
+            LEFT JOIN EQUIPMENT_OCCUPANCY O ON O.equipID = E.equipID
+            WHERE E.equipID = ?
+        """
+        self.cursor.execute(sql, (equipID,))
+        return self.cursor.fetchone()
+
+    def report_equipment_members(self, equipID, stream=False, page_size=PAGE_SIZE):
+        sql = """
+            SELECT M.memID, M.fName, M.lName, W.projID
+            FROM ACTIVE_USES A
+            JOIN MEMBER M ON M.memID = A.memID
+            LEFT JOIN WORK_ON W ON W.memID = M.memID
+            WHERE A.equipID = ?
+            AND A.startDate <= CURRENT_DATE
+            AND (A.endDate IS NULL OR A.endDate >= CURRENT_DATE);
+        """
+        return self.report_rows(sql, (equipID,), stream, page_size)
+
+    def report_free_slots(self, equipID=None, days=1, start_date=None, memID=None, limit=FREE_SLOT_LIMIT,
+                          equip_type=None):
+        # The earliest windows of `days` days from start_date (default today)
+        # in which a new usage passes uses_before_insert, on one piece of
+        # equipment or on every one of equip_type. Each row is a window as
+        # booked on its first day, the last start day that still fits (None:
+        # no limit) and how many members already use the equipment then, at
+        # most. With memID, days on which that member already starts a usage
+        # of the equipment are skipped.
+        days = int(days)
+        if days < 1:
+            raise ValueError("days must be at least 1")
+        limit = int(limit)
+        first_day = day_number(start_date or date.today())
+        slots = []
+        for equip_id, intervals in self.usage_intervals(equipID, equip_type, first_day).items():
+            for first, last, users in free_windows(intervals, days, first_day, limit, memID or None):
+                slots.append((equip_id, day_date(first), day_date(first + days - 1),
+                              None if last is None else day_date(last), users))
+        slots.sort(key=lambda slot: (slot[1], slot[0]))
+        self.last_report_columns = ["equipID", "startDate", "endDate", "lastStart", "users"]
+        return slots[:limit]
+
+    def report_top_publishers(self, limit, stream=False, page_size=PAGE_SIZE):
+        sql = """ SELECT M.fName, M.lName, Pub.pubCount
+                    FROM MEMBER_PUB_COUNT Pub
+                    JOIN MEMBER M ON M.memID = Pub.memID
+                    ORDER BY Pub.pubCount DESC
+                    LIMIT ?;
+            """
+        return self.report_rows(sql, (limit,), stream, page_size, "grant.top_publishers")
+
+    def report_avg_student_publications(self, stream=False, page_size=PAGE_SIZE):
+        sql = """SELECT S.major, AVG(COALESCE(P.pubCount, 0)) AS avgPublications
+                FROM STUDENT S
+                LEFT JOIN MEMBER_PUB_COUNT P ON P.memID = S.memID
+                GROUP BY S.major;
+                """
+        return self.report_rows(sql, (), stream, page_size, "grant.avg_student_publications")
+
+    def report_active_funded_projects(self, start_date, end_date):
+        sql = """SELECT COUNT(DISTINCT p.projID)
+            FROM PROJECT p
+            JOIN FUNDED_BY f ON p.projID = f.projID
+            WHERE p.statusProj = 'active'
+            AND (p.endDate IS NULL OR p.endDate >= ?)
+            AND p.startDate <= ?;
+        """
+        params = (start_date, end_date)
+        entry = self.cached_result("grant.active_funded_projects", params)
+        if entry is not None:
+            return entry[0]
+        self.cursor.execute(sql, params)
+        row = self.cursor.fetchone()
+        self.store_result("grant.active_funded_projects", params, row)
+        return row
+
+    def report_funding_series(self, start_date, end_date, period="month", by_source=True,
+                              stream=False, page_size=PAGE_SIZE):
+        # The active_funded_projects count for every month, quarter or year
+        # from start_date to end_date, optionally split by grant source, in
+        # one pass. Each active funded project becomes a +1 event in the
+        # first period it overlaps and a -1 in the period after it ends; a
+        # running SUM over a recursive calendar then gives every period's
+        # count without joining projects against each period.
+        if period not in SERIES_PERIODS:
+            raise ValueError(f"unknown period '{period}' (use {', '.join(SERIES_PERIODS)})")
+        months = SERIES_PERIODS[period]
+        first = date.fromisoformat(str(start_date)).replace(day=1)
+        if period == "quarter":
+            first = first.replace(month=first.month - (first.month - 1) % 3)
+        elif period == "year":
+            first = first.replace(month=1)
+        base = first.year * 12 + first.month
+        sources = "SELECT DISTINCT source FROM GRANT" if by_source else "SELECT NULL AS source"
+        sql = f"""
+            WITH RECURSIVE calendar(k, period_start) AS (
+                SELECT 0, ?1
+                UNION ALL
+                SELECT k + 1, date(period_start, '+{months} months') FROM calendar
+                WHERE date(period_start, '+{months} months') <= ?2
+            ),
+            funded AS (
+                SELECT DISTINCT p.projID, {"g.source" if by_source else "NULL"} AS source,
+                    MAX(0, (CAST(strftime('%Y', p.startDate) AS INT) * 12
+                            + CAST(strftime('%m', p.startDate) AS INT) - ?3) / {months}) AS first_k,
+                    (CAST(strftime('%Y', p.endDate) AS INT) * 12
+                     + CAST(strftime('%m', p.endDate) AS INT) - ?3) / {months} AS last_k
+                FROM PROJECT p
+                JOIN FUNDED_BY fb ON fb.projID = p.projID
+                JOIN GRANT g ON g.grantID = fb.grantID
+                WHERE p.statusProj = 'active'
+                AND p.startDate IS NOT NULL
+                AND (p.endDate IS NULL OR p.endDate >= ?1)
+            ),
+            deltas AS (
+                SELECT source, k, SUM(delta) AS delta
+                FROM (SELECT source, first_k AS k, 1 AS delta FROM funded
+                      UNION ALL
+                      SELECT source, last_k + 1, -1 FROM funded WHERE last_k IS NOT NULL)
+                GROUP BY source, k
+            )
+            SELECT c.period_start, date(c.period_start, '+{months} months', '-1 day') AS period_end,
+                   s.source,
+                   SUM(COALESCE(d.delta, 0)) OVER (PARTITION BY s.source ORDER BY c.k) AS active_projects
+            FROM calendar c
+            CROSS JOIN ({sources}) s
+            LEFT JOIN deltas d ON d.k = c.k AND d.source IS s.source
+            ORDER BY c.period_start, s.source
+        """
+        params = (first.isoformat(), str(end_date), base)
+        # The SQL differs per period and split, so they are cached apart.
+        cache_name = f"grant.funding_series.{period}{'.source' if by_source else ''}"
+        return self.report_rows(sql, params, stream, page_size, cache_name)
+
+    def report_prolific_members(self, grantID, stream=False, page_size=PAGE_SIZE):
+        sql = """
+            SELECT m.memID, m.fName, m.lName, COALESCE(p.pubCount, 0) AS pub_count
+            FROM MEMBER m
+            JOIN WORK_ON w ON m.memID = w.memID
+            JOIN FUNDED_BY f ON w.projID = f.projID
+            LEFT JOIN MEMBER_PUB_COUNT p ON p.memID = m.memID
+            WHERE f.grantID = ?
+            GROUP BY m.memID
+            ORDER BY pub_count DESC
+            LIMIT 3 
+            """
+        return self.report_rows(sql, (grantID,), stream, page_size, "grant.prolific_members")
+
+    # Ranked keyword searches over the FTS5 indexes, best match first. terms
+    # are plain words (see fts_query); snippet shows the matched words between
+    # highlight_open and highlight_close.
+    def report_search_publications(self, terms, memID=None, limit=SEARCH_LIMIT, highlight_open=HIGHLIGHT[0],
+                                   highlight_close=HIGHLIGHT[1], stream=False, page_size=PAGE_SIZE):
+        weights = ", ".join(str(w) for w in PUBLICATION_WEIGHTS)
+        sql = f"""SELECT p.pubID, p.title, p.venue, p.year,
+                (SELECT group_concat(TRIM(m.fName || ' ' || COALESCE(m.lName, '')), ', ')
+                 FROM AUTHORED_BY a
+                 JOIN MEMBER m ON m.memID = a.memID
+                 WHERE a.pubID = p.pubID) AS authors,
+                snippet(PUBLICATION_FTS, -1, ?2, ?3, '...', 12) AS snippet,
+                round(-bm25(PUBLICATION_FTS, {weights}), 3) AS score
+            FROM PUBLICATION_FTS
+            JOIN PUBLICATION p ON p.rowid = PUBLICATION_FTS.rowid
+            WHERE PUBLICATION_FTS MATCH ?1
+            AND (?4 IS NULL OR EXISTS (SELECT 1 FROM AUTHORED_BY a WHERE a.pubID = p.pubID AND a.memID = ?4))
+            ORDER BY score DESC, p.pubID
+            LIMIT ?5
+            """
+        params = (fts_query(terms), highlight_open, highlight_close, memID or None, limit)
+        return self.report_rows(sql, params, stream, page_size, "grant.search_publications")
+
+    def report_search_collaborators(self, terms, projID=None, limit=SEARCH_LIMIT, highlight_open=HIGHLIGHT[0],
+                                    highlight_close=HIGHLIGHT[1], stream=False, page_size=PAGE_SIZE):
+        sql = """SELECT e.memID, m.fName, m.lName, e.affiliation,
+                (SELECT group_concat(w.projID, ', ') FROM WORK_ON w WHERE w.memID = e.memID) AS projects,
+                snippet(EXTCOLLAB_FTS, 0, ?2, ?3, '...', 12) AS snippet,
+                round(-bm25(EXTCOLLAB_FTS), 3) AS score
+            FROM EXTCOLLAB_FTS
+            JOIN EXTCOLLAB e ON e.rowid = EXTCOLLAB_FTS.rowid
+            JOIN MEMBER m ON m.memID = e.memID
+            WHERE EXTCOLLAB_FTS MATCH ?1
+            AND (?4 IS NULL OR EXISTS (SELECT 1 FROM WORK_ON w WHERE w.memID = e.memID AND w.projID = ?4))
+            ORDER BY score DESC, e.memID
+            LIMIT ?5
+            """
+        params = (fts_query(terms), highlight_open, highlight_close, projID or None, limit)
+        return self.report_rows(sql, params, stream, page_size, "grant.search_collaborators")
+
     def execute_projMem(self):
         while True:
             print("-" * 50)
@@ -207,8 +1454,11 @@ class Database:
             print("9: Status of a Project")
             print("10: Members of a project of a specific grant")
             print("11: Mentorships on the same project")
+            print("12: All mentees of a member, at any depth")
+            print("13: Mentor lineage of a member")
             print("0: Exit back to main menu")
             query = input("> ").strip()
+            self.operation = f"projMem.{MENU_OPERATIONS['projMem'].get(query, 'menu')}"
 
             if query == "1":
                 print ("In the member table, which column would you like to query:")
@@ -231,47 +1481,14 @@ class Database:
                     continue
 
                 try:
-                    self.cursor.execute("SELECT memID FROM MEMBER WHERE {} = ?".format(columnID), (valueID,))
-                    row = self.cursor.fetchone()
-                    if not row:
+                    _, (columnID,) = self.resolve_columns("MEMBER", (columnID,))
+                    counts = self.delete_members(where=f"{columnID} = ?", params=(valueID,))
+                    if not counts["MEMBER"]:
                         print("Member not found.")
                         continue
-                    mem_id = row[0]
-                    prefix = mem_id[0].lower()
-                    self.cursor.execute("DELETE FROM WORK_ON WHERE memID = ?", (mem_id,))
-                    if prefix == "f":
-                        self.cursor.execute("SELECT COUNT(*) FROM PROJECT WHERE memID = ?", (mem_id,))
-                        count = self.cursor.fetchone()[0]  
-                        if count > 0:
-                            print("Cannot delete: This faculty member is leading a project. Update project leadership before deletion.")
-                        else:
-                            self.cursor.execute("DELETE FROM FACULTY WHERE memID = ?", (mem_id,))
-                    elif prefix == "s":
-                        self.cursor.execute("DELETE FROM STUDENT WHERE memID = ?", (mem_id,))
-                    elif prefix == "e":
-                        self.cursor.execute("DELETE FROM EXTCOLLAB WHERE memID = ?", (mem_id,))
-                    
-                    self.cursor.execute("""
-                        UPDATE MEMBER
-                        SET mentorID = NULL,
-                            mentorStartDate = NULL,
-                            mentorEndDate = NULL
-                        WHERE mentorID = ?
-                        """, (mem_id,))
-
-                    self.cursor.execute("DELETE FROM USES WHERE memID = ?", (mem_id,))
-                    self.cursor.execute("DELETE FROM AUTHORED_BY WHERE memID = ?", (mem_id,))
-                    self.cursor.execute(
-                        "DELETE FROM PUBLICATION WHERE pubID IN (SELECT pubID FROM PUBLICATION "
-                        "LEFT JOIN AUTHORED_BY USING(pubID) "
-                        "GROUP BY pubID HAVING COUNT(AUTHORED_BY.memID) = 0)"
-                    )
-                    self.execute_delete(table_name='MEMBER', pk_name=columnID, pk_value=valueID)
-        
-                    self.connection.commit()
-    
-                except Exception as e:
-                    self.connection.rollback()
+                    print("Record deleted successfully.")
+                    print_counts(counts)
+                except (sqlite3.Error, ValueError) as e:
                     print(f"Delete error: {e}")
 
             elif query == "4":
@@ -308,26 +1525,14 @@ class Database:
                     continue
 
                 try:
-                    conn = self.connection if hasattr(self, "connection") else self.conn
-                    cursor = conn.cursor()
-
-                    cursor.execute("DELETE FROM WORK_ON WHERE projID = ?",(valueID,))
-
-                    cursor.execute("SELECT grantID FROM FUNDED_BY WHERE projID = ?",(valueID,))
-                    grants_to_check = [row[0] for row in cursor.fetchall()]
-                    cursor.execute("DELETE FROM FUNDED_BY WHERE projID = ?",(valueID,))
-
-                    for grantID in grants_to_check:
-                        cursor.execute("SELECT COUNT(*) FROM FUNDED_BY WHERE grantID = ?",(grantID,))
-                        if cursor.fetchone()[0] == 0:
-                            cursor.execute("DELETE FROM GRANT WHERE grantID = ?",(grantID,))
-
-                    self.execute_delete(table_name='PROJECT', pk_name=columnID, pk_value=valueID)
-
-                    conn.commit()
-
-                except Exception as e:
-                    conn.rollback()
+                    _, (columnID,) = self.resolve_columns("PROJECT", (columnID,))
+                    counts = self.delete_projects(where=f"{columnID} = ?", params=(valueID,))
+                    if not counts["PROJECT"]:
+                        print("Project not found.")
+                        continue
+                    print("Record deleted successfully.")
+                    print_counts(counts)
+                except (sqlite3.Error, ValueError) as e:
                     print(f"Delete error: {e}")
 
             elif query == "8":
@@ -347,9 +1552,7 @@ class Database:
                 projID = input("> ").strip()
     
                 try:
-                    sql = "SELECT statusProj FROM PROJECT WHERE projID = ?"
-                    self.cursor.execute(sql, (projID,))
-                    row = self.cursor.fetchone()
+                    row = self.report_project_status(projID)
         
                     if row is None:
                         print(f"No project found with ID {projID}.")
@@ -365,29 +1568,25 @@ class Database:
                 grantID = input("> ").strip()
 
                 try:
-                    sql = """SELECT DISTINCT m.memID, m.fName, m.lName, w.projID
-                        FROM MEMBER m
-                        JOIN WORK_ON w ON m.memID = w.memID
-                        JOIN FUNDED_BY f ON w.projID = f.projID
-                        WHERE f.grantID = ?
-                        ORDER BY w.projID, m.lName, m.fName
-                    """
-                    self.cursor.execute(sql, (grantID,))
-                    rows = self.cursor.fetchall()
-                    if not rows:
-                        print(f"No grant found with ID {grantID}.")
-                    else:
-                        print(f"\nGrant {grantID} is funding the following projects:\n")
-            
+                    current_project = None
+
+                    def show(row):
+                        nonlocal current_project
+                        memID, fName, lName, projID = row
+                        if projID != current_project:
+                            if current_project is not None:
+                                print()
+                            print(f"Project {projID}:")
+                            current_project = projID
+                        print(f"  - {fName} {lName} ({memID})")
+
+                    def header():
+                        nonlocal current_project
                         current_project = None
-                        for row in rows:
-                            memID, fName, lName, projID = row
-                            if projID != current_project:
-                                if current_project is not None:
-                                    print()
-                                print(f"Project {projID}:")
-                                current_project = projID
-                            print(f"  - {fName} {lName} ({memID})")
+                        print(f"\nGrant {grantID} is funding the following projects:\n")
+
+                    if not browse_pages(self.report_grant_members(grantID, stream=True), show, header):
+                        print(f"No grant found with ID {grantID}.")
                 except sqlite3.Error as e:
                     print(f"Query error: {e}")
 
@@ -396,22 +1595,37 @@ class Database:
                 projID = input("> ").strip()
 
                 try:
-                    sql = """SELECT m1.fName, m1.lName, m2.fName, m2.lName
-                        FROM WORK_ON w1
-                        JOIN MEMBER m1 ON w1.memID = m1.memID
-                        JOIN MEMBER m2 ON m1.mentorID = m2.memID
-                        JOIN WORK_ON w2 ON w2.memID = m2.memID AND w2.projID = w1.projID
-                        WHERE w1.projID = w2.projID 
-                        AND w1.projID = ?
-                        """
-                    self.cursor.execute(sql, (projID,))
-                    rows = self.cursor.fetchall()
-                    if not rows:
+                    def show(row):
+                        menteef, menteel, mentorf, mentorl = row
+                        print(f"Project {projID} shares {mentorf} {mentorl} who mentors {menteef} {menteel}")
+
+                    if not browse_pages(self.report_project_mentorships(projID, stream=True), show):
                         print(f"No mentorships with the members found with the same ID {projID}.")
+                except sqlite3.Error as e:
+                    print(f"Query error: {e}")
+
+            elif query in ("12", "13"):
+                print("Enter the member ID:")
+                memID = input("> ").strip()
+                print("Only members working on project (leave blank for all):")
+                projID = input("> ").strip()
+
+                try:
+                    if query == "12":
+                        def show(row):
+                            menteeID, menteef, menteel, depth, mentorID = row
+                            print(f"{menteef} {menteel} ({menteeID}), {depth} level(s) below {memID}, "
+                                  f"mentored by {mentorID}")
+
+                        pages = self.report_mentees(memID, projID, stream=True)
                     else:
-                        for row in rows:
-                            menteef, menteel, mentorf, mentorl = row
-                            print(f"Project {projID} shares {mentorf} {mentorl} who mentors {menteef} {menteel}")
+                        def show(row):
+                            mentorID, mentorf, mentorl, depth = row
+                            print(f"{mentorf} {mentorl} ({mentorID}), {depth} level(s) above {memID}")
+
+                        pages = self.report_mentor_lineage(memID, projID, stream=True)
+                    if not browse_pages(pages, show):
+                        print("No mentorships found.")
                 except sqlite3.Error as e:
                     print(f"Query error: {e}")
 
@@ -437,8 +1651,10 @@ class Database:
             print("8: Update an Equipment Usage")
             print("9: Status of an Equipment")
             print("10: Members with given equipment and their projects")
+            print("11: Find the next free windows for an equipment")
             print("0: Exit back to main menu")
             query = input("> ").strip()
+            self.operation = f"equipment.{MENU_OPERATIONS['equipment'].get(query, 'menu')}"
 
             if query == "1":
                 print ("In the equipment table, which column would you like to query:")
@@ -460,8 +1676,12 @@ class Database:
                     print("Deletion cancelled.")
                     continue
 
-                conn = self.connection if hasattr(self, "connection") else self.conn
-                cursor = conn.cursor()
+                cursor = self.new_cursor()
+                try:
+                    _, (columnID,) = self.resolve_columns("EQUIPMENT", (columnID,))
+                except sqlite3.Error as e:
+                    print(f"Delete error: {e}")
+                    continue
                 cursor.execute(f"DELETE FROM USES WHERE equipID IN (SELECT equipID FROM EQUIPMENT WHERE {columnID} = ?)", (valueID,))
                 self.execute_delete(table_name='EQUIPMENT', pk_name=columnID, pk_value=valueID)
 
@@ -487,22 +1707,17 @@ class Database:
                 if curr == 'all':
                     self.execute_query(table_name='USES', pk_name=columnID, pk_value=valueID)
                 elif curr == 'now':
-                    sql = f""" SELECT *
-                            FROM USES
-                            WHERE {columnID} = ?
-                            AND endDate IS NULL
-                        """
-                    self.cursor.execute(sql, (valueID,))
-                    rows = self.cursor.fetchall()
+                    try:
+                        columns, pages = self.report_current_usage(columnID, valueID, stream=True)
 
-                    if not rows:
-                        print("No current usage found.")
-                    else:
-                        columns = [desc[0] for desc in self.cursor.description]
-                        print(" | ".join(columns))
-                        print("-" * 50)
-                        for r in rows:
-                            print(" | ".join(str(v) if v is not None else "NULL" for v in r))
+                        def header():
+                            print(" | ".join(columns))
+                            print("-" * 50)
+
+                        if not browse_pages(pages, lambda r: print(format_row(r)), header):
+                            print("No current usage found.")
+                    except sqlite3.Error as e:
+                        print(f"Query error: {e}")
                 else:
                     print("Incorrect command")
 
@@ -537,12 +1752,7 @@ class Database:
                 equipID = input("> ").strip()
     
                 try:
-                    sql = """SELECT status
-                            FROM EQUIPMENT
-                            WHERE equipID = ?;
-                            """
-                    self.cursor.execute(sql, (equipID,))
-                    row = self.cursor.fetchone()
+                    row = self.report_equipment_status(equipID)
         
                     if row is None:
                         print(f"No equipment found with ID {equipID}.")
@@ -558,33 +1768,66 @@ class Database:
                 equipID = input("> ").strip()
 
                 try:
-                    sql = """
-                        SELECT M.memID, M.fName, M.lName, W.projID
-                        FROM USES U
-                        JOIN MEMBER M ON M.memID = U.memID
-                        LEFT JOIN WORK_ON W ON W.memID = M.memID
-                        WHERE U.equipID = ?
-                        AND U.startDate <= CURRENT_DATE
-                        AND (U.endDate IS NULL OR U.endDate >= CURRENT_DATE);
-                    """
-                    self.cursor.execute(sql, (equipID,))
-                    rows = self.cursor.fetchall()
-                    if not rows:
-                        print(f"No equipment found with ID {equipID}.")
-                    else:
+                    current_member = None
+
+                    def show(row):
+                        nonlocal current_member
+                        memID, fName, lName, projID = row
+                        if memID != current_member:
+                            print(f"\n{fName} {lName} ({memID}):")
+                            current_member = memID
+                        if projID:
+                            print(f"  - Project {projID}")
+                        else:
+                            print(f"  - Not currently assigned to any project")
+
+                    def header():
+                        nonlocal current_member
                         current_member = None
-                        for row in rows:
-                            memID, fName, lName, projID = row
-                            if memID != current_member:
-                                print(f"\n{fName} {lName} ({memID}):")
-                                current_member = memID
-                            if projID:
-                                print(f"  - Project {projID}")
-                            else:
-                                print(f"  - Not currently assigned to any project")
+
+                    if not browse_pages(self.report_equipment_members(equipID, stream=True), show, header):
+                        print(f"No equipment found with ID {equipID}.")
                 except sqlite3.Error as e:
                     print(f"Query error: {e}")
 
+            elif query == "11":
+                print("Enter the equipment ID (leave blank to search by type):")
+                equipID = input("> ").strip()
+                equip_type = None
+                if not equipID:
+                    print("Enter the equipment type:")
+                    equip_type = input("> ").strip()
+                print("How many days is it needed for:")
+                days = input("> ").strip()
+                print("Earliest start date (YYYY-MM-DD, leave blank for today):")
+                start_date = input("> ").strip()
+                print("Member ID who will use it (leave blank to only look):")
+                memID = input("> ").strip()
+                try:
+                    slots = self.report_free_slots(equipID, days, start_date, memID, equip_type=equip_type)
+                    if not slots:
+                        print("No free windows found.")
+                        continue
+                    for number, (equip_id, start, end, last_start, users) in enumerate(slots, 1):
+                        later = f"or any start up to {last_start}" if last_start else "or any later start"
+                        print(f"{number}: {equip_id} from {start} to {end} ({later}; "
+                              f"shared with up to {users} member(s))")
+                    if not memID:
+                        continue
+                    choice = input("Book window number (leave blank to skip): ").strip()
+                    if not choice:
+                        continue
+                    equip_id, start, _, _, _ = slots[int(choice) - 1]
+                    purpose = input("Purpose: ").strip()
+                    result, = self.book_usages([{"memID": memID, "equipID": equip_id, "days": days,
+                                                 "startDate": start, "purpose": purpose}])
+                    if "error" in result:
+                        print(f"Booking error: {result['error']}")
+                    else:
+                        print(f"Booked {equip_id} for {memID} from {result['startDate']} to {result['endDate']}.")
+                except (sqlite3.Error, ValueError, IndexError) as e:
+                    print(f"Scheduling error: {e}")
+
             elif query == "0":
                 break
             else:
@@ -601,56 +1844,36 @@ class Database:
             print("2: Average number of student publications given major")
             print("3: Projects that were active and funded by a grant given a specific amount of time")
             print("4: Three prolific members who worked on a project by a given grant")
+            print("5: Active funded projects per month, quarter or year")
+            print("6: Search publications by keyword")
+            print("7: Search collaborator bios by keyword")
             print("0: Exit back to main menu")
             query = input("> ").strip()
+            self.operation = f"grant.{MENU_OPERATIONS['grant'].get(query, 'menu')}"
 
             if query == "1":
                 print("How many of the top members:")
                 num = input("> ").strip()
 
                 try:
-                    sql = """ SELECT M.fName, M.lName, Pub.pubCount
-                                FROM MEMBER M
-                                JOIN (
-                                SELECT memID, COUNT(pubID) AS pubCount
-                                FROM AUTHORED_BY
-                                GROUP BY memID
-                                ) AS Pub ON M.memID = Pub.memID
-                                ORDER BY Pub.pubCount DESC
-                                LIMIT ?;
-                        """
-                    self.cursor.execute(sql, (num,))
-                    rows = self.cursor.fetchall()
+                    def show(row):
+                        fName, lName, pubCount = row
+                        print(f"{fName} {lName} has {pubCount} publications")
 
-                    if not rows:
+                    if not browse_pages(self.report_top_publishers(num, stream=True), show):
                         print("No members found.")
-                    else:
-                        for row in rows:
-                            fName, lName, pubCount = row
-                            print(f"{fName} {lName} has {pubCount} publications")
 
                 except sqlite3.Error as e:
                     print(f"Query error: {e}")
 
             elif query == "2":
                 try:
-                    sql = """SELECT major, AVG(pubCount) AS avgPublications
-                            FROM (
-                                SELECT S.major, COUNT(A.pubID) AS pubCount
-                                FROM STUDENT S
-                                LEFT JOIN AUTHORED_BY A ON A.memID = S.memID
-                                GROUP BY S.studentNo, S.major
-                            ) AS StudentCounts
-                            GROUP BY major;
-                            """
-                    self.cursor.execute(sql)
-                    rows = self.cursor.fetchall()
-                    if not rows:
+                    def show(row):
+                        major, avgPublications = row
+                        print(f"Major {major} has an average of {avgPublications} student publications")
+
+                    if not browse_pages(self.report_avg_student_publications(stream=True), show):
                         print("No data found.")
-                    else:
-                        for row in rows:
-                            major, avgPublications = row
-                            print(f"Major {major} has an average of {avgPublications} student publications")
                 except sqlite3.Error as e:
                     print(f"Query error: {e}")
 
@@ -660,15 +1883,7 @@ class Database:
                 print("Enter end date (YYYY-MM-DD):")
                 end_date = input("> ").strip()
                 try:
-                    sql = """SELECT COUNT(DISTINCT p.projID)
-                        FROM PROJECT p
-                        JOIN FUNDED_BY f ON p.projID = f.projID
-                        WHERE p.statusProj = 'active'
-                        AND (p.endDate IS NULL OR p.endDate >= ?)
-                        AND p.startDate <= ?;
-                    """
-                    self.cursor.execute(sql, (start_date, end_date))
-                    rows = self.cursor.fetchone()
+                    rows = self.report_active_funded_projects(start_date, end_date)
                     if not rows:
                         print("No projects found.")
                     else:
@@ -682,28 +1897,74 @@ class Database:
                 print("Enter grant ID:")
                 grantID = input("> ").strip()
                 try:
-                    sql = """
-                        SELECT m.memID, m.fName, m.lName, COUNT(a.pubID) AS pub_count
-                        FROM MEMBER m
-                        JOIN WORK_ON w ON m.memID = w.memID
-                        JOIN FUNDED_BY f ON w.projID = f.projID
-                        LEFT JOIN AUTHORED_BY a ON m.memID = a.memID
-                        WHERE f.grantID = ?
-                        GROUP BY m.memID
-                        ORDER BY pub_count DESC
-                        LIMIT 3 
-                        """
-                    self.cursor.execute(sql, (grantID,))
-                    rows = self.cursor.fetchall()
-                    if not rows:
+                    def show(row):
+                        memID, memberf, memberl, pub_count = row
+                        print(f"Member {memberf} {memberl} ({memID}) contributed to projects funded by grant {grantID} ({pub_count} publications)")
+
+                    if not browse_pages(self.report_prolific_members(grantID, stream=True), show):
                         print("No members found.")
-                    else:
-                        for row in rows:
-                            memID, memberf, memberl, pub_count = row
-                            print(f"Member {memberf} {memberl} ({memID}) contributed to projects funded by grant {grantID} ({pub_count} publications)")
                 except sqlite3.Error as e:
                     print(f"Query error: {e}")
 
+            elif query == "5":
+                print("Enter start date (YYYY-MM-DD):")
+                start_date = input("> ").strip()
+                print("Enter end date (YYYY-MM-DD):")
+                end_date = input("> ").strip()
+                print(f"Period ({', '.join(SERIES_PERIODS)}), default month:")
+                period = input("> ").strip().lower() or "month"
+                by_source = input("Split by grant source? (y/n): ").strip().lower() == "y"
+                print("CSV file to write (leave blank to show here):")
+                csv_path = input("> ").strip()
+                try:
+                    pages = self.report_funding_series(start_date, end_date, period, by_source, stream=True)
+                    if csv_path:
+                        write_csv(csv_path, ["period_start", "period_end", "source", "active_projects"], pages)
+                        print(f"Series written to {csv_path}")
+                        continue
+
+                    def show(row):
+                        period_start, period_end, source, active = row
+                        label = f" ({source})" if by_source else ""
+                        print(f"{period_start} to {period_end}{label}: {active} active funded project(s)")
+
+                    if not browse_pages(pages, show):
+                        print("No periods found.")
+                except (sqlite3.Error, ValueError, OSError) as e:
+                    print(f"Query error: {e}")
+
+            elif query == "6":
+                print("Words to search titles and venues for (end a word with * to match its prefix):")
+                terms = input("> ").strip()
+                print("Only publications by member ID (leave blank for all):")
+                memID = input("> ").strip()
+                try:
+                    def show(row):
+                        pubID, title, venue, year, authors, snippet, score = row
+                        print(f"{pubID} ({score}): {snippet}")
+                        print(f"    {title}, {venue} {year or ''} - {authors or 'no listed authors'}")
+
+                    if not browse_pages(self.report_search_publications(terms, memID, stream=True), show):
+                        print("No publications found.")
+                except (sqlite3.Error, ValueError) as e:
+                    print(f"Query error: {e}")
+
+            elif query == "7":
+                print("Words to search collaborator bios for (end a word with * to match its prefix):")
+                terms = input("> ").strip()
+                print("Only collaborators on project ID (leave blank for all):")
+                projID = input("> ").strip()
+                try:
+                    def show(row):
+                        memID, fName, lName, affiliation, projects, snippet, score = row
+                        print(f"{memID} {fName} {lName or ''}, {affiliation} ({score}): {snippet}")
+                        print(f"    projects: {projects or 'none'}")
+
+                    if not browse_pages(self.report_search_collaborators(terms, projID, stream=True), show):
+                        print("No collaborators found.")
+                except (sqlite3.Error, ValueError) as e:
+                    print(f"Query error: {e}")
+
             elif query == "0":
                 break
             else:
@@ -720,9 +1981,11 @@ class Database:
             print("1: Project and Member Management")
             print("2: Equipment Usage Tracking")
             print("3: Grant and Publication Reporting")
+            print("4: Query statistics")
             print("0: Exit program")
             try:
                 command = input("Enter menu: ").strip().lower()
+                self.operation = "menu"
                 
                 if command == "0":
                     print("Closing connection and exiting...")
@@ -737,6 +2000,9 @@ class Database:
                 elif command == "3":
                     self.execute_grant()
 
+                elif command == "4":
+                    self.tracer.print_stats()
+
                 else:
                     print("Option not implemented yet.")
             
@@ -750,17 +2016,331 @@ class Database:
             self.connection.close()
             print("Database connection closed.")
 
+def parse_table_files(pairs):
+    files = {}
+    for pair in pairs:
+        table_name, sep, path = pair.partition("=")
+        if not sep or not path:
+            raise argparse.ArgumentTypeError(f"expected TABLE=FILE, got '{pair}'")
+        files[table_name] = path
+    return files
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Research Lab Database")
+    parser.add_argument("--db", default="lab.db", help="database file (default: lab.db)")
+    parser.add_argument("--stats", action="store_true",
+                        help="print per-operation query statistics on exit")
+    parser.add_argument("--slow-ms", type=float, default=SLOW_QUERY_MS,
+                        help=f"log statements slower than this with their query plan (default: {SLOW_QUERY_MS:g})")
+    parser.add_argument("--slow-log", default=SLOW_QUERY_LOG,
+                        help=f"slow query log file (default: {SLOW_QUERY_LOG})")
+    parser.add_argument("--count-statements", action="store_true",
+                        help="also count every statement SQLite runs, trigger bodies included (slower)")
+    parser.add_argument("--memory", choices=DURABILITY,
+                        help="serve reads from an in-memory copy; write-through commits every write to the "
+                             "file, flush writes the copy back every --flush-interval seconds and on exit")
+    parser.add_argument("--flush-interval", type=float, default=FLUSH_INTERVAL,
+                        help=f"seconds between flushes with --memory flush (default: {FLUSH_INTERVAL:g})")
+    subparsers = parser.add_subparsers(dest="command")
+
+    import_parser = subparsers.add_parser("import", help="bulk import CSV or JSONL files")
+    import_parser.add_argument("files", nargs="+", metavar="TABLE=FILE")
+    import_parser.add_argument("--batch-size", type=int, default=1000,
+                               help="rows per executemany chunk (default: 1000)")
+    import_parser.add_argument("--commit-size", type=int, default=0,
+                               help="commit after this many rows where foreign keys allow; rows committed "
+                                    "before a failure are kept (default: 0, one transaction)")
+    import_parser.add_argument("--format", choices=["csv", "jsonl"],
+                               help="file format (default: taken from each file extension)")
+
+    batch_parser = subparsers.add_parser("batch", help="run a JSONL file of operations without prompts")
+    batch_parser.add_argument("script", help="JSONL file of operations, or - for stdin")
+    batch_parser.add_argument("--batch-size", type=int, default=500,
+                              help="writes per transaction (default: 500)")
+    batch_parser.add_argument("--output", default="-",
+                              help="where to write one JSON result per operation (default: stdout)")
+    batch_parser.add_argument("--stop-on-error", action="store_true",
+                              help="roll back the open batch and stop at the first failed operation")
+
+    delete_parser = subparsers.add_parser("delete-members",
+                                          help="delete members and their dependent rows in one transaction")
+    delete_parser.add_argument("members", nargs="*", metavar="MEMID")
+    delete_parser.add_argument("--where", help="SQL condition over MEMBER instead of a list of IDs, "
+                                               "e.g. \"joinDate < ?\"")
+    delete_parser.add_argument("--param", action="append", default=[],
+                               help="value for a ? in --where; may be repeated")
+    delete_parser.add_argument("--dry-run", action="store_true",
+                               help="report what would be deleted and roll back")
+
+    update_parser = subparsers.add_parser("update", help="update many rows of one table in one transaction")
+    update_parser.add_argument("table")
+    update_parser.add_argument("file", nargs="?",
+                               help="CSV or JSONL rows holding the key column and the columns to change")
+    update_parser.add_argument("--key", help="column identifying each row in FILE (default: the primary key)")
+    update_parser.add_argument("--where", help="SQL condition selecting the rows to change instead of FILE")
+    update_parser.add_argument("--param", action="append", default=[],
+                               help="value for a ? in --where; may be repeated")
+    update_parser.add_argument("--set", action="append", default=[], metavar="COLUMN=VALUE",
+                               help="change applied to every row matching --where; may be repeated")
+    update_parser.add_argument("--batch-size", type=int, default=1000,
+                               help="rows per executemany batch (default: 1000)")
+    update_parser.add_argument("--format", choices=["csv", "jsonl"],
+                               help="file format (default: taken from the file extension)")
+    update_parser.add_argument("--dry-run", action="store_true",
+                               help="report what would be updated and roll back")
+
+    onboard_parser = subparsers.add_parser("onboard",
+                                           help="insert members with their projects and subtype rows "
+                                                "in one transaction")
+    onboard_parser.add_argument("file", help="JSONL, one member per line with \"projects\" and \"details\"")
+    onboard_parser.add_argument("--dry-run", action="store_true",
+                                help="check the members and roll back")
+
+    series_parser = subparsers.add_parser("funding-series",
+                                          help="active funded projects per period, as a table or CSV")
+    series_parser.add_argument("--start", required=True, help="first date, YYYY-MM-DD")
+    series_parser.add_argument("--end", required=True, help="last date, YYYY-MM-DD")
+    series_parser.add_argument("--period", choices=list(SERIES_PERIODS), default="month")
+    series_parser.add_argument("--by-source", action="store_true", help="one row per grant source and period")
+    series_parser.add_argument("--csv", metavar="FILE", help="write CSV to FILE ('-' for stdout)")
+
+    search_parser = subparsers.add_parser("search", help="ranked keyword search over publications or "
+                                                         "collaborator bios")
+    search_parser.add_argument("terms", nargs="+", metavar="WORD", help="every word must match; WORD* matches a prefix")
+    search_parser.add_argument("--collaborators", action="store_true",
+                               help="search EXTCOLLAB bios instead of publication titles and venues")
+    search_parser.add_argument("--member", help="only publications authored by this member")
+    search_parser.add_argument("--project", help="only collaborators working on this project")
+    search_parser.add_argument("--limit", type=int, default=SEARCH_LIMIT,
+                               help=f"hits to return (default: {SEARCH_LIMIT})")
+    search_parser.add_argument("--csv", metavar="FILE", help="write CSV to FILE ('-' for stdout)")
+
+    slots_parser = subparsers.add_parser("free-slots",
+                                         help="earliest windows in which an equipment can still be booked")
+    target = slots_parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--equip", metavar="EQUIPID")
+    target.add_argument("--type", help="look at every non-retired equipment of this type")
+    slots_parser.add_argument("--days", type=int, required=True, help="length of the booking in days")
+    slots_parser.add_argument("--from", dest="start_date", help="earliest start date (default: today)")
+    slots_parser.add_argument("--member", help="member who will use it; skips days they already start a usage")
+    slots_parser.add_argument("--limit", type=int, default=FREE_SLOT_LIMIT,
+                              help=f"windows to list (default: {FREE_SLOT_LIMIT})")
+
+    book_parser = subparsers.add_parser("book", help="book many equipment usages in their earliest free "
+                                                     "windows in one transaction")
+    book_parser.add_argument("file", help="CSV or JSONL rows with memID, equipID or type, days, "
+                                          "and optional purpose and startDate")
+    book_parser.add_argument("--format", choices=["csv", "jsonl"],
+                             help="file format (default: taken from the file extension)")
+    book_parser.add_argument("--dry-run", action="store_true", help="show where they would go and roll back")
+
+    projects_parser = subparsers.add_parser("delete-projects",
+                                            help="delete projects, their links and orphaned grants "
+                                                 "in one transaction")
+    projects_parser.add_argument("projects", nargs="*", metavar="PROJID")
+    projects_parser.add_argument("--where", help="SQL condition over PROJECT instead of a list of IDs, "
+                                                 "e.g. \"statusProj = 'completed' AND endDate < ?\"")
+    projects_parser.add_argument("--param", action="append", default=[],
+                                 help="value for a ? in --where; may be repeated")
+    projects_parser.add_argument("--dry-run", action="store_true",
+                                 help="report what would be deleted and roll back")
+    return parser
+
+def print_counts(counts, dry_run=False):
+    # mentees_reset counts surviving members whose mentor was cleared; they
+    # are updated, not deleted, so they stay out of the total.
+    deleted = {name: count for name, count in counts.items() if name != "mentees_reset"}
+    for table_name, count in deleted.items():
+        print(f"   {table_name:.<20} {count:>8} rows")
+    if "mentees_reset" in counts:
+        verb = "Would reset" if dry_run else "Reset"
+        print(f"{verb} the mentor of {counts['mentees_reset']} remaining member(s).")
+    verb = "Would delete" if dry_run else "Deleted"
+    print(f"{verb} {sum(deleted.values())} rows in total.")
+
+def update_file_rows(path, key, fmt=None):
+    for line_no, row in enumerate(read_import_rows(path, fmt), 1):
+        if key not in row:
+            raise ValueError(f"row {line_no} has no '{key}' column")
+        changes = dict(row)
+        yield changes.pop(key), changes
+
+def run_update_command(sql, args):
+    sql.operation = f"update.{args.table}"
+    start = time.perf_counter()
+    try:
+        if args.where:
+            updates = {}
+            for pair in args.set:
+                column, sep, value = pair.partition("=")
+                if not sep:
+                    raise ValueError(f"expected COLUMN=VALUE, got '{pair}'")
+                updates[column] = value if value != "" else None
+            batches = sql.update_where(args.table, updates, args.where, args.param, args.dry_run)
+        else:
+            key = args.key or sql.primary_key(args.table)
+            batches = sql.update_many(args.table, update_file_rows(args.file, key, args.format), key,
+                                      args.batch_size, args.dry_run)
+    except (sqlite3.Error, ValueError, OSError) as e:
+        print(f"Update error: {e}")
+        return False
+    elapsed = time.perf_counter() - start
+    for batch in batches:
+        sent = "" if batch["rows"] is None else f"{batch['rows']} rows, "
+        print(f"  batch {batch['batch']}: {sent}{batch['updated']} updated in {batch['ms']:.3f} ms "
+              f"({', '.join(batch['columns'])})")
+    verb = "Would update" if args.dry_run else "Updated"
+    print(f"{verb} {sum(batch['updated'] for batch in batches)} rows in {elapsed:.3f}s")
+    return True
+
+def run_batch_command(sql, args):
+    out = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        summary = sql.run_batch(read_batch_ops(args.script), out, args.batch_size, args.stop_on_error)
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(json.dumps({"summary": summary}), file=sys.stderr)
+    return summary["failed"] == 0
+
 def main():
-    db_file = 'lab.db'
+    parser = build_parser()
+    args = parser.parse_args()
+    db_file = args.db
 
     if not Path(db_file).exists():
         print(f"Database file '{db_file}' not found!")
 
-    sql = Database(db_file)
+    # Keep stdout for the JSON results in batch mode, or the CSV written to it.
+    machine_output = args.command == "batch" or getattr(args, "csv", None) == "-"
+    with contextlib.redirect_stdout(sys.stderr if machine_output else sys.stdout):
+        sql = Database(db_file, tracer=QueryTracer(args.slow_ms, args.slow_log, args.count_statements),
+                       memory=args.memory, flush_interval=args.flush_interval)
     try:
-        sql.run()
+        if args.command == "batch":
+            if not run_batch_command(sql, args):
+                sys.exit(1)
+        elif args.command == "delete-members":
+            if bool(args.members) == bool(args.where):
+                parser.error("give member IDs or --where, not both")
+            sql.operation = "projMem.delete_members"
+            try:
+                counts = sql.delete_members(args.members or None, args.where, args.param, args.dry_run)
+            except (sqlite3.Error, ValueError) as e:
+                print(f"Delete error: {e}")
+                sys.exit(1)
+            print_counts(counts, args.dry_run)
+        elif args.command == "update":
+            if bool(args.file) == bool(args.where):
+                parser.error("give a FILE or --where, not both")
+            if args.where and not args.set:
+                parser.error("--where needs at least one --set COLUMN=VALUE")
+            if not run_update_command(sql, args):
+                sys.exit(1)
+        elif args.command == "onboard":
+            sql.operation = "projMem.onboard_members"
+            start = time.perf_counter()
+            try:
+                counts = sql.onboard_members(read_import_rows(args.file, "jsonl"), args.dry_run)
+            except (sqlite3.Error, ValueError, OSError) as e:
+                print(f"Onboarding error: {e}")
+                sys.exit(1)
+            elapsed = time.perf_counter() - start
+            for table_name, count in counts.items():
+                print(f"   {table_name:.<20} {count:>8} rows")
+            verb = "Would onboard" if args.dry_run else "Onboarded"
+            print(f"{verb} {counts['MEMBER']} members in {elapsed:.3f}s")
+        elif args.command == "funding-series":
+            sql.operation = "grant.funding_series"
+            columns = ["period_start", "period_end", "source", "active_projects"]
+            try:
+                pages = sql.report_funding_series(args.start, args.end, args.period, args.by_source, stream=True)
+                if args.csv:
+                    write_csv(args.csv, columns, pages)
+                else:
+                    print(f"{'period_start':<12} {'period_end':<12} {'source':<30} {'active_projects':>15}")
+                    for page in pages:
+                        for period_start, period_end, source, active in page:
+                            print(f"{period_start:<12} {period_end:<12} {source or 'all':<30} {active:>15}")
+            except (sqlite3.Error, ValueError, OSError) as e:
+                print(f"Query error: {e}")
+                sys.exit(1)
+        elif args.command == "search":
+            terms = " ".join(args.terms)
+            try:
+                if args.collaborators:
+                    sql.operation = "grant.search_collaborators"
+                    columns = ["memID", "fName", "lName", "affiliation", "projects", "snippet", "score"]
+                    pages = sql.report_search_collaborators(terms, args.project, args.limit, stream=True)
+                else:
+                    sql.operation = "grant.search_publications"
+                    columns = ["pubID", "title", "venue", "year", "authors", "snippet", "score"]
+                    pages = sql.report_search_publications(terms, args.member, args.limit, stream=True)
+                if args.csv:
+                    write_csv(args.csv, columns, pages)
+                else:
+                    print(" | ".join(columns))
+                    for page in pages:
+                        for row in page:
+                            print(format_row(row))
+            except (sqlite3.Error, ValueError, OSError) as e:
+                print(f"Search error: {e}")
+                sys.exit(1)
+        elif args.command == "free-slots":
+            sql.operation = "equipment.free_slots"
+            try:
+                slots = sql.report_free_slots(args.equip, args.days, args.start_date, args.member, args.limit,
+                                              args.type)
+            except (sqlite3.Error, ValueError) as e:
+                print(f"Scheduling error: {e}")
+                sys.exit(1)
+            print(f"{'equipID':<8} {'startDate':<10} {'endDate':<10} {'lastStart':<10} {'users':>5}")
+            for equip_id, start, end, last_start, users in slots:
+                print(f"{equip_id:<8} {start:<10} {end:<10} {last_start or '-':<10} {users:>5}")
+        elif args.command == "book":
+            sql.operation = "equipment.book_usages"
+            start = time.perf_counter()
+            try:
+                results = sql.book_usages(read_import_rows(args.file, args.format), args.dry_run)
+            except (sqlite3.Error, ValueError, OSError) as e:
+                print(f"Booking error: {e}")
+                sys.exit(1)
+            elapsed = time.perf_counter() - start
+            for result in results:
+                if "error" in result:
+                    print(f"  request {result['request']}: not booked, {result['error']}")
+                else:
+                    print(f"  request {result['request']}: {result['memID']} on {result['equipID']} "
+                          f"from {result['startDate']} to {result['endDate']}")
+            booked = sum("error" not in result for result in results)
+            verb = "Would book" if args.dry_run else "Booked"
+            print(f"{verb} {booked} of {len(results)} requests in {elapsed:.3f}s")
+            if booked < len(results):
+                sys.exit(1)
+        elif args.command == "delete-projects":
+            if bool(args.projects) == bool(args.where):
+                parser.error("give project IDs or --where, not both")
+            sql.operation = "projMem.delete_projects"
+            try:
+                counts = sql.delete_projects(args.projects or None, args.where, args.param, args.dry_run)
+            except (sqlite3.Error, ValueError) as e:
+                print(f"Delete error: {e}")
+                sys.exit(1)
+            print_counts(counts, args.dry_run)
+        elif args.command == "import":
+            try:
+                files = parse_table_files(args.files)
+            except argparse.ArgumentTypeError as e:
+                parser.error(str(e))
+            if sql.import_files(files, args.batch_size, args.commit_size, args.format) is None:
+                sys.exit(1)
+        else:
+            sql.run()
     finally:
-        sql.close()
+        with contextlib.redirect_stdout(sys.stderr if machine_output else sys.stdout):
+            if args.stats:
+                sql.tracer.print_stats()
+            sql.close()
 
 if __name__ == "__main__":
-    main()   
+    main()
@@ -0,0 +1,116 @@
+import sqlite3
+import time
+
+from pool import BUSY_TIMEOUT_MS, configure_connection
+from tracing import TracedCursor
+
+# How committed writes in memory mode reach the database file:
+#   write-through  every write statement also runs on a connection to the
+#                  file and commits with it; as durable as disk mode.
+#   flush          the whole copy is written back every flush_interval
+#                  seconds (checked at commit) and on close; a crash loses
+#                  the writes since the last flush.
+DURABILITY = ("write-through", "flush")
+FLUSH_INTERVAL = 30.0
+# Pages copied per backup step when flushing.
+FLUSH_PAGES = 1024
+
+READ_PREFIXES = ("SELECT", "WITH", "EXPLAIN", "VALUES")
+
+def is_write(sql):
+    # Runs for every statement, so only the first keyword is upper-cased.
+    text = sql.lstrip()
+    keyword = text[:7].upper()
+    if keyword.startswith("PRAGMA"):
+        return "=" in text
+    return not keyword.startswith(READ_PREFIXES)
+
+class MirroredCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        result = super().execute(sql, parameters)
+        self.connection.mirror(sql, parameters)
+        return result
+
+    def executemany(self, sql, seq_of_parameters):
+        if self.connection.durability == "write-through" and is_write(sql):
+            # Both connections need the rows, so a generator is read once here.
+            seq_of_parameters = list(seq_of_parameters)
+        result = super().executemany(sql, seq_of_parameters)
+        self.connection.mirror(sql, seq_of_parameters, many=True)
+        return result
+
+class TracedMirroredCursor(TracedCursor, MirroredCursor):
+    pass
+
+class MemoryConnection(sqlite3.Connection):
+    # A :memory: copy of a database file, opened by open_memory(). Reads never
+    # touch the file. It assumes this process is the only writer while it is
+    # open: writes made to the file by others are not seen, and a flush
+    # overwrites them.
+    disk = None
+    durability = None
+
+    def mirror(self, sql, parameters, many=False):
+        if self.durability != "write-through" or not is_write(sql):
+            return
+        if many:
+            self.disk.executemany(sql, parameters)
+        else:
+            self.disk.execute(sql, parameters)
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or MirroredCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        # The file commits first: if that fails, both sides are still open
+        # and the caller's rollback undoes both.
+        if self.durability == "write-through":
+            self.disk.commit()
+        super().commit()
+        if self.durability == "flush" and time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def rollback(self):
+        super().rollback()
+        if self.durability == "write-through":
+            self.disk.rollback()
+
+    def flush(self):
+        if self.in_transaction or self.total_changes == self.flushed_changes:
+            return
+        start = time.perf_counter()
+        self.backup(self.disk, pages=FLUSH_PAGES)
+        self.flush_seconds += time.perf_counter() - start
+        self.flushes += 1
+        self.flushed_changes = self.total_changes
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        try:
+            if self.durability == "flush":
+                self.flush()
+        finally:
+            super().close()
+            self.disk.close()
+
+def open_memory(db_file, durability="write-through", flush_interval=FLUSH_INTERVAL, cached_statements=128):
+    if durability not in DURABILITY:
+        raise ValueError(f"unknown durability '{durability}' (use {', '.join(DURABILITY)})")
+    disk = configure_connection(sqlite3.connect(db_file, timeout=BUSY_TIMEOUT_MS / 1000))
+    conn = sqlite3.connect(":memory:", factory=MemoryConnection, cached_statements=cached_statements)
+    disk.backup(conn)
+    conn.execute("PRAGMA foreign_keys = ON")
+    conn.disk = disk
+    conn.durability = durability
+    conn.flush_interval = flush_interval
+    conn.last_flush = time.monotonic()
+    conn.flushes = 0
+    conn.flush_seconds = 0.0
+    conn.flushed_changes = conn.total_changes
+    return conn
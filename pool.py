@@ -0,0 +1,85 @@
+import sqlite3
+import threading
+import time
+
+BUSY_TIMEOUT_MS = 5000
+RETRIES = 5
+RETRY_DELAY = 0.05
+
+def configure_connection(conn, busy_timeout_ms=BUSY_TIMEOUT_MS):
+    # WAL lets readers keep reading while a writer commits; the setting is
+    # stored in the database file, so it only changes once per database.
+    conn.execute(f"PRAGMA busy_timeout = {int(busy_timeout_ms)}")
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+def is_busy(error):
+    return isinstance(error, sqlite3.OperationalError) and "locked" in str(error)
+
+def with_retry(fn, retries=RETRIES, delay=RETRY_DELAY):
+    # busy_timeout already waits inside SQLite; this covers locks held longer
+    # than that, e.g. another process in the middle of a big import.
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except sqlite3.OperationalError as e:
+            if not is_busy(e) or attempt == retries:
+                raise
+            time.sleep(delay * 2 ** attempt)
+
+class ConnectionPool:
+    def __init__(self, db_file, busy_timeout_ms=BUSY_TIMEOUT_MS, retries=RETRIES):
+        self.db_file = db_file
+        self.busy_timeout_ms = busy_timeout_ms
+        self.retries = retries
+        self._local = threading.local()
+        self._readers = []
+        self._readers_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        # The writer is shared by every thread, one at a time under _write_lock.
+        self._writer = configure_connection(
+            sqlite3.connect(db_file, isolation_level=None, check_same_thread=False), busy_timeout_ms)
+
+    def reader(self):
+        # One read-only connection per thread, opened on first use. Only that
+        # thread uses it; check_same_thread is off so close() can run anywhere.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = configure_connection(
+                sqlite3.connect(self.db_file, check_same_thread=False), self.busy_timeout_ms)
+            conn.execute("PRAGMA query_only = ON")
+            self._local.conn = conn
+            with self._readers_lock:
+                self._readers.append(conn)
+        return conn
+
+    def read(self, fn, *args):
+        conn = self.reader()
+        return with_retry(lambda: fn(conn, *args), self.retries)
+
+    def write(self, fn, *args):
+        # BEGIN IMMEDIATE takes the write lock up front, so a write never
+        # fails halfway through on a read lock it could not upgrade.
+        def attempt():
+            with self._write_lock:
+                conn = self._writer
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    result = fn(conn, *args)
+                    conn.execute("COMMIT")
+                    return result
+                except BaseException:
+                    if conn.in_transaction:
+                        conn.execute("ROLLBACK")
+                    raise
+        return with_retry(attempt, self.retries)
+
+    def close(self):
+        with self._readers_lock:
+            for conn in self._readers:
+                conn.close()
+            self._readers.clear()
+        with self._write_lock:
+            self._writer.close()
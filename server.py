@@ -0,0 +1,259 @@
+import asyncio
+import sqlite3
+import sys
+import json
+import threading
+import argparse
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qsl, unquote
+
+from main import Database, REPORTS
+from pool import ConnectionPool
+from tracing import QueryTracer
+from load_data import SCHEMA_VERSION
+
+# URL collection -> (table, key column). USES has no single-column key, so its
+# rows are always addressed with ?column=...&value=...
+RESOURCES = {
+    "members": ("MEMBER", "memID"),
+    "projects": ("PROJECT", "projID"),
+    "equipment": ("EQUIPMENT", "equipID"),
+    "uses": ("USES", None),
+}
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 500: "Internal Server Error",
+           503: "Service Unavailable"}
+
+# Writes waiting in the queue are committed together, up to this many per
+# transaction; each one still runs under its own savepoint.
+MAX_WRITE_GROUP = 64
+
+class LabServer:
+    def __init__(self, db_file, readers=4, max_rows=1000):
+        self.pool = ConnectionPool(db_file)
+        self.tracer = QueryTracer()
+        self.max_rows = max_rows
+        self.read_executor = ThreadPoolExecutor(readers, thread_name_prefix="lab-reader")
+        self.write_executor = ThreadPoolExecutor(1, thread_name_prefix="lab-writer")
+        self.write_queue = None
+        self._local = threading.local()
+        self._writer_db = None
+
+    def reader_db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = Database(connection=self.pool.reader(), tracer=self.tracer)
+        return db
+
+    def run_read(self, op):
+        db = self.reader_db()
+        if op["op"] == "query":
+            columns = [info[1] for info in db.table_info(op["table"])]
+            rows = list(islice(db.iter_query(op["table"], op["column"], op["value"]), self.max_rows))
+            return {"columns": columns, "rows": rows}
+        return db.run_operation(op)
+
+    def run_writes(self, conn, group):
+        if self._writer_db is None:
+            self._writer_db = Database(connection=conn, tracer=self.tracer)
+        db = self._writer_db
+        results = []
+        for op in group:
+            db.cursor.execute("SAVEPOINT api_write")
+            try:
+                results.append((True, db.run_operation(op)))
+            except Exception as e:
+                db.cursor.execute("ROLLBACK TO api_write")
+                results.append((False, e))
+            finally:
+                db.cursor.execute("RELEASE api_write")
+        return results
+
+    async def read(self, op):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.read_executor, self.pool.read, lambda conn: self.run_read(op))
+
+    async def write(self, op):
+        future = asyncio.get_running_loop().create_future()
+        await self.write_queue.put((op, future))
+        return await future
+
+    async def writer_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            group = [await self.write_queue.get()]
+            while len(group) < MAX_WRITE_GROUP and not self.write_queue.empty():
+                group.append(self.write_queue.get_nowait())
+            ops = [op for op, _ in group]
+            try:
+                results = await loop.run_in_executor(self.write_executor, self.pool.write,
+                                                     self.run_writes, ops)
+            except Exception as e:
+                results = [(False, e)] * len(group)
+            for (_, future), (ok, value) in zip(group, results):
+                if future.cancelled():
+                    continue
+                if ok:
+                    future.set_result(value)
+                else:
+                    future.set_exception(value)
+
+    def route(self, method, target, body):
+        url = urlsplit(target)
+        parts = [unquote(part) for part in url.path.strip("/").split("/") if part]
+        query = dict(parse_qsl(url.query))
+        if parts == ["stats"]:
+            return 200, self.tracer.snapshot()
+        if parts == ["reports"]:
+            return 200, {"reports": list(REPORTS)}
+        if len(parts) == 2 and parts[0] == "reports":
+            if method != "GET":
+                return 405, None
+            return None, {"op": "report", "name": parts[1], "params": query}
+        if not parts or parts[0] not in RESOURCES or len(parts) > 2:
+            return 404, None
+
+        table_name, key = RESOURCES[parts[0]]
+        if len(parts) == 2:
+            if key is None:
+                return 404, None
+            column, value = key, parts[1]
+        else:
+            column, value = query.get("column"), query.get("value")
+
+        if method == "POST" and len(parts) == 1:
+            return None, {"op": "insert", "table": table_name, "values": body}
+        if column is None:
+            return 400, {"error": "give a key in the path or ?column=...&value=..."}
+        if value is None:
+            return 400, {"error": "give ?value=... with ?column=..."}
+        if method == "GET":
+            return None, {"op": "query", "table": table_name, "column": column, "value": value,
+                          "by_key": len(parts) == 2}
+        if method == "PATCH":
+            return None, {"op": "update", "table": table_name, "column": column, "value": value, "set": body}
+        if method == "DELETE":
+            return None, {"op": "delete", "table": table_name, "column": column, "value": value}
+        return 405, None
+
+    async def dispatch(self, method, target, raw_body):
+        try:
+            body = json.loads(raw_body) if raw_body else {}
+        except ValueError as e:
+            return 400, {"error": f"invalid JSON body: {e}"}
+        status, op = self.route(method, target, body)
+        if status is not None:
+            return status, op or {"error": REASONS[status]}
+        by_key = op.pop("by_key", False)
+        try:
+            if op["op"] in ("insert", "update", "delete"):
+                result = await self.write(op)
+                return (201 if op["op"] == "insert" else 200), result
+            result = await self.read(op)
+        except sqlite3.IntegrityError as e:
+            # SQLite also reports a value of the wrong type, such as a
+            # non-numeric LIMIT, as an integrity error.
+            if "datatype mismatch" in str(e):
+                return 400, {"error": str(e)}
+            return 409, {"error": str(e)}
+        except sqlite3.OperationalError as e:
+            if "locked" in str(e):
+                return 503, {"error": str(e)}
+            return 400, {"error": str(e)}
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            return 400, {"error": f"missing field {e}" if isinstance(e, KeyError) else str(e)}
+        except sqlite3.Error as e:
+            return 500, {"error": str(e)}
+        if by_key and not result["rows"]:
+            return 404, {"error": "no matching record"}
+        return 200, result
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    request_line = line.decode("latin-1").split()
+                    if len(request_line) != 3:
+                        raise ValueError("malformed request line")
+                    method, target, version = request_line
+                    headers = {}
+                    while True:
+                        header = await reader.readline()
+                        if header in (b"\r\n", b"\n", b""):
+                            break
+                        name, _, value = header.decode("latin-1").partition(":")
+                        headers[name.strip().lower()] = value.strip()
+                    length = headers.get("content-length") or "0"
+                    if not length.isdigit():
+                        raise ValueError(f"invalid Content-Length {length!r}")
+                    length = int(length)
+                except ValueError as e:
+                    # The rest of the stream cannot be framed after a bad
+                    # request line or header, so the connection is closed.
+                    await self.respond(writer, 400, {"error": str(e)}, False)
+                    break
+                body = await reader.readexactly(length)
+
+                status, payload = await self.dispatch(method.upper(), target, body)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                await self.respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, writer, status, payload, keep_alive):
+        data = json.dumps(payload, default=str).encode()
+        writer.write((f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                      f"Content-Type: application/json\r\n"
+                      f"Content-Length: {len(data)}\r\n"
+                      f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode() + data)
+        await writer.drain()
+
+    async def serve(self, host, port):
+        self.write_queue = asyncio.Queue()
+        writer_task = asyncio.create_task(self.writer_loop())
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Serving {self.pool.db_file} on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            writer_task.cancel()
+
+    def close(self):
+        self.read_executor.shutdown()
+        self.write_executor.shutdown()
+        self.pool.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="JSON API over the lab database")
+    parser.add_argument("--db", default="lab.db", help="database file (default: lab.db)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--readers", type=int, default=4, help="read threads (default: 4)")
+    parser.add_argument("--max-rows", type=int, default=1000,
+                        help="rows returned per query (default: 1000)")
+    args = parser.parse_args()
+
+    lab = LabServer(args.db, args.readers, args.max_rows)
+    try:
+        version = lab.pool.read(lambda conn: conn.execute("PRAGMA user_version").fetchone()[0])
+        if version < SCHEMA_VERSION:
+            print("Schema is out of date. Run: python3 load_data.py --migrate")
+            sys.exit(1)
+        asyncio.run(lab.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        print("Shutting down...")
+    finally:
+        lab.close()
+
+if __name__ == "__main__":
+    main()
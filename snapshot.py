@@ -0,0 +1,154 @@
+import sqlite3
+import sys
+import os
+import csv
+import gzip
+import json
+import time
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+from pool import configure_connection
+
+BACKUP_PAGES = 256
+BACKUP_SLEEP = 0.005
+EXPORT_CHUNK = 5000
+# zlib's usual default; gzip.open defaults to 9, which is several times
+# slower for files that come out barely smaller.
+GZIP_LEVEL = 6
+
+def open_source(db_file):
+    if not Path(db_file).exists():
+        raise FileNotFoundError(f"Database file '{db_file}' not found!")
+    return configure_connection(sqlite3.connect(db_file, isolation_level=None))
+
+def snapshot(db_file, out_file, pages=BACKUP_PAGES, sleep=BACKUP_SLEEP):
+    # Copies db_file page by page with the backup API. The source holds one
+    # read transaction for the whole copy, so the result is the database as
+    # of its start: in WAL mode writers keep committing meanwhile and the
+    # backup never restarts because of them. Each step copies `pages` pages;
+    # a step that finds the file locked waits `sleep` seconds and retries.
+    src = open_source(db_file)
+    tmp_file = f"{out_file}.part"
+    if os.path.exists(tmp_file):
+        os.remove(tmp_file)
+    dst = sqlite3.connect(tmp_file)
+    progress = {"steps": 0, "total": 0}
+
+    def step(status, remaining, total):
+        progress["steps"] += 1
+        progress["total"] = total
+
+    start = time.perf_counter()
+    try:
+        src.execute("BEGIN")
+        src.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()
+        src.backup(dst, pages=pages, progress=step, sleep=sleep)
+        src.execute("COMMIT")
+        # A standalone archive should not need -wal/-shm files next to it.
+        dst.execute("PRAGMA journal_mode = DELETE")
+    finally:
+        dst.close()
+        src.close()
+    os.replace(tmp_file, out_file)
+    elapsed = time.perf_counter() - start
+    return {"pages": progress["total"], "steps": progress["steps"], "bytes": os.path.getsize(out_file),
+            "seconds": elapsed}
+
+def export_tables(db_file, out_dir, fmt="csv", compress=True, chunk=EXPORT_CHUNK, tables=None):
+    # Streams every table (or the named ones) to one file each, chunk rows at
+    # a time, all inside one read transaction so the files agree with each
+    # other. Returns {table: (rows, seconds)}.
+    src = open_source(db_file)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    results = {}
+    try:
+        src.execute("BEGIN")
+        # Only ordinary tables: virtual tables (the USES_INTERVAL rtree) and
+        # their shadow tables are rebuilt from the tables they index.
+        names = sorted(row[1] for row in src.execute("PRAGMA main.table_list")
+                       if row[2] == "table" and not row[1].startswith("sqlite_"))
+        if tables:
+            wanted = {t.upper() for t in tables}
+            unknown = wanted - {name.upper() for name in names}
+            if unknown:
+                raise ValueError(f"no such table(s): {', '.join(sorted(unknown))}")
+            names = [name for name in names if name.upper() in wanted]
+
+        for table_name in names:
+            path = out_dir / f"{table_name}.{fmt}{'.gz' if compress else ''}"
+            start = time.perf_counter()
+            cursor = src.execute(f'SELECT * FROM "{table_name}"')
+            columns = [desc[0] for desc in cursor.description]
+            count = 0
+            f = gzip.open(path, "wt", GZIP_LEVEL, newline="") if compress else open(path, "w", newline="")
+            with f:
+                if fmt == "csv":
+                    writer = csv.writer(f)
+                    writer.writerow(columns)
+                while True:
+                    rows = cursor.fetchmany(chunk)
+                    if not rows:
+                        break
+                    if fmt == "csv":
+                        writer.writerows(rows)
+                    else:
+                        f.writelines(json.dumps(dict(zip(columns, row)), default=str) + "\n" for row in rows)
+                    count += len(rows)
+            results[table_name] = (count, time.perf_counter() - start)
+        src.execute("COMMIT")
+    finally:
+        src.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Copy or export a live lab database")
+    parser.add_argument("--db", default="lab.db", help="database file (default: lab.db)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    backup_parser = subparsers.add_parser("backup", help="point-in-time copy through the backup API")
+    backup_parser.add_argument("--out", help="snapshot file (default: snapshots/<db>-<timestamp>.db)")
+    backup_parser.add_argument("--pages", type=int, default=BACKUP_PAGES,
+                               help=f"pages copied per step (default: {BACKUP_PAGES})")
+    backup_parser.add_argument("--sleep", type=float, default=BACKUP_SLEEP,
+                               help=f"seconds to wait before retrying a locked step (default: {BACKUP_SLEEP})")
+
+    export_parser = subparsers.add_parser("export", help="stream every table to CSV or JSONL files")
+    export_parser.add_argument("--out-dir", help="directory for the files (default: exports/<db>-<timestamp>)")
+    export_parser.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    export_parser.add_argument("--no-compress", action="store_true", help="write plain files instead of .gz")
+    export_parser.add_argument("--chunk", type=int, default=EXPORT_CHUNK,
+                               help=f"rows fetched at a time (default: {EXPORT_CHUNK})")
+    export_parser.add_argument("--table", action="append", help="export only this table; may be repeated")
+    args = parser.parse_args()
+
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    try:
+        if args.command == "backup":
+            out_file = args.out or f"snapshots/{Path(args.db).stem}-{stamp}.db"
+            Path(out_file).parent.mkdir(parents=True, exist_ok=True)
+            result = snapshot(args.db, out_file, args.pages, args.sleep)
+            rate = result["pages"] / result["seconds"] if result["seconds"] > 0 else float("inf")
+            print(f"Snapshot of {args.db} written to {out_file}: {result['pages']} pages "
+                  f"({result['bytes'] / 1e6:.1f} MB) in {result['steps']} steps, "
+                  f"{result['seconds']:.3f}s ({rate:,.0f} pages/sec)")
+        else:
+            out_dir = args.out_dir or f"exports/{Path(args.db).stem}-{stamp}"
+            total_start = time.perf_counter()
+            results = export_tables(args.db, out_dir, args.format, not args.no_compress, args.chunk, args.table)
+            for table_name, (count, seconds) in results.items():
+                rate = count / seconds if seconds > 0 else float("inf")
+                print(f"   {table_name:.<24} {count:>9} rows in {seconds:.3f}s ({rate:,.0f} rows/sec)")
+            elapsed = time.perf_counter() - total_start
+            total = sum(count for count, _ in results.values())
+            rate = total / elapsed if elapsed > 0 else float("inf")
+            print(f"Exported {total} rows from {len(results)} tables to {out_dir} "
+                  f"in {elapsed:.3f}s ({rate:,.0f} rows/sec)")
+    except (sqlite3.Error, ValueError, OSError) as e:
+        print(f"Snapshot error: {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
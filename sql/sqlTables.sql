@@ -148,6 +148,99 @@ CREATE TABLE AUTHORED_BY (
         ON DELETE CASCADE ON UPDATE CASCADE
 );
 
+-- USES rows that have not finished yet (endDate IS NULL or not yet passed when
+-- written), including bookings that start later, plus the number of distinct
+-- members holding them per equipment. Both are kept by triggers so
+-- EQUIPMENT.status never has to count the full usage history. Rows can stay
+-- here after their endDate until the equipment's usages are next written, so
+-- readers filter on the dates; activeUsers is an upper bound on the members
+-- using the equipment today.
+CREATE TABLE ACTIVE_USES (
+    memID CHAR(5) NOT NULL,
+    equipID CHAR(5) NOT NULL,
+    startDate DATE NOT NULL,
+    endDate DATE,
+    PRIMARY KEY (memID, equipID, startDate)
+);
+
+CREATE TABLE EQUIPMENT_OCCUPANCY (
+    equipID CHAR(5) PRIMARY KEY,
+    activeUsers INT NOT NULL DEFAULT 0
+);
+
+-- Number of AUTHORED_BY rows per member, kept by triggers so the publication
+-- reports read counts from an index instead of grouping AUTHORED_BY.
+CREATE TABLE MEMBER_PUB_COUNT (
+    memID CHAR(5) PRIMARY KEY,
+    pubCount INT NOT NULL DEFAULT 0
+);
+
+-- Every (mentor, mentee) pair at any depth of the MEMBER.mentorID tree, plus
+-- a depth-0 row per member, kept by triggers so mentee and lineage reports
+-- are one indexed lookup instead of a recursive walk.
+CREATE TABLE MENTOR_CLOSURE (
+    ancestorID CHAR(5) NOT NULL,
+    descendantID CHAR(5) NOT NULL,
+    depth INT NOT NULL,
+    PRIMARY KEY (ancestorID, descendantID)
+);
+
+-- Day-number intervals of every USES row, one R*Tree entry per row keyed by
+-- USES.rowid, so overlap checks only visit bookings near the requested window.
+-- An open-ended usage (endDate IS NULL) extends to the maximum day.
+CREATE VIRTUAL TABLE USES_INTERVAL USING rtree_i32(
+    id,
+    equipMin, equipMax,
+    startDay, endDay,
+    +memID
+);
+
+-- Full-text indexes over publication titles/venues and collaborator bios.
+-- They are external-content FTS5 tables: only the tokens are stored, keyed by
+-- the rowid of the indexed row, and the text itself is read from the source
+-- table. Triggers keep them in step with PUBLICATION and EXTCOLLAB.
+CREATE VIRTUAL TABLE PUBLICATION_FTS USING fts5(
+    title, venue,
+    content='PUBLICATION', content_rowid='rowid',
+    tokenize='porter unicode61'
+);
+
+CREATE VIRTUAL TABLE EXTCOLLAB_FTS USING fts5(
+    bio,
+    content='EXTCOLLAB', content_rowid='rowid',
+    tokenize='porter unicode61'
+);
+
+CREATE INDEX idx_member_mentorID ON MEMBER (mentorID);
+
+CREATE INDEX idx_student_memID ON STUDENT (memID);
+
+CREATE INDEX idx_student_major ON STUDENT (major, memID);
+
+CREATE INDEX idx_project_memID ON PROJECT (memID);
+
+CREATE INDEX idx_project_status_dates ON PROJECT (statusProj, startDate, endDate);
+
+CREATE INDEX idx_work_on_projID ON WORK_ON (projID, memID);
+
+CREATE INDEX idx_funded_by_grantID ON FUNDED_BY (grantID, projID);
+
+CREATE INDEX idx_equipment_type ON EQUIPMENT (type);
+
+CREATE INDEX idx_uses_equipID_dates ON USES (equipID, startDate, endDate, memID);
+
+CREATE INDEX idx_authored_by_memID ON AUTHORED_BY (memID, pubID);
+
+CREATE INDEX idx_member_pub_count ON MEMBER_PUB_COUNT (pubCount, memID);
+
+CREATE INDEX idx_active_uses_equipID ON ACTIVE_USES (equipID, startDate, endDate);
+
+CREATE INDEX idx_active_uses_endDate ON ACTIVE_USES (endDate);
+
+CREATE INDEX idx_mentor_closure_descendant ON MENTOR_CLOSURE (descendantID, depth, ancestorID);
+
+CREATE INDEX idx_mentor_closure_ancestor_depth ON MENTOR_CLOSURE (ancestorID, depth, descendantID);
+
 CREATE TRIGGER prevent_student_mentoring_faculty
 BEFORE UPDATE ON MEMBER
 FOR EACH ROW
@@ -158,6 +251,16 @@ BEGIN
     SELECT RAISE(ABORT, 'A STUDENT cannot mentor a FACULTY member');
 END;
 
+CREATE TRIGGER prevent_mentorship_cycle
+BEFORE UPDATE OF mentorID ON MEMBER
+FOR EACH ROW
+WHEN NEW.mentorID IS NOT NULL
+    AND EXISTS (SELECT 1 FROM MENTOR_CLOSURE
+                WHERE ancestorID = NEW.memID AND descendantID = NEW.mentorID)
+BEGIN
+    SELECT RAISE(ABORT, 'A member cannot be mentored by their own mentee');
+END;
+
 CREATE TRIGGER faculty_prefix_check
 BEFORE INSERT ON FACULTY
 FOR EACH ROW
@@ -210,10 +313,12 @@ CREATE TRIGGER uses_before_insert
 BEFORE INSERT ON USES
 FOR EACH ROW
 WHEN (
-    SELECT COUNT(DISTINCT u.memID) 
-    FROM USES u
-    WHERE u.equipID = NEW.equipID
-      AND NOT (u.endDate < NEW.startDate OR u.startDate > NEW.endDate)
+    SELECT COUNT(DISTINCT i.memID)
+    FROM USES_INTERVAL i
+    WHERE i.equipMin <= (SELECT rowid FROM EQUIPMENT WHERE equipID = NEW.equipID)
+      AND i.equipMax >= (SELECT rowid FROM EQUIPMENT WHERE equipID = NEW.equipID)
+      AND i.startDay <= COALESCE(CAST(julianday(NEW.endDate) AS INTEGER), 2147483647)
+      AND i.endDay >= CAST(julianday(NEW.startDate) AS INTEGER)
 ) >= 3
 BEGIN
     SELECT RAISE(ABORT, 'Equipment already in use by 3 members during that interval');
@@ -223,20 +328,57 @@ CREATE TRIGGER uses_before_update
 BEFORE UPDATE ON USES
 FOR EACH ROW
 WHEN (
-    SELECT COUNT(DISTINCT u.memID) 
-    FROM USES u
-    WHERE u.equipID = NEW.equipID
-      AND NOT (u.memID = OLD.memID AND u.equipID = OLD.equipID AND u.startDate = OLD.startDate)
-      AND NOT (u.endDate < NEW.startDate OR u.startDate > NEW.endDate)
+    SELECT COUNT(DISTINCT i.memID)
+    FROM USES_INTERVAL i
+    WHERE i.equipMin <= (SELECT rowid FROM EQUIPMENT WHERE equipID = NEW.equipID)
+      AND i.equipMax >= (SELECT rowid FROM EQUIPMENT WHERE equipID = NEW.equipID)
+      AND i.startDay <= COALESCE(CAST(julianday(NEW.endDate) AS INTEGER), 2147483647)
+      AND i.endDay >= CAST(julianday(NEW.startDate) AS INTEGER)
+      AND i.id <> OLD.rowid
 ) >= 3
 BEGIN
     SELECT RAISE(ABORT, 'Equipment already in use by 3 members during that interval');
 END;
 
+CREATE TRIGGER uses_interval_after_insert
+AFTER INSERT ON USES
+FOR EACH ROW
+BEGIN
+    INSERT INTO USES_INTERVAL (id, equipMin, equipMax, startDay, endDay, memID)
+    SELECT NEW.rowid, e.rowid, e.rowid,
+           CAST(julianday(NEW.startDate) AS INTEGER),
+           COALESCE(CAST(julianday(NEW.endDate) AS INTEGER), 2147483647),
+           NEW.memID
+    FROM EQUIPMENT e
+    WHERE e.equipID = NEW.equipID;
+END;
+
+CREATE TRIGGER uses_interval_after_update
+AFTER UPDATE ON USES
+FOR EACH ROW
+BEGIN
+    DELETE FROM USES_INTERVAL WHERE id = OLD.rowid;
+    INSERT INTO USES_INTERVAL (id, equipMin, equipMax, startDay, endDay, memID)
+    SELECT NEW.rowid, e.rowid, e.rowid,
+           CAST(julianday(NEW.startDate) AS INTEGER),
+           COALESCE(CAST(julianday(NEW.endDate) AS INTEGER), 2147483647),
+           NEW.memID
+    FROM EQUIPMENT e
+    WHERE e.equipID = NEW.equipID;
+END;
+
+CREATE TRIGGER uses_interval_after_delete
+AFTER DELETE ON USES
+FOR EACH ROW
+BEGIN
+    DELETE FROM USES_INTERVAL WHERE id = OLD.rowid;
+END;
+
 CREATE TRIGGER publication_must_have_author
 AFTER DELETE ON AUTHORED_BY
 FOR EACH ROW
 WHEN (SELECT COUNT(*) FROM AUTHORED_BY WHERE pubID = OLD.pubID) = 0
+    AND EXISTS (SELECT 1 FROM PUBLICATION WHERE pubID = OLD.pubID)
 BEGIN
     SELECT RAISE(ABORT, 'Publication must have at least one author');
 END;
@@ -245,44 +387,148 @@ CREATE TRIGGER grant_must_fund_project
 AFTER DELETE ON FUNDED_BY
 FOR EACH ROW
 WHEN (SELECT COUNT(*) FROM FUNDED_BY WHERE grantID = OLD.grantID) = 0
+    AND EXISTS (SELECT 1 FROM GRANT WHERE grantID = OLD.grantID)
 BEGIN
     SELECT RAISE(ABORT, 'Grant must fund at least one project');
 END;
 
-CREATE TRIGGER update_equipment_status_after_insert
+CREATE TRIGGER active_uses_after_insert
 AFTER INSERT ON USES
 FOR EACH ROW
+WHEN NEW.endDate IS NULL OR NEW.endDate >= date('now')
 BEGIN
-    UPDATE EQUIPMENT
-    SET status = CASE
-        WHEN (SELECT COUNT(*) FROM USES WHERE equipID = NEW.equipID) = 3 THEN 'In Use'
-        ELSE 'Available'
-    END
-    WHERE equipID = NEW.equipID;
+    DELETE FROM ACTIVE_USES WHERE equipID = NEW.equipID AND endDate < date('now');
+    INSERT INTO ACTIVE_USES (memID, equipID, startDate, endDate)
+    VALUES (NEW.memID, NEW.equipID, NEW.startDate, NEW.endDate);
 END;
 
-CREATE TRIGGER update_equipment_status_after_update
+CREATE TRIGGER active_uses_after_update
 AFTER UPDATE ON USES
 FOR EACH ROW
 BEGIN
+    DELETE FROM ACTIVE_USES
+    WHERE memID = OLD.memID AND equipID = OLD.equipID AND startDate = OLD.startDate;
+    DELETE FROM ACTIVE_USES WHERE equipID = NEW.equipID AND endDate < date('now');
+    INSERT INTO ACTIVE_USES (memID, equipID, startDate, endDate)
+    SELECT NEW.memID, NEW.equipID, NEW.startDate, NEW.endDate
+    WHERE NEW.endDate IS NULL OR NEW.endDate >= date('now');
+END;
+
+CREATE TRIGGER active_uses_after_delete
+AFTER DELETE ON USES
+FOR EACH ROW
+BEGIN
+    DELETE FROM ACTIVE_USES
+    WHERE memID = OLD.memID AND equipID = OLD.equipID AND startDate = OLD.startDate;
+END;
+
+-- A member with several bookings on one equipment counts once, as in
+-- uses_before_insert. The stored status is as of the last write to the
+-- equipment's usages; report_equipment_status works it out for today.
+CREATE TRIGGER update_equipment_status_after_insert
+AFTER INSERT ON ACTIVE_USES
+FOR EACH ROW
+BEGIN
+    INSERT INTO EQUIPMENT_OCCUPANCY (equipID, activeUsers) VALUES (NEW.equipID, 1)
+    ON CONFLICT (equipID) DO UPDATE SET activeUsers = activeUsers +
+        ((SELECT COUNT(*) FROM ACTIVE_USES WHERE memID = NEW.memID AND equipID = NEW.equipID) = 1);
     UPDATE EQUIPMENT
     SET status = CASE
-        WHEN (SELECT COUNT(*) FROM USES WHERE equipID = NEW.equipID) = 3 THEN 'In Use'
+        WHEN (SELECT COUNT(DISTINCT memID) FROM ACTIVE_USES
+              WHERE equipID = NEW.equipID AND startDate <= date('now')
+              AND (endDate IS NULL OR endDate >= date('now'))) >= 3 THEN 'In Use'
         ELSE 'Available'
     END
-    WHERE equipID = NEW.equipID;
+    WHERE equipID = NEW.equipID AND status <> 'Retired';
 END;
 
 CREATE TRIGGER update_equipment_status_after_delete
-AFTER DELETE ON USES
+AFTER DELETE ON ACTIVE_USES
 FOR EACH ROW
 BEGIN
+    UPDATE EQUIPMENT_OCCUPANCY
+    SET activeUsers = activeUsers -
+        NOT EXISTS (SELECT 1 FROM ACTIVE_USES WHERE memID = OLD.memID AND equipID = OLD.equipID)
+    WHERE equipID = OLD.equipID;
     UPDATE EQUIPMENT
     SET status = CASE
-        WHEN (SELECT COUNT(*) FROM USES WHERE equipID = OLD.equipID) = 3 THEN 'In Use'
+        WHEN (SELECT COUNT(DISTINCT memID) FROM ACTIVE_USES
+              WHERE equipID = OLD.equipID AND startDate <= date('now')
+              AND (endDate IS NULL OR endDate >= date('now'))) >= 3 THEN 'In Use'
         ELSE 'Available'
     END
-    WHERE equipID = OLD.equipID;
+    WHERE equipID = OLD.equipID AND status <> 'Retired';
+END;
+
+-- A new member's subtree is normally just itself, but members inserted with
+-- deferred foreign keys may name a mentor that arrives after them.
+CREATE TRIGGER mentor_closure_after_insert
+AFTER INSERT ON MEMBER
+FOR EACH ROW
+BEGIN
+    INSERT INTO MENTOR_CLOSURE (ancestorID, descendantID, depth) VALUES (NEW.memID, NEW.memID, 0);
+    INSERT INTO MENTOR_CLOSURE (ancestorID, descendantID, depth)
+    SELECT NEW.memID, s.descendantID, s.depth + 1
+    FROM MEMBER c
+    JOIN MENTOR_CLOSURE s ON s.ancestorID = c.memID
+    WHERE c.mentorID = NEW.memID AND c.memID <> NEW.memID;
+    INSERT INTO MENTOR_CLOSURE (ancestorID, descendantID, depth)
+    SELECT a.ancestorID, d.descendantID, a.depth + d.depth + 1
+    FROM MENTOR_CLOSURE a, MENTOR_CLOSURE d
+    WHERE a.descendantID = NEW.mentorID AND d.ancestorID = NEW.memID;
+END;
+
+-- Moving a member moves its whole subtree: paths from its old ancestors are
+-- removed, and paths from the new mentor's ancestors are added.
+CREATE TRIGGER mentor_closure_after_update
+AFTER UPDATE OF mentorID ON MEMBER
+FOR EACH ROW
+WHEN OLD.mentorID IS NOT NEW.mentorID
+BEGIN
+    DELETE FROM MENTOR_CLOSURE
+    WHERE descendantID IN (SELECT descendantID FROM MENTOR_CLOSURE WHERE ancestorID = NEW.memID)
+    AND ancestorID IN (SELECT ancestorID FROM MENTOR_CLOSURE
+                       WHERE descendantID = NEW.memID AND ancestorID <> NEW.memID);
+    INSERT INTO MENTOR_CLOSURE (ancestorID, descendantID, depth)
+    SELECT a.ancestorID, d.descendantID, a.depth + d.depth + 1
+    FROM MENTOR_CLOSURE a, MENTOR_CLOSURE d
+    WHERE a.descendantID = NEW.mentorID AND d.ancestorID = NEW.memID;
+END;
+
+CREATE TRIGGER mentor_closure_after_delete
+AFTER DELETE ON MEMBER
+FOR EACH ROW
+BEGIN
+    DELETE FROM MENTOR_CLOSURE
+    WHERE descendantID IN (SELECT descendantID FROM MENTOR_CLOSURE WHERE ancestorID = OLD.memID)
+    AND ancestorID IN (SELECT ancestorID FROM MENTOR_CLOSURE WHERE descendantID = OLD.memID);
+END;
+
+CREATE TRIGGER pub_count_after_insert
+AFTER INSERT ON AUTHORED_BY
+FOR EACH ROW
+BEGIN
+    INSERT INTO MEMBER_PUB_COUNT (memID, pubCount) VALUES (NEW.memID, 1)
+    ON CONFLICT (memID) DO UPDATE SET pubCount = pubCount + 1;
+END;
+
+CREATE TRIGGER pub_count_after_update
+AFTER UPDATE OF memID ON AUTHORED_BY
+FOR EACH ROW
+WHEN NEW.memID <> OLD.memID
+BEGIN
+    UPDATE MEMBER_PUB_COUNT SET pubCount = pubCount - 1 WHERE memID = OLD.memID;
+    DELETE FROM MEMBER_PUB_COUNT WHERE memID = OLD.memID AND pubCount <= 0;
+    INSERT INTO MEMBER_PUB_COUNT (memID, pubCount) VALUES (NEW.memID, 1)
+    ON CONFLICT (memID) DO UPDATE SET pubCount = pubCount + 1;
+END;
+
+CREATE TRIGGER pub_count_after_delete
+AFTER DELETE ON AUTHORED_BY
+FOR EACH ROW
+BEGIN
+    UPDATE MEMBER_PUB_COUNT SET pubCount = pubCount - 1 WHERE memID = OLD.memID;
+    DELETE FROM MEMBER_PUB_COUNT WHERE memID = OLD.memID AND pubCount <= 0;
 END;
 
 CREATE TRIGGER pub_fill_after_insert
@@ -294,3 +540,51 @@ BEGIN
         year = CAST(strftime('%Y', NEW.publicationDate) AS INTEGER)
     WHERE pubID = NEW.pubID;
 END;
+
+CREATE TRIGGER publication_fts_after_insert
+AFTER INSERT ON PUBLICATION
+FOR EACH ROW
+BEGIN
+    INSERT INTO PUBLICATION_FTS (rowid, title, venue) VALUES (NEW.rowid, NEW.title, NEW.venue);
+END;
+
+CREATE TRIGGER publication_fts_after_delete
+AFTER DELETE ON PUBLICATION
+FOR EACH ROW
+BEGIN
+    INSERT INTO PUBLICATION_FTS (PUBLICATION_FTS, rowid, title, venue)
+    VALUES ('delete', OLD.rowid, OLD.title, OLD.venue);
+END;
+
+-- Only title and venue are indexed, so pub_fill_after_insert setting
+-- month/year does not touch the index.
+CREATE TRIGGER publication_fts_after_update
+AFTER UPDATE OF title, venue ON PUBLICATION
+FOR EACH ROW
+BEGIN
+    INSERT INTO PUBLICATION_FTS (PUBLICATION_FTS, rowid, title, venue)
+    VALUES ('delete', OLD.rowid, OLD.title, OLD.venue);
+    INSERT INTO PUBLICATION_FTS (rowid, title, venue) VALUES (NEW.rowid, NEW.title, NEW.venue);
+END;
+
+CREATE TRIGGER extcollab_fts_after_insert
+AFTER INSERT ON EXTCOLLAB
+FOR EACH ROW
+BEGIN
+    INSERT INTO EXTCOLLAB_FTS (rowid, bio) VALUES (NEW.rowid, NEW.bio);
+END;
+
+CREATE TRIGGER extcollab_fts_after_delete
+AFTER DELETE ON EXTCOLLAB
+FOR EACH ROW
+BEGIN
+    INSERT INTO EXTCOLLAB_FTS (EXTCOLLAB_FTS, rowid, bio) VALUES ('delete', OLD.rowid, OLD.bio);
+END;
+
+CREATE TRIGGER extcollab_fts_after_update
+AFTER UPDATE OF bio ON EXTCOLLAB
+FOR EACH ROW
+BEGIN
+    INSERT INTO EXTCOLLAB_FTS (EXTCOLLAB_FTS, rowid, bio) VALUES ('delete', OLD.rowid, OLD.bio);
+    INSERT INTO EXTCOLLAB_FTS (rowid, bio) VALUES (NEW.rowid, NEW.bio);
+END;
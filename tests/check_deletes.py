@@ -0,0 +1,90 @@
+import sqlite3
+import io
+import os
+import sys
+import tempfile
+import contextlib
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from load_data import (clean_sql_for_sqlite, create_indexes, create_tables, create_triggers,
+                       extract_index_statements, extract_triggers, iter_sql_statements, read_schema,
+                       rebuild_derived_tables, strip_leading_comments, verify_derived_tables)
+from main import Database
+
+def build_sample_db(path):
+    schema = read_schema(str(ROOT / "sql" / "sqlTables.sql"))
+    conn = sqlite3.connect(path)
+    cursor = conn.cursor()
+    create_tables(cursor, schema, strict=True)
+    for raw_statement in iter_sql_statements(ROOT / "sql" / "sampleData.sql"):
+        statement = strip_leading_comments(clean_sql_for_sqlite(raw_statement))
+        if statement:
+            cursor.execute(statement)
+    create_indexes(cursor, extract_index_statements(schema), strict=True)
+    rebuild_derived_tables(cursor)
+    create_triggers(cursor, extract_triggers(schema), strict=True)
+    # A paper with a single author, so deleting that member has to take the
+    # paper with it.
+    cursor.execute("INSERT INTO PUBLICATION (pubID, publicationDate, title, venue, month, year, DOI) "
+                   "VALUES ('pb900', '2024-02-01', 'Solo Work', 'Test Venue', 2, 2024, '10.0/solo')")
+    cursor.execute("INSERT INTO AUTHORED_BY (pubID, memID) VALUES ('pb900', 's6399')")
+    conn.commit()
+    conn.close()
+
+def scalar(db, sql, params=()):
+    db.cursor.execute(sql, params)
+    return db.cursor.fetchone()[0]
+
+def check_deletes():
+    failures = 0
+
+    def check(name, passed):
+        nonlocal failures
+        print(f"[{'OK' if passed else 'FAIL'}] {name}")
+        failures += not passed
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, "lab.db")
+        with contextlib.redirect_stdout(io.StringIO()):
+            build_sample_db(db_file)
+            db = Database(db_file)
+
+        # Sole author of pb900.
+        counts = db.delete_members(["s6399"])
+        check("sole author deleted", counts["MEMBER"] == 1)
+        check("orphaned paper deleted", scalar(db, "SELECT COUNT(*) FROM PUBLICATION WHERE pubID = 'pb900'") == 0)
+
+        # s4564 mentors s4756, which stays with no mentor.
+        counts = db.delete_members(["s4564"])
+        check("mentor deleted", counts["MEMBER"] == 1 and counts["mentees_reset"] == 1)
+        check("mentee kept without a mentor",
+              scalar(db, "SELECT COUNT(*) FROM MEMBER WHERE memID = 's4756' AND mentorID IS NULL") == 1)
+
+        # f1234 leads projects, so the delete is refused and nothing changes.
+        try:
+            db.delete_members(["f1234"])
+            refused = False
+        except ValueError:
+            refused = True
+        check("project leader refused", refused and not db.connection.in_transaction)
+        check("project leader kept", scalar(db, "SELECT COUNT(*) FROM MEMBER WHERE memID = 'f1234'") == 1)
+
+        projID = scalar(db, "SELECT projID FROM PROJECT ORDER BY projID")
+        counts = db.delete_projects([projID])
+        check("project deleted", counts["PROJECT"] == 1)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            mismatched = verify_derived_tables(db.cursor)
+        check("derived tables match their sources", mismatched == 0)
+        db.cursor.execute("PRAGMA foreign_key_check")
+        check("no foreign key violations", not db.cursor.fetchall())
+        db.connection.close()
+
+    print(f"\n{failures} delete check(s) failed")
+    return failures
+
+if __name__ == "__main__":
+    sys.exit(1 if check_deletes() else 0)
@@ -0,0 +1,82 @@
+import sqlite3
+import re
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from load_data import clean_sql_for_sqlite, extract_create_table_statements, extract_index_statements
+
+# Tables that stay small no matter how big the lab gets; scanning them is fine.
+SMALL_TABLES = {"GRANT", "EQUIPMENT"}
+
+def build_schema_db():
+    schema = (ROOT / "sql" / "sqlTables.sql").read_text()
+    conn = sqlite3.connect(":memory:")
+    cursor = conn.cursor()
+    for table_name, statement in extract_create_table_statements(clean_sql_for_sqlite(schema)):
+        cursor.execute(statement)
+    for index_name, statement in extract_index_statements(schema):
+        cursor.execute(statement)
+    return conn
+
+def read_test_queries():
+    content = (ROOT / "tests" / "testQueries.sql").read_text()
+    queries = []
+    for block in re.split(r'\n\s*\n', content):
+        block = block.strip()
+        if not block:
+            continue
+        allowed = set()
+        for match in re.finditer(r'--\s*allow-scan:\s*(.*)', block):
+            allowed.update(name.strip().upper() for name in match.group(1).split(","))
+        queries.append((block.rstrip(";"), allowed))
+    return queries
+
+def table_aliases(sql, table_names):
+    aliases = {}
+    pattern = r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?'
+    for match in re.finditer(pattern, sql, re.IGNORECASE):
+        table = match.group(1).upper()
+        if table not in table_names:
+            continue
+        aliases[table] = table
+        alias = match.group(2)
+        if alias and alias.upper() not in ("ON", "WHERE", "JOIN", "LEFT", "GROUP", "ORDER", "USING"):
+            aliases[alias.upper()] = table
+    return aliases
+
+def check_query_plans():
+    conn = build_schema_db()
+    cursor = conn.cursor()
+    cursor.execute("SELECT UPPER(name) FROM sqlite_master WHERE type = 'table'")
+    table_names = {row[0] for row in cursor.fetchall()}
+
+    failures = 0
+    for number, (sql, allowed) in enumerate(read_test_queries(), start=1):
+        aliases = table_aliases(sql, table_names)
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", [None] * sql.count("?"))
+        plan = [row[3] for row in cursor.fetchall()]
+
+        bad_scans = []
+        for detail in plan:
+            match = re.match(r'SCAN (?:TABLE )?(\w+)', detail)
+            if not match:
+                continue
+            table = aliases.get(match.group(1).upper())
+            if table and table not in SMALL_TABLES and table not in allowed:
+                bad_scans.append(detail)
+
+        status = "FAIL" if bad_scans else "OK"
+        print(f"[{status}] Query {number}")
+        for detail in plan:
+            print(f"    {detail}")
+        failures += bool(bad_scans)
+
+    conn.close()
+    print(f"\n{failures} query plan regression(s) found")
+    return failures
+
+if __name__ == "__main__":
+    sys.exit(1 if check_query_plans() else 0)
@@ -14,31 +14,33 @@ WHERE w1.projID = w2.projID
 AND w1.projID = ?
 
 SELECT M.memID, M.fName, M.lName, W.projID
-FROM USES U
-JOIN MEMBER M ON M.memID = U.memID
+FROM ACTIVE_USES A
+JOIN MEMBER M ON M.memID = A.memID
 LEFT JOIN WORK_ON W ON W.memID = M.memID
-WHERE U.equipID = ?
-AND U.startDate <= CURRENT_DATE
-AND (U.endDate IS NULL OR U.endDate >= CURRENT_DATE);
+WHERE A.equipID = ?
+AND A.startDate <= CURRENT_DATE
+AND (A.endDate IS NULL OR A.endDate >= CURRENT_DATE);
 
+SELECT U.*
+FROM ACTIVE_USES A
+CROSS JOIN USES U
+    ON U.memID = A.memID AND U.equipID = A.equipID AND U.startDate = A.startDate
+WHERE A.equipID = ?
+AND A.startDate <= CURRENT_DATE
+AND (A.endDate IS NULL OR A.endDate >= CURRENT_DATE)
+
+-- allow-scan: MEMBER_PUB_COUNT
 SELECT M.fName, M.lName, Pub.pubCount
-FROM MEMBER M
-JOIN (
-SELECT memID, COUNT(pubID) AS pubCount
-FROM AUTHORED_BY
-GROUP BY memID
-) AS Pub ON M.memID = Pub.memID
+FROM MEMBER_PUB_COUNT Pub
+JOIN MEMBER M ON M.memID = Pub.memID
 ORDER BY Pub.pubCount DESC
 LIMIT ?;
 
-SELECT major, AVG(pubCount) AS avgPublications
-FROM (
-    SELECT S.major, COUNT(A.pubID) AS pubCount
-    FROM STUDENT S
-    LEFT JOIN AUTHORED_BY A ON A.memID = S.memID
-    GROUP BY S.studentNo, S.major
-    ) AS StudentCounts
-GROUP BY major;
+-- allow-scan: STUDENT
+SELECT S.major, AVG(COALESCE(P.pubCount, 0)) AS avgPublications
+FROM STUDENT S
+LEFT JOIN MEMBER_PUB_COUNT P ON P.memID = S.memID
+GROUP BY S.major;
 
 SELECT COUNT(DISTINCT p.projID)
 FROM PROJECT p
@@ -47,12 +49,26 @@ WHERE p.statusProj = 'active'
 AND (p.endDate IS NULL OR p.endDate >= ?)
 AND p.startDate <= ?;
 
-SELECT m.memID, m.fName, m.lName, COUNT(a.pubID) AS pub_count
+SELECT m.memID, m.fName, m.lName, COALESCE(p.pubCount, 0) AS pub_count
 FROM MEMBER m
 JOIN WORK_ON w ON m.memID = w.memID
 JOIN FUNDED_BY f ON w.projID = f.projID
-LEFT JOIN AUTHORED_BY a ON m.memID = a.memID
+LEFT JOIN MEMBER_PUB_COUNT p ON p.memID = m.memID
 WHERE f.grantID = ?
 GROUP BY m.memID
 ORDER BY pub_count DESC
-LIMIT 3
\ No newline at end of file
+LIMIT 3
+
+SELECT m.memID, m.fName, m.lName, c.depth, m.mentorID
+FROM MENTOR_CLOSURE c
+JOIN MEMBER m ON m.memID = c.descendantID
+WHERE c.ancestorID = ? AND c.depth > 0
+AND (? IS NULL OR EXISTS (SELECT 1 FROM WORK_ON w WHERE w.memID = m.memID AND w.projID = ?))
+ORDER BY c.depth, m.memID;
+
+SELECT m.memID, m.fName, m.lName, c.depth
+FROM MENTOR_CLOSURE c
+JOIN MEMBER m ON m.memID = c.ancestorID
+WHERE c.descendantID = ? AND c.depth > 0
+AND (? IS NULL OR EXISTS (SELECT 1 FROM WORK_ON w WHERE w.memID = m.memID AND w.projID = ?))
+ORDER BY c.depth
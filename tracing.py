@@ -0,0 +1,174 @@
+import sqlite3
+import json
+import time
+import threading
+from bisect import bisect_left
+from datetime import datetime
+
+# Upper bounds, in ms, of the latency histogram buckets; one more bucket
+# past the last bound catches everything slower.
+BUCKETS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 5000)
+SLOW_QUERY_MS = 100.0
+SLOW_QUERY_LOG = "slow_queries.log"
+
+class TracedCursor(sqlite3.Cursor):
+    # Times every execute/executemany and files it under the operation the
+    # owning Database is running.
+    def __init__(self, connection, database):
+        super().__init__(connection)
+        self.database = database
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.database.tracer.record(self.database, sql, parameters,
+                                        (time.perf_counter() - start) * 1000)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self.database.tracer.record(self.database, sql, None,
+                                        (time.perf_counter() - start) * 1000)
+
+    # execute() only runs a SELECT up to its first row; the rest of the work
+    # happens while fetching, which is counted separately as fetch time.
+    def fetchone(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchone()
+        finally:
+            self.database.tracer.fetched(self.database, (time.perf_counter() - start) * 1000)
+
+    def fetchmany(self, size=None):
+        start = time.perf_counter()
+        try:
+            return super().fetchmany(self.arraysize if size is None else size)
+        finally:
+            self.database.tracer.fetched(self.database, (time.perf_counter() - start) * 1000)
+
+    def fetchall(self):
+        start = time.perf_counter()
+        try:
+            return super().fetchall()
+        finally:
+            self.database.tracer.fetched(self.database, (time.perf_counter() - start) * 1000)
+
+def new_stats():
+    return {"calls": 0, "statements": 0, "total_ms": 0.0, "fetch_ms": 0.0, "max_ms": 0.0, "slow": 0,
+            "buckets": [0] * (len(BUCKETS_MS) + 1)}
+
+def bucket_percentile(buckets, fraction):
+    # Upper bound of the bucket holding the given fraction of calls.
+    target = sum(buckets) * fraction
+    seen = 0
+    for i, count in enumerate(buckets):
+        seen += count
+        if count and seen >= target:
+            return BUCKETS_MS[i] if i < len(BUCKETS_MS) else float("inf")
+    return 0.0
+
+class QueryTracer:
+    # Shared by every Database in a process (the server hands one to each
+    # thread), so updates go through a lock; each is a few dict operations.
+    def __init__(self, slow_ms=SLOW_QUERY_MS, slow_log=SLOW_QUERY_LOG, count_statements=False):
+        self.slow_ms = slow_ms
+        self.slow_log = slow_log
+        self.count_statements = count_statements
+        self.stats = {}
+        self.lock = threading.Lock()
+
+    def attach(self, database):
+        # The trace callback sees every statement SQLite starts on the
+        # connection, including the implicit BEGIN/COMMIT and trigger programs.
+        # It is off by default: sqlite3 expands the SQL text for every one of
+        # them, which costs about a third of a small write's time.
+        if self.count_statements:
+            database.connection.set_trace_callback(lambda sql: self.statement(database.operation))
+
+    def statement(self, operation):
+        with self.lock:
+            stats = self.stats.get(operation)
+            if stats is None:
+                stats = self.stats[operation] = new_stats()
+            stats["statements"] += 1
+
+    def record(self, database, sql, parameters, elapsed_ms):
+        operation = database.operation
+        with self.lock:
+            stats = self.stats.get(operation)
+            if stats is None:
+                stats = self.stats[operation] = new_stats()
+            stats["calls"] += 1
+            stats["total_ms"] += elapsed_ms
+            if elapsed_ms > stats["max_ms"]:
+                stats["max_ms"] = elapsed_ms
+            stats["buckets"][bisect_left(BUCKETS_MS, elapsed_ms)] += 1
+            slow = self.slow_ms is not None and elapsed_ms >= self.slow_ms
+            if slow:
+                stats["slow"] += 1
+        if slow:
+            self.log_slow(database, operation, sql, parameters, elapsed_ms)
+
+    def fetched(self, database, elapsed_ms):
+        with self.lock:
+            stats = self.stats.get(database.operation)
+            if stats is None:
+                stats = self.stats[database.operation] = new_stats()
+            stats["fetch_ms"] += elapsed_ms
+
+    def log_slow(self, database, operation, sql, parameters, elapsed_ms):
+        plan = None
+        if parameters is not None and sql.lstrip().upper().startswith(("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")):
+            try:
+                rows = database.connection.execute("EXPLAIN QUERY PLAN " + sql, parameters).fetchall()
+                plan = [row[-1] for row in rows]
+            except sqlite3.Error:
+                pass
+        entry = {"time": datetime.now().isoformat(timespec="seconds"), "operation": operation,
+                 "ms": round(elapsed_ms, 3), "sql": " ".join(sql.split()),
+                 "params": list(parameters) if isinstance(parameters, (list, tuple)) else parameters,
+                 "plan": plan}
+        if self.slow_log:
+            with self.lock, open(self.slow_log, "a") as f:
+                f.write(json.dumps(entry, default=str) + "\n")
+
+    def snapshot(self):
+        with self.lock:
+            result = {}
+            for operation, stats in sorted(self.stats.items()):
+                calls = stats["calls"]
+                result[operation] = {
+                    "calls": calls,
+                    "statements": stats["statements"],
+                    "total_ms": round(stats["total_ms"], 3),
+                    "fetch_ms": round(stats["fetch_ms"], 3),
+                    "mean_ms": round(stats["total_ms"] / calls, 4) if calls else 0.0,
+                    "p50_ms": bucket_percentile(stats["buckets"], 0.50),
+                    "p95_ms": bucket_percentile(stats["buckets"], 0.95),
+                    "max_ms": round(stats["max_ms"], 3),
+                    "slow": stats["slow"],
+                    "histogram": dict(zip([f"<={b}" for b in BUCKETS_MS] + [f">{BUCKETS_MS[-1]}"],
+                                          stats["buckets"])),
+                }
+            return result
+
+    def print_stats(self):
+        snapshot = self.snapshot()
+        print("-" * 50)
+        print("Query statistics")
+        print("-" * 50)
+        if not snapshot:
+            print("No queries traced yet.")
+            return
+        print(f"{'operation':<34} {'calls':>7} {'stmts':>7} {'exec ms':>10} {'fetch ms':>9} {'mean':>8} "
+              f"{'p50<=':>7} {'p95<=':>7} {'max':>9} {'slow':>5}")
+        for operation, stats in snapshot.items():
+            print(f"{operation:<34} {stats['calls']:>7} {stats['statements']:>7} {stats['total_ms']:>10.2f} "
+                  f"{stats['fetch_ms']:>9.2f} {stats['mean_ms']:>8.3f} {stats['p50_ms']:>7} {stats['p95_ms']:>7} "
+                  f"{stats['max_ms']:>9.3f} {stats['slow']:>5}")
+        if self.slow_log:
+            print(f"Statements over {self.slow_ms} ms are logged with their query plan to {self.slow_log}")